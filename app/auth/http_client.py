@@ -0,0 +1,75 @@
+"""
+Shared outbound HTTP client for the OAuth providers.
+
+Every sign-in calls the provider's token and user info endpoints. Reusing
+one pooled httpx.AsyncClient keeps those connections alive between logins,
+so only the first one after a quiet spell pays for the TCP and TLS
+handshakes. HTTP/2 is used when the h2 package is installed.
+"""
+import contextlib
+import importlib.util
+import logging
+import os
+from typing import AsyncIterator, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+OAUTH_HTTP_TIMEOUT = float(os.getenv("OAUTH_HTTP_TIMEOUT", "10"))
+OAUTH_HTTP_CONNECT_TIMEOUT = float(os.getenv("OAUTH_HTTP_CONNECT_TIMEOUT", "5"))
+OAUTH_HTTP_MAX_CONNECTIONS = int(os.getenv("OAUTH_HTTP_MAX_CONNECTIONS", "50"))
+OAUTH_HTTP_MAX_KEEPALIVE = int(os.getenv("OAUTH_HTTP_MAX_KEEPALIVE", "20"))
+OAUTH_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("OAUTH_HTTP_KEEPALIVE_EXPIRY", "60"))
+OAUTH_HTTP2 = os.getenv("OAUTH_HTTP2", "True").lower() in ("true", "1", "yes")
+
+
+def http2_available() -> bool:
+    """httpx needs the optional h2 package to speak HTTP/2."""
+    return importlib.util.find_spec("h2") is not None
+
+
+class SharedHTTPClient:
+    """
+    Lazily created httpx.AsyncClient shared by every provider.
+
+    The client is created on first use, inside the running event loop, and
+    closed by the application's shutdown handler.
+    """
+
+    def __init__(self, http2: bool = OAUTH_HTTP2):
+        self.http2 = http2 and http2_available()
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def get(self) -> httpx.AsyncClient:
+        """Return the shared client, creating it if needed."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                http2=self.http2,
+                timeout=httpx.Timeout(OAUTH_HTTP_TIMEOUT, connect=OAUTH_HTTP_CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=OAUTH_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=OAUTH_HTTP_MAX_KEEPALIVE,
+                    keepalive_expiry=OAUTH_HTTP_KEEPALIVE_EXPIRY,
+                ),
+                headers={"User-Agent": "LeagueLedger"},
+            )
+            logger.info(f"Opened shared OAuth HTTP client (HTTP/2 {'on' if self.http2 else 'off'})")
+        return self._client
+
+    @contextlib.asynccontextmanager
+    async def borrow(self) -> AsyncIterator[httpx.AsyncClient]:
+        """
+        Use the shared client in an async with block without closing it afterwards,
+        in place of `async with httpx.AsyncClient() as client`.
+        """
+        yield self.get()
+
+    async def aclose(self) -> None:
+        """Close pooled connections; the next use opens a new client."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+oauth_http_client = SharedHTTPClient()
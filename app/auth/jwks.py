@@ -0,0 +1,137 @@
+"""
+Process-wide caches for OpenID Connect discovery documents and signing keys.
+
+Validating an ID token needs the provider's public keys. Fetching the key
+set on every login puts a network round trip (and a blocking one, with
+PyJWKClient) in front of each sign-in, so key sets are cached per URL:
+
+- keys are refetched once they are older than JWKS_CACHE_TTL,
+- a token signed with an unknown kid triggers an early refetch, at most
+  once per JWKS_MIN_REFRESH_INTERVAL, so a rotated key is picked up
+  without letting bogus tokens hammer the provider,
+- refresh_key_sets_periodically() refreshes registered key sets in the
+  background, so logins normally validate tokens without any I/O.
+
+If a refresh fails, the previously fetched keys keep being used.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+
+import jwt
+from jwt import PyJWK, PyJWKSet
+
+from ..utils.cache import TTLCache
+from .http_client import SharedHTTPClient, oauth_http_client
+
+logger = logging.getLogger(__name__)
+
+JWKS_CACHE_TTL = float(os.getenv("JWKS_CACHE_TTL", "3600"))
+JWKS_MIN_REFRESH_INTERVAL = float(os.getenv("JWKS_MIN_REFRESH_INTERVAL", "60"))
+JWKS_REFRESH_INTERVAL = float(os.getenv("JWKS_REFRESH_INTERVAL", "900"))
+OIDC_DISCOVERY_TTL = float(os.getenv("OIDC_DISCOVERY_TTL", "3600"))
+
+_discovery_documents = TTLCache(OIDC_DISCOVERY_TTL, name="oidc_discovery")
+
+
+async def get_openid_configuration(url: str, http_client: SharedHTTPClient = oauth_http_client) -> Dict[str, Any]:
+    """Return the provider's discovery document, fetching it at most once per OIDC_DISCOVERY_TTL."""
+    config = _discovery_documents.get(url)
+    if config is None:
+        async with http_client.borrow() as client:
+            response = await client.get(url)
+        response.raise_for_status()
+        config = response.json()
+        _discovery_documents.set(url, config)
+    return config
+
+
+class KeySetCache:
+    """The signing keys published at one JWKS URL, shared by every request in this process."""
+
+    def __init__(
+        self,
+        jwks_url: str,
+        http_client: SharedHTTPClient = oauth_http_client,
+        ttl: float = JWKS_CACHE_TTL,
+        min_refresh_interval: float = JWKS_MIN_REFRESH_INTERVAL,
+    ):
+        self.jwks_url = jwks_url
+        self.http_client = http_client
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self.fetches = 0
+        self._keys: Dict[Optional[str], PyJWK] = {}
+        self._fetched_at: Optional[float] = None
+        self._attempted_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def is_stale(self) -> bool:
+        return self._fetched_at is None or time.monotonic() - self._fetched_at > self.ttl
+
+    async def get_signing_key(self, token: str) -> PyJWK:
+        """Return the key that signed token, refetching the key set if it is stale or lacks the token's kid."""
+        kid = jwt.get_unverified_header(token).get("kid")
+        # A failed refresh counts as an attempt, so during an outage cached keys are used without I/O
+        if self.is_stale and (not self._keys or self._may_refresh_early()):
+            await self.refresh()
+        key = self._find(kid)
+        if key is None and self._may_refresh_early():
+            await self.refresh()
+            key = self._find(kid)
+        if key is None:
+            raise jwt.PyJWKClientError(f'Unable to find a signing key that matches "{kid}"')
+        return key
+
+    async def refresh(self) -> None:
+        """Fetch the key set, unless another request refetched it while this one waited."""
+        attempted_at = self._attempted_at
+        async with self._lock:
+            if self._attempted_at != attempted_at:
+                return
+            self._attempted_at = time.monotonic()
+            try:
+                async with self.http_client.borrow() as client:
+                    response = await client.get(self.jwks_url)
+                response.raise_for_status()
+                key_set = PyJWKSet.from_dict(response.json())
+            except Exception as e:
+                if not self._keys:
+                    raise jwt.PyJWKClientError(f"Could not fetch signing keys from {self.jwks_url}: {e}")
+                logger.warning(f"Could not refresh signing keys from {self.jwks_url}, keeping cached keys: {e}")
+                return
+            self._keys = {key.key_id: key for key in key_set.keys if key.public_key_use in ("sig", None)}
+            self._fetched_at = time.monotonic()
+            self.fetches += 1
+
+    def _find(self, kid: Optional[str]) -> Optional[PyJWK]:
+        if kid is None and len(self._keys) == 1:
+            return next(iter(self._keys.values()))
+        return self._keys.get(kid)
+
+    def _may_refresh_early(self) -> bool:
+        return self._attempted_at is None or time.monotonic() - self._attempted_at >= self.min_refresh_interval
+
+
+_key_sets: Dict[str, KeySetCache] = {}
+
+
+def key_set_cache(jwks_url: str, http_client: SharedHTTPClient = oauth_http_client) -> KeySetCache:
+    """Return the process-wide cache for jwks_url, registering it for background refreshes."""
+    if jwks_url not in _key_sets:
+        _key_sets[jwks_url] = KeySetCache(jwks_url, http_client)
+    return _key_sets[jwks_url]
+
+
+async def refresh_key_sets_periodically(interval: float = JWKS_REFRESH_INTERVAL):
+    """Keep registered key sets fresh so token validation doesn't wait on the provider."""
+    while True:
+        for key_set in list(_key_sets.values()):
+            try:
+                await key_set.refresh()
+            except Exception as e:
+                logger.warning(f"Failed to refresh signing keys from {key_set.jwks_url}: {str(e)}")
+        await asyncio.sleep(interval)
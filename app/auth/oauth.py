@@ -38,9 +38,11 @@ from fastapi import HTTPException, Request
 from starlette.responses import RedirectResponse
 from typing import Optional, Dict, Any, List, Type
 import json
-import httpx
 from urllib.parse import urlencode
 
+from .http_client import SharedHTTPClient, oauth_http_client
+from .jwks import get_openid_configuration, key_set_cache
+
 class OAuthProvider(ABC):
     """Base class for all OAuth providers"""
     
@@ -56,14 +58,23 @@ class OAuthProvider(ABC):
     # Default button color (hex or valid CSS color name)
     button_color = "#333333"
     
+    # Pooled HTTP client for provider requests; OAuthManager injects its own
+    http_client: SharedHTTPClient = oauth_http_client
+    
     def __init__(self):
         self.client = None
-        self.initialize_client()
+        self.setup_client()
     
     @abstractmethod
     def initialize_client(self):
         """Initialize the specific OAuth client"""
         pass
+    
+    def setup_client(self):
+        """Initialize the OAuth client and route its token requests through the shared HTTP client"""
+        self.initialize_client()
+        if self.client is not None:
+            self.client.get_httpx_client = lambda: self.http_client.borrow()
         
     @abstractmethod
     async def get_login_url(self, request: Request, redirect_uri: str) -> str:
@@ -128,7 +139,7 @@ class AuthentikOAuth(OAuthProvider):
 
     async def get_login_url(self, request: Request, redirect_uri: str) -> str:
         if not self.client:
-            self.initialize_client()
+            self.setup_client()
             
         if not self.client:
             raise HTTPException(status_code=500, detail="OAuth client could not be initialized")
@@ -146,7 +157,7 @@ class AuthentikOAuth(OAuthProvider):
 
     async def get_user_info(self, request: Request, redirect_uri: str, code: str) -> Dict[str, Any]:
         if not self.client:
-            self.initialize_client()
+            self.setup_client()
             
         if not self.client:
             raise HTTPException(status_code=500, detail="OAuth client could not be initialized")
@@ -162,19 +173,18 @@ class AuthentikOAuth(OAuthProvider):
             if not access_token:
                 raise HTTPException(status_code=400, detail="Could not get access token")
                 
-            # Get user info from OpenID userinfo endpoint
-            async with httpx.AsyncClient() as client:
-                # Get the configuration to find the userinfo_endpoint
-                config_response = await client.get(self.config_url)
-                if config_response.status_code != 200:
-                    raise HTTPException(status_code=500, detail="Could not fetch OpenID configuration")
-                
-                config = config_response.json()
-                userinfo_endpoint = config.get("userinfo_endpoint")
-                
-                if not userinfo_endpoint:
-                    raise HTTPException(status_code=500, detail="UserInfo endpoint not found in OpenID configuration")
-                
+            # Get the (cached) configuration to find the userinfo_endpoint
+            try:
+                config = await get_openid_configuration(self.config_url, self.http_client)
+            except Exception:
+                raise HTTPException(status_code=500, detail="Could not fetch OpenID configuration")
+            
+            userinfo_endpoint = config.get("userinfo_endpoint")
+            
+            if not userinfo_endpoint:
+                raise HTTPException(status_code=500, detail="UserInfo endpoint not found in OpenID configuration")
+            
+            async with self.http_client.borrow() as client:
                 # Make request to userinfo endpoint
                 headers = {"Authorization": f"Bearer {access_token}"}
                 user_response = await client.get(userinfo_endpoint, headers=headers)
@@ -220,7 +230,7 @@ class GoogleOAuth(OAuthProvider):
     
     async def get_login_url(self, request: Request, redirect_uri: str) -> str:
         if not self.client:
-            self.initialize_client()
+            self.setup_client()
             
         if not self.client:
             raise HTTPException(status_code=500, detail="Google OAuth client could not be initialized")
@@ -239,7 +249,7 @@ class GoogleOAuth(OAuthProvider):
     
     async def get_user_info(self, request: Request, redirect_uri: str, code: str) -> Dict[str, Any]:
         if not self.client:
-            self.initialize_client()
+            self.setup_client()
             
         if not self.client:
             raise HTTPException(status_code=500, detail="Google OAuth client could not be initialized")
@@ -256,7 +266,7 @@ class GoogleOAuth(OAuthProvider):
                 raise HTTPException(status_code=400, detail="Could not get Google access token")
             
             # Get user info from Google
-            async with httpx.AsyncClient() as client:
+            async with self.http_client.borrow() as client:
                 headers = {"Authorization": f"Bearer {access_token}"}
                 response = await client.get(
                     "https://www.googleapis.com/oauth2/v3/userinfo",
@@ -316,7 +326,7 @@ class GitHubOAuth(OAuthProvider):
             
     async def get_login_url(self, request: Request, redirect_uri: str) -> str:
         if not self.client:
-            self.initialize_client()
+            self.setup_client()
             
         if not self.client:
             raise HTTPException(status_code=500, detail="GitHub OAuth client could not be initialized")
@@ -334,7 +344,7 @@ class GitHubOAuth(OAuthProvider):
     
     async def get_user_info(self, request: Request, redirect_uri: str, code: str) -> Dict[str, Any]:
         if not self.client:
-            self.initialize_client()
+            self.setup_client()
             
         if not self.client:
             raise HTTPException(status_code=500, detail="GitHub OAuth client could not be initialized")
@@ -352,7 +362,7 @@ class GitHubOAuth(OAuthProvider):
             
             # Get user info from GitHub
             user_data = {}
-            async with httpx.AsyncClient() as client:
+            async with self.http_client.borrow() as client:
                 headers = {
                     "Authorization": f"token {access_token}",
                     "Accept": "application/vnd.github.v3+json"
@@ -435,7 +445,7 @@ class FacebookOAuth(OAuthProvider):
     
     async def get_login_url(self, request: Request, redirect_uri: str) -> str:
         if not self.client:
-            self.initialize_client()
+            self.setup_client()
             
         if not self.client:
             raise HTTPException(status_code=500, detail="Facebook OAuth client could not be initialized")
@@ -453,7 +463,7 @@ class FacebookOAuth(OAuthProvider):
     
     async def get_user_info(self, request: Request, redirect_uri: str, code: str) -> Dict[str, Any]:
         if not self.client:
-            self.initialize_client()
+            self.setup_client()
             
         if not self.client:
             raise HTTPException(status_code=500, detail="Facebook OAuth client could not be initialized")
@@ -470,7 +480,7 @@ class FacebookOAuth(OAuthProvider):
                 raise HTTPException(status_code=400, detail="Could not get Facebook access token")
             
             # Get user info from Facebook
-            async with httpx.AsyncClient() as client:
+            async with self.http_client.borrow() as client:
                 response = await client.get(
                     "https://graph.facebook.com/me",
                     params={
@@ -538,7 +548,7 @@ class MicrosoftOAuth(OAuthProvider):
     
     async def get_login_url(self, request: Request, redirect_uri: str) -> str:
         if not self.client:
-            self.initialize_client()
+            self.setup_client()
             
         if not self.client:
             raise HTTPException(status_code=500, detail="Microsoft OAuth client could not be initialized")
@@ -556,7 +566,7 @@ class MicrosoftOAuth(OAuthProvider):
     
     async def get_user_info(self, request: Request, redirect_uri: str, code: str) -> Dict[str, Any]:
         if not self.client:
-            self.initialize_client()
+            self.setup_client()
             
         if not self.client:
             raise HTTPException(status_code=500, detail="Microsoft OAuth client could not be initialized")
@@ -573,7 +583,7 @@ class MicrosoftOAuth(OAuthProvider):
                 raise HTTPException(status_code=400, detail="Could not get Microsoft access token")
             
             # Get user info from Microsoft Graph API
-            async with httpx.AsyncClient() as client:
+            async with self.http_client.borrow() as client:
                 headers = {"Authorization": f"Bearer {access_token}"}
                 response = await client.get(
                     "https://graph.microsoft.com/v1.0/me",
@@ -632,7 +642,7 @@ class DiscordOAuth(OAuthProvider):
     
     async def get_login_url(self, request: Request, redirect_uri: str) -> str:
         if not self.client:
-            self.initialize_client()
+            self.setup_client()
             
         if not self.client:
             raise HTTPException(status_code=500, detail="Discord OAuth client could not be initialized")
@@ -650,7 +660,7 @@ class DiscordOAuth(OAuthProvider):
     
     async def get_user_info(self, request: Request, redirect_uri: str, code: str) -> Dict[str, Any]:
         if not self.client:
-            self.initialize_client()
+            self.setup_client()
             
         if not self.client:
             raise HTTPException(status_code=500, detail="Discord OAuth client could not be initialized")
@@ -667,7 +677,7 @@ class DiscordOAuth(OAuthProvider):
                 raise HTTPException(status_code=400, detail="Could not get Discord access token")
             
             # Get user info from Discord API
-            async with httpx.AsyncClient() as client:
+            async with self.http_client.borrow() as client:
                 headers = {"Authorization": f"Bearer {access_token}"}
                 response = await client.get(
                     "https://discord.com/api/users/@me",
@@ -744,7 +754,7 @@ class LinkedInOAuth(OAuthProvider):
     
     async def get_login_url(self, request: Request, redirect_uri: str) -> str:
         if not self.client:
-            self.initialize_client()
+            self.setup_client()
             
         if not self.client:
             raise HTTPException(status_code=500, detail="LinkedIn OAuth client could not be initialized")
@@ -763,7 +773,7 @@ class LinkedInOAuth(OAuthProvider):
     
     async def get_user_info(self, request: Request, redirect_uri: str, code: str) -> Dict[str, Any]:
         if not self.client:
-            self.initialize_client()
+            self.setup_client()
             
         if not self.client:
             raise HTTPException(status_code=500, detail="LinkedIn OAuth client could not be initialized")
@@ -782,7 +792,7 @@ class LinkedInOAuth(OAuthProvider):
                 raise HTTPException(status_code=400, detail="Could not get LinkedIn access token")
             
             # Get user info from LinkedIn UserInfo endpoint (OIDC standard endpoint)
-            async with httpx.AsyncClient() as client:
+            async with self.http_client.borrow() as client:
                 headers = {"Authorization": f"Bearer {access_token}"}
                 response = await client.get(
                     self.USERINFO_URL,
@@ -843,6 +853,9 @@ class NetIDOAuth(OAuthProvider):
             self.client = None
             return
             
+        # Register the signing keys for background refreshes
+        key_set_cache(self.JWKS_URL, self.http_client)
+        
         try:
             # Create a custom OAuth2 client for NetID OpenID Connect
             from httpx_oauth.oauth2 import OAuth2
@@ -860,7 +873,7 @@ class NetIDOAuth(OAuthProvider):
     
     async def get_login_url(self, request: Request, redirect_uri: str) -> str:
         if not self.client:
-            self.initialize_client()
+            self.setup_client()
             
         if not self.client:
             raise HTTPException(status_code=500, detail="NetID OAuth client could not be initialized")
@@ -885,7 +898,7 @@ class NetIDOAuth(OAuthProvider):
     
     async def get_user_info(self, request: Request, redirect_uri: str, code: str) -> Dict[str, Any]:
         if not self.client:
-            self.initialize_client()
+            self.setup_client()
             
         if not self.client:
             raise HTTPException(status_code=500, detail="NetID OAuth client could not be initialized")
@@ -908,7 +921,7 @@ class NetIDOAuth(OAuthProvider):
                 await self.validate_id_token(id_token)
             
             # Get user info from NetID UserInfo endpoint
-            async with httpx.AsyncClient() as client:
+            async with self.http_client.borrow() as client:
                 headers = {"Authorization": f"Bearer {access_token}"}
                 response = await client.get(
                     self.USERINFO_URL,
@@ -931,13 +944,9 @@ class NetIDOAuth(OAuthProvider):
         """Validate the NetID ID token signature using JWKS"""
         try:
             import jwt
-            from jwt.jwks_client import PyJWKClient
-            
-            # Create a JWKS client to fetch the public keys from NetID
-            jwks_client = PyJWKClient(self.JWKS_URL)
             
-            # Get the signing key for this specific JWT
-            signing_key = jwks_client.get_signing_key_from_jwt(id_token)
+            # Get the signing key for this specific JWT from the shared key cache
+            signing_key = await key_set_cache(self.JWKS_URL, self.http_client).get_signing_key(id_token)
             
             # Verify the JWT using the fetched public key
             # This will raise exceptions if the token is invalid
@@ -975,7 +984,8 @@ class OAuthManager:
     Manager class for handling multiple OAuth providers
     """
     
-    def __init__(self):
+    def __init__(self, http_client: SharedHTTPClient = oauth_http_client):
+        self.http_client = http_client
         self.providers: Dict[str, OAuthProvider] = {}
         self.register_default_providers()
     
@@ -992,6 +1002,7 @@ class OAuthManager:
     
     def register_provider(self, provider: OAuthProvider):
         """Register a new provider"""
+        provider.http_client = self.http_client
         self.providers[provider.provider_id] = provider
     
     def get_provider(self, provider_id: str) -> Optional[OAuthProvider]:
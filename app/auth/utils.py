@@ -1,10 +1,14 @@
 from fastapi import Request
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from ..models import User
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Attempts to create a user before giving up on concurrent signups taking the same username
+USERNAME_ALLOCATION_ATTEMPTS = 5
+
 def get_current_user_from_session(request: Request, db: Session):
     """Get the current user from the session."""
     try:
@@ -24,3 +28,50 @@ def get_current_user_from_session(request: Request, db: Session):
         logger.error(f"Error retrieving user from session: {str(e)}")
     
     return None
+
+def next_free_username(db: Session, base_username: str) -> str:
+    """
+    Return base_username, or base_username followed by the lowest free number.
+    
+    All usernames starting with base_username are fetched in one query and the
+    suffix is picked in memory. Names are compared case-insensitively, as
+    MySQL's unique index does.
+    """
+    taken = {
+        username.lower()
+        for (username,) in db.query(User.username).filter(User.username.startswith(base_username, autoescape=True))
+    }
+    if base_username.lower() not in taken:
+        return base_username
+    
+    suffixes = set()
+    for username in taken:
+        suffix = username[len(base_username):]
+        if suffix.isdecimal():
+            suffixes.add(int(suffix))
+    counter = 1
+    while counter in suffixes:
+        counter += 1
+    return f"{base_username}{counter}"
+
+def create_user_with_unique_username(db: Session, base_username: str, **fields) -> User:
+    """
+    Create a user named after base_username, retrying with a new name if a
+    concurrent signup takes it first. If the concurrent signup used the same
+    email, that user is returned instead.
+    """
+    for _ in range(USERNAME_ALLOCATION_ATTEMPTS):
+        user = User(username=next_free_username(db, base_username), **fields)
+        db.add(user)
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            existing = db.query(User).filter(User.email == fields.get("email")).first()
+            if existing:
+                return existing
+            logger.info(f"Username {user.username} was taken concurrently, retrying")
+            continue
+        db.refresh(user)
+        return user
+    raise RuntimeError(f"Could not allocate a unique username for {base_username}")
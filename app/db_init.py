@@ -7,17 +7,13 @@ import uuid
 from datetime import datetime, timedelta
 from sqlalchemy import inspect
 from sqlalchemy.orm import Session
-from passlib.context import CryptContext
 import asyncio
 
 from .models import User, League, Team, TeamMembership, QRCode, QRSet, TeamAchievement, Event, SystemSettings
 from .db import SessionLocal, engine
 from .db_migrations import run_migrations
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+from .league_context import bootstrap_leagues
+from .security import get_password_hash
 
 def table_has_column(engine, table_name, column_name):
     """Check if a table has a specific column."""
@@ -38,6 +34,8 @@ async def init_db():
     await asyncio.to_thread(seed_db)
     # Initialize system settings if needed
     await asyncio.to_thread(init_system_settings)
+    # Make sure a default league exists and load the league registry
+    await asyncio.to_thread(init_leagues)
 
 def init_system_settings():
     """Initialize the system settings table if it doesn't exist."""
@@ -56,6 +54,17 @@ def init_system_settings():
     finally:
         db.close()
 
+def init_leagues():
+    """Create the default league if there is none and load the in-process league registry."""
+    db = SessionLocal()
+    try:
+        league = bootstrap_leagues(db)
+        print(f"League registry loaded, default league: {league.name}")
+    except Exception as e:
+        print(f"Error loading leagues: {e}")
+    finally:
+        db.close()
+
 def seed_db():
     """Seed the database with test data."""
     db = SessionLocal()
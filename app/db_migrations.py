@@ -118,6 +118,12 @@ def run_migrations(engine):
         
         # Add picture_manually_deleted column if it doesn't exist
         add_picture_manually_deleted_column(connection)
+
+        # Index the mail queue by status and sent_at for the metrics counts and the purge of sent mail
+        add_outbound_email_status_index(connection)
+
+        # Add announcement delivery counters if they don't exist
+        add_announcement_counter_columns(connection)
         
         print("Migrations completed successfully")
         
@@ -259,33 +265,31 @@ def backfill_league_ids(connection, default_league_id):
             )
 
     if 'qr_codes' in tables and 'league_id' in [col['name'] for col in inspector.get_columns('qr_codes')]:
-        connection.execute(text("""
-            UPDATE qr_codes
-            SET league_id = (
-                SELECT qr_sets.league_id
-                FROM qr_sets
-                WHERE qr_sets.id = qr_codes.qr_set_id
-            )
-            WHERE league_id IS NULL
-            AND qr_set_id IS NOT NULL
-        """))
-        connection.execute(text("""
-            UPDATE qr_codes
-            SET league_id = (
-                SELECT events.league_id
-                FROM events
-                WHERE events.id = qr_codes.event_id
-            )
-            WHERE league_id IS NULL
-            AND event_id IS NOT NULL
-        """))
-        connection.execute(
-            text("UPDATE qr_codes SET league_id = :league_id WHERE league_id IS NULL"),
-            {"league_id": default_league_id}
-        )
+        backfill_qr_code_league_ids(connection, default_league_id)
 
     connection.commit()
 
+def backfill_qr_code_league_ids(connection, default_league_id):
+    """
+    Store the effective league on every QR code that has none.
+
+    Uses the same precedence as league_context.qr_code_league_id (set, then
+    event, then the default league) in one UPDATE, so redemption never has
+    to fall back through the set and event at request time.
+    """
+    result = connection.execute(text("""
+        UPDATE qr_codes
+        SET league_id = COALESCE(
+            (SELECT qr_sets.league_id FROM qr_sets WHERE qr_sets.id = qr_codes.qr_set_id),
+            (SELECT events.league_id FROM events WHERE events.id = qr_codes.event_id),
+            :league_id
+        )
+        WHERE league_id IS NULL
+    """), {"league_id": default_league_id})
+    if result.rowcount:
+        print(f"Backfilled league_id on {result.rowcount} QR codes")
+    return result.rowcount
+
 def drop_global_team_name_unique(connection):
     """Best-effort removal of the legacy global team-name uniqueness constraint."""
     if engine.name == 'sqlite':
@@ -364,6 +368,52 @@ def add_privacy_settings_column(connection):
     except Exception as e:
         print(f"Error adding privacy_settings column: {str(e)}")
 
+def add_outbound_email_status_index(connection):
+    """Replace the status index of outbound_emails with the (status, sent_at) index"""
+    try:
+        inspector = inspect(engine)
+        if 'outbound_emails' not in inspector.get_table_names():
+            return
+        indexes = [index['name'] for index in inspector.get_indexes('outbound_emails')]
+
+        if 'ix_outbound_emails_status_sent_at' not in indexes:
+            print("Adding ix_outbound_emails_status_sent_at index to outbound_emails table")
+            connection.execute(text("""
+                CREATE INDEX ix_outbound_emails_status_sent_at
+                ON outbound_emails (status, sent_at)
+            """))
+            connection.commit()
+
+        # The new index covers lookups by status, so the old one would only slow down inserts
+        if 'ix_outbound_emails_status' in indexes:
+            print("Dropping ix_outbound_emails_status index from outbound_emails table")
+            if engine.name == 'sqlite':
+                connection.execute(text("DROP INDEX ix_outbound_emails_status"))
+            else:  # MySQL
+                connection.execute(text("DROP INDEX ix_outbound_emails_status ON outbound_emails"))
+            connection.commit()
+    except Exception as e:
+        print(f"Error adding outbound_emails status index: {str(e)}")
+
+def add_announcement_counter_columns(connection):
+    """Add sent_count and failed_count columns to mail_announcements table"""
+    try:
+        inspector = inspect(engine)
+        if 'mail_announcements' not in inspector.get_table_names():
+            return
+        columns = [col['name'] for col in inspector.get_columns('mail_announcements')]
+
+        for column in ('sent_count', 'failed_count'):
+            if column not in columns:
+                print(f"Adding {column} column to mail_announcements table")
+                connection.execute(text(f"""
+                    ALTER TABLE mail_announcements
+                    ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0
+                """))
+                connection.commit()
+    except Exception as e:
+        print(f"Error adding announcement counter columns: {str(e)}")
+
 def add_picture_manually_deleted_column(connection):
     """Add picture_manually_deleted column to users table"""
     try:
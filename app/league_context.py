@@ -1,13 +1,19 @@
 #!/usr/bin/env python3
+import os
 import re
-from typing import Optional
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
 
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
-from .models import League, QRCode
+from .models import Event, League, QRCode, QRSet
 
 DEFAULT_LEAGUE_NAME = "Default League"
 DEFAULT_LEAGUE_SLUG = "default"
+# Seconds before a worker re-reads the leagues changed by another worker
+LEAGUE_REGISTRY_MAX_AGE = float(os.getenv("LEAGUE_REGISTRY_MAX_AGE", "60"))
 
 
 def slugify(value: str) -> str:
@@ -15,30 +21,124 @@ def slugify(value: str) -> str:
     return slug or DEFAULT_LEAGUE_SLUG
 
 
-def get_default_league(db: Session) -> League:
-    league = db.query(League).filter(League.slug == DEFAULT_LEAGUE_SLUG).first()
-    if league:
-        return league
-
-    league = db.query(League).order_by(League.id).first()
-    if league:
-        return league
-
-    league = League(
+class LeagueInfo(NamedTuple):
+    """The fields of a league that request handling needs, detached from any session."""
+    id: int
+    name: str
+    slug: str
+    description: Optional[str]
+    publisher_name: Optional[str]
+    is_active: bool
+
+
+class _LeagueIndex(NamedTuple):
+    by_id: Dict[int, LeagueInfo]
+    by_slug: Dict[str, LeagueInfo]
+    active: List[LeagueInfo]
+    default: Optional[LeagueInfo]
+    loaded_at: float
+
+
+class LeagueRegistry:
+    """
+    Every league indexed by id and slug, shared by the requests of this process.
+
+    Almost every page resolves the selected league and lists the active ones,
+    so they are read from memory instead of the leagues table. The registry is
+    loaded at startup and reloaded on the next access after invalidate() (called
+    when a league is created or changed) or after max_age seconds, which bounds
+    how long other worker processes serve an outdated list. version increases
+    each time a reload finds different leagues.
+    """
+
+    def __init__(self, max_age: float = LEAGUE_REGISTRY_MAX_AGE):
+        self.max_age = max_age
+        self.version = 0
+        self._index: Optional[_LeagueIndex] = None
+        self._lock = threading.Lock()
+
+    def load(self, db: Session) -> _LeagueIndex:
+        """Read every league in one query and replace the indexes."""
+        leagues = [
+            LeagueInfo(league.id, league.name, league.slug, league.description,
+                       league.publisher_name, bool(league.is_active))
+            for league in db.query(League).order_by(League.id)
+        ]
+        by_id = {league.id: league for league in leagues}
+        by_slug = {league.slug: league for league in leagues}
+        index = _LeagueIndex(
+            by_id=by_id,
+            by_slug=by_slug,
+            active=sorted((league for league in leagues if league.is_active), key=lambda league: league.name),
+            # The default slug, else the oldest league, as before leagues were cached
+            default=by_slug.get(DEFAULT_LEAGUE_SLUG) or (leagues[0] if leagues else None),
+            loaded_at=time.monotonic(),
+        )
+        with self._lock:
+            if self._index is None or self._index.by_id != by_id:
+                self.version += 1
+            self._index = index
+        return index
+
+    def current(self, db: Session) -> _LeagueIndex:
+        """The indexes, reloaded with db first if they were invalidated or are older than max_age."""
+        index = self._index
+        if index is None or time.monotonic() - index.loaded_at > self.max_age:
+            index = self.load(db)
+        return index
+
+    def invalidate(self) -> None:
+        """Reload on the next access, e.g. after a league was created or updated."""
+        with self._lock:
+            if self._index is not None:
+                self._index = self._index._replace(loaded_at=float("-inf"))
+
+    def clear(self) -> None:
+        """Forget every league, e.g. when switching to another database in tests."""
+        with self._lock:
+            self._index = None
+
+    def get(self, db: Session, league_id: int) -> Optional[LeagueInfo]:
+        return self.current(db).by_id.get(league_id)
+
+    def get_by_slug(self, db: Session, slug: str) -> Optional[LeagueInfo]:
+        return self.current(db).by_slug.get(slug)
+
+
+league_registry = LeagueRegistry()
+
+
+def invalidate_leagues() -> None:
+    """Call after creating, updating or deleting a league."""
+    league_registry.invalidate()
+
+
+def bootstrap_leagues(db: Session) -> LeagueInfo:
+    """Create the default league if there is no league yet and load the registry. Runs at startup."""
+    index = league_registry.load(db)
+    if index.default is not None:
+        return index.default
+    db.add(League(
         name=DEFAULT_LEAGUE_NAME,
         slug=DEFAULT_LEAGUE_SLUG,
         description="Default league for existing LeagueLedger data.",
         publisher_name="LeagueLedger",
         is_active=True,
-    )
-    db.add(league)
+    ))
     db.commit()
-    db.refresh(league)
+    return league_registry.load(db).default
+
+
+def get_default_league(db: Session) -> LeagueInfo:
+    league = league_registry.current(db).default
+    if league is None:
+        # Only when startup couldn't reach the database to bootstrap the leagues
+        league = bootstrap_leagues(db)
     return league
 
 
-def get_active_leagues(db: Session):
-    leagues = db.query(League).filter(League.is_active == True).order_by(League.name).all()
+def get_active_leagues(db: Session) -> List[LeagueInfo]:
+    leagues = league_registry.current(db).active
     if leagues:
         return leagues
     return [get_default_league(db)]
@@ -51,14 +151,36 @@ def parse_league_id(value) -> Optional[int]:
         return None
 
 
-def resolve_selected_league(db: Session, league_id: Optional[int]) -> League:
+def resolve_selected_league(db: Session, league_id: Optional[int]) -> LeagueInfo:
     if league_id:
-        league = db.query(League).filter(League.id == league_id, League.is_active == True).first()
-        if league:
+        league = league_registry.get(db, league_id)
+        if league and league.is_active:
             return league
     return get_default_league(db)
 
 
+def effective_qr_league_id():
+    """SQL expression for a QR code's league: its own, else its set's, else its event's.
+
+    Needs QRSet and Event outer-joined to QRCode, as in qr_code_with_league().
+    """
+    return func.coalesce(QRCode.league_id, QRSet.league_id, Event.league_id)
+
+
+def qr_code_with_league(db: Session, code: str) -> Tuple[Optional[QRCode], Optional[int]]:
+    """Load a QR code together with its effective league id in a single query."""
+    row = (
+        db.query(QRCode, effective_qr_league_id().label("effective_league_id"))
+        .outerjoin(QRSet, QRSet.id == QRCode.qr_set_id)
+        .outerjoin(Event, Event.id == QRCode.event_id)
+        .filter(QRCode.code == code)
+        .first()
+    )
+    if not row:
+        return None, None
+    return row[0], row[1]
+
+
 def qr_code_league_id(qr_code: QRCode) -> Optional[int]:
     if qr_code.league_id:
         return qr_code.league_id
@@ -1,8 +1,6 @@
 #!/usr/bin/env python3
 from fastapi import FastAPI, Request, Depends, Form
-from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
 from pathlib import Path
 import os
@@ -20,13 +18,26 @@ from sqlalchemy import text
 from .db import engine, get_db
 from . import models
 from .templates_config import templates
-from .views import qr, redeem, teams, admin, leaderboard, dashboard, static, pages, auth, convenience, setup
+from .views import qr, redeem, teams, admin, leaderboard, dashboard, static, pages, auth, convenience, setup, export, bulk_import, announcements, metrics, profiling
 from .db_init import init_db
+from .utils.mail import MAIL_QUEUE_ENABLED, mail_renderer
+from .utils.mail_queue import mail_worker
+from .utils.query_stats import QUERY_STATS_ENABLED, QueryStatsMiddleware, install_query_hooks
+from .utils.metrics import MetricsMiddleware, recent_errors_handler
+from .utils.profiling import ProfilingMiddleware
+from .utils.assets import build_assets
+from .utils.compression import CompressionMiddleware
+from .utils.rate_limit import RateLimitExceeded
+from .security import PASSWORD_HASH_RETRY_AFTER, PasswordHashingBusy, calibrate_password_hashing, password_hash_pool
 from .auth.middleware import SessionAuthBackend, on_auth_error
+from .auth.http_client import oauth_http_client
+from .auth.jwks import refresh_key_sets_periodically
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+# Keep recent errors in memory for the admin dashboard and the metrics endpoint
+logging.getLogger().addHandler(recent_errors_handler)
 
 # Load environment variables
 load_dotenv()
@@ -46,8 +57,20 @@ app.add_middleware(
 # Get secret key for the session
 SECRET_KEY = os.getenv("SECRET_KEY", "a-very-secure-secret-key-for-development")
 
+# User context middleware; added first so it runs inside SessionMiddleware and AuthenticationMiddleware
+@app.middleware("http")
+async def add_template_globals(request: Request, call_next):
+    """Add global variables to all templates."""
+    # AuthenticationMiddleware has already loaded the logged-in user from the session
+    user = request.scope.get("user")
+    request.state.user = user if user is not None and user.is_authenticated else None
+    return await call_next(request)
+
 # Important: Order of middleware matters!
-# First add AuthenticationMiddleware
+# Opt-in profiling runs inside AuthenticationMiddleware so it can check for admins
+app.add_middleware(ProfilingMiddleware)
+
+# Then add AuthenticationMiddleware
 app.add_middleware(
     AuthenticationMiddleware, 
     backend=SessionAuthBackend(),
@@ -57,6 +80,9 @@ app.add_middleware(
 # Then add SessionMiddleware (last added = first executed)
 app.add_middleware(SessionMiddleware, secret_key=SECRET_KEY)
 
+# Long-running background tasks started on startup (kept referenced so they aren't garbage collected)
+background_tasks = []
+
 # Function to check database connection
 async def check_db_connection(max_retries=10, initial_retry_delay=1):
     """
@@ -120,6 +146,19 @@ async def initialize_database():
 # Initialize database on startup
 @app.on_event("startup")
 async def startup_db_client():
+    # Fingerprint static assets (only writes files missing from the image build)
+    try:
+        await asyncio.to_thread(build_assets)
+    except OSError as e:
+        logger.warning(f"Could not build static assets, serving them unfingerprinted: {str(e)}")
+    # Compile page and email templates before the first request needs them
+    templates.precompile()
+    mail_renderer.precompile()
+    # Fit the password hash cost to this machine
+    await calibrate_password_hashing()
+    # Fetch and keep OAuth signing keys fresh so logins don't wait on them
+    background_tasks.append(asyncio.create_task(refresh_key_sets_periodically()))
+
     logger.info("Starting database initialization")
     
     # First, ensure database server is available with polling
@@ -133,54 +172,33 @@ async def startup_db_client():
             logger.info("Database setup completed successfully")
         else:
             logger.warning("Database initialization completed with errors")
+
+        # Keep the admin dashboard statistics warm in the background
+        background_tasks.append(asyncio.create_task(admin.refresh_dashboard_statistics_periodically()))
+
+        # Deliver queued emails outside of request handling
+        if MAIL_QUEUE_ENABLED:
+            background_tasks.append(asyncio.create_task(mail_worker.run()))
     else:
         logger.error("Failed to connect to database, application may not function correctly")
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    for task in background_tasks:
+        task.cancel()
+    password_hash_pool.shutdown()
+    await oauth_http_client.aclose()
 
-# Configure static files
+# Mount static files (fingerprinted assets, precompressed variants and cache headers)
 static.configure_static_files(app)
 
-# Setup Jinja2 templates
-templates = Jinja2Templates(directory="app/templates")
-
-# User context middleware
-@app.middleware("http")
-async def add_template_globals(request: Request, call_next):
-    """Add global variables to all templates."""
-    try:
-        # Set user in request state for templates
-        if hasattr(request, "session"):
-            user_id = request.session.get("user_id")
-            if user_id:
-                # Get a database session
-                from sqlalchemy.orm import Session
-                from .db import SessionLocal
-                from .models import User
-                
-                db = SessionLocal()
-                try:
-                    # Fetch actual user from database
-                    user = db.query(User).filter(User.id == user_id).first()
-                    if user:
-                        request.state.user = user
-                    else:
-                        request.state.user = None
-                finally:
-                    db.close()
-            else:
-                request.state.user = None
-        else:
-            request.state.user = None
-    except Exception as e:
-        # Log error but continue processing
-        logger.error(f"Error setting template globals: {str(e)}")
-        request.state.user = None
-        
-    # Continue with request
-    response = await call_next(request)
-    return response
+# Per-request query counting; added last so it is outermost and sees every statement
+if QUERY_STATS_ENABLED:
+    install_query_hooks(engine)
+    app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(MetricsMiddleware)
+# Compress text responses on their way out; outermost so error pages are compressed too
+app.add_middleware(CompressionMiddleware)
 
 # Handle exceptions
 @app.exception_handler(404)
@@ -192,6 +210,35 @@ async def not_found_exception_handler(request: Request, exc):
         status_code=404
     )
 
+@app.exception_handler(PasswordHashingBusy)
+async def password_hashing_busy_handler(request: Request, exc: PasswordHashingBusy):
+    """Turn logins away with a 503 while the password hash queue is full."""
+    return templates.TemplateResponse(
+        "error.html",
+        {
+            "request": request,
+            "error": "We're handling a lot of sign-ins right now",
+            "details": "Please try again in a few seconds.",
+        },
+        status_code=503,
+        headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER)},
+    )
+
+@app.exception_handler(RateLimitExceeded)
+async def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded):
+    """Answer requests over a login or redemption rate limit with a 429."""
+    retry_after = max(1, int(exc.retry_after + 0.999))
+    return templates.TemplateResponse(
+        "error.html",
+        {
+            "request": request,
+            "error": "Too many attempts",
+            "details": f"Please wait {retry_after} seconds before trying again.",
+        },
+        status_code=429,
+        headers={"Retry-After": str(retry_after)},
+    )
+
 # Routers
 app.include_router(setup.router, tags=["Setup"])  # Setup router for initial admin setup
 app.include_router(pages.router, tags=["Pages"])  # Pages router for index and static pages
@@ -199,8 +246,13 @@ app.include_router(auth.router, prefix="/auth", tags=["auth"])  # Include the au
 app.include_router(qr.router, prefix="/qr", tags=["QR"])
 app.include_router(redeem.router, prefix="/redeem", tags=["Redeem"])
 app.include_router(teams.router, prefix="/teams", tags=["teams"])
+app.include_router(export.router, prefix="/admin/export", tags=["Admin"])  # Before admin so /admin/{model_name} doesn't shadow it
+app.include_router(bulk_import.router, prefix="/admin/import", tags=["Admin"])
+app.include_router(announcements.router, prefix="/admin/announcements", tags=["Admin"])
+app.include_router(profiling.router, prefix="/admin/profiling", tags=["Admin"])
 app.include_router(admin.router, prefix="/admin", tags=["Admin"])
 app.include_router(leaderboard.router, prefix="/leaderboard", tags=["leaderboard"])
 app.include_router(dashboard.router, prefix="/dashboard", tags=["Dashboard"])
 app.include_router(static.router, tags=["Static"])  # Include the static router
 app.include_router(convenience.router, tags=["Convenience"])  # Include convenience routes
+app.include_router(metrics.router, tags=["Metrics"])
@@ -1,5 +1,5 @@
 #!/usr/bin/env python3
-from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, DateTime, Text, Float, UniqueConstraint, JSON
+from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, DateTime, Text, Float, UniqueConstraint, Index, JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from sqlalchemy.ext.declarative import declarative_base
@@ -299,3 +299,66 @@ class UserPoints(Base):
     
     # Relationships
     user = relationship("User", back_populates="points")
+
+
+class ArchivedRecord(Base):
+    """Snapshot of a row removed through the admin bulk delete with archiving enabled"""
+    __tablename__ = "archived_records"
+    id = Column(Integer, primary_key=True, index=True)
+    table_name = Column(String(100), nullable=False, index=True)
+    record_id = Column(Integer, nullable=False, index=True)
+    data = Column(JSON, nullable=False)  # Column values of the deleted row
+    archived_at = Column(DateTime, server_default=func.now())
+    archived_by = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+
+    def __repr__(self):
+        return f"<ArchivedRecord {self.table_name}#{self.record_id}>"
+
+
+class OutboundEmail(Base):
+    """Message waiting in (or processed by) the persistent outbound mail queue"""
+    __tablename__ = "outbound_emails"
+    id = Column(Integer, primary_key=True, index=True)
+    recipients = Column(Text, nullable=False)  # Comma separated addresses
+    subject = Column(String(255), nullable=False)
+    html_content = Column(Text, nullable=False)
+    plain_text_content = Column(Text, nullable=True)  # Generated by the worker when empty
+    status = Column(String(20), nullable=False, default="pending")  # pending, sending, sent, failed, cancelled
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+    priority = Column(Integer, nullable=False, default=0)  # Lower values are sent first
+    announcement_id = Column(Integer, ForeignKey("mail_announcements.id", ondelete="SET NULL"), nullable=True, index=True)
+    claimed_by = Column(String(64), nullable=True)
+    claimed_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, server_default=func.now())
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Serves the per-status counts of the metrics endpoint and the purge of old sent messages
+        Index("ix_outbound_emails_status_sent_at", "status", "sent_at"),
+    )
+
+    def __repr__(self):
+        return f"<OutboundEmail {self.id} {self.status}>"
+
+
+class MailAnnouncement(Base):
+    """Bulk email sent by an admin to the members of a league, event or team"""
+    __tablename__ = "mail_announcements"
+    id = Column(Integer, primary_key=True, index=True)
+    subject = Column(String(255), nullable=False)
+    body = Column(Text, nullable=False)
+    audience_type = Column(String(20), nullable=False)  # league, event or team
+    audience_id = Column(Integer, nullable=False)
+    status = Column(String(20), nullable=False, default="preparing")  # preparing, queued, failed
+    total_recipients = Column(Integer, nullable=False, default=0)
+    # Kept by the mail worker, since delivered messages are purged from the queue
+    sent_count = Column(Integer, nullable=False, default=0)
+    failed_count = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    created_by = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    created_at = Column(DateTime, server_default=func.now())
+
+    def __repr__(self):
+        return f"<MailAnnouncement {self.id} {self.audience_type}#{self.audience_id}>"
@@ -1,13 +1,168 @@
-from passlib.context import CryptContext
 from jose import JWTError, jwt
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from typing import Optional
+import asyncio
+import logging
+import os
+import re
 import secrets
 import string
+import threading
+import time
 import bcrypt
 
-# Password hashing
-# Use a simpler CryptContext configuration to avoid bcrypt.__about__ error
-pwd_context = CryptContext(schemes=["bcrypt"])
+try:
+    from argon2 import PasswordHasher as Argon2Hasher
+    from argon2.exceptions import InvalidHashError, VerificationError
+except ImportError:  # argon2-cffi is optional
+    Argon2Hasher = None
+
+from .utils.metrics import Counter, Gauge, Histogram, registry
+
+logger = logging.getLogger(__name__)
+
+# Password hashing policy; the cost is calibrated at startup so a hash takes
+# about PASSWORD_HASH_TARGET_MS on this hardware, within the configured bounds
+PASSWORD_HASH_SCHEME = os.getenv("PASSWORD_HASH_SCHEME", "bcrypt").lower()  # bcrypt or argon2
+PASSWORD_HASH_TARGET_MS = float(os.getenv("PASSWORD_HASH_TARGET_MS", "250"))  # 0 keeps the configured cost
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+BCRYPT_MIN_ROUNDS = int(os.getenv("BCRYPT_MIN_ROUNDS", "12"))
+BCRYPT_MAX_ROUNDS = int(os.getenv("BCRYPT_MAX_ROUNDS", "15"))
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "3"))
+ARGON2_MIN_TIME_COST = int(os.getenv("ARGON2_MIN_TIME_COST", "2"))
+ARGON2_MAX_TIME_COST = int(os.getenv("ARGON2_MAX_TIME_COST", "10"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "65536"))  # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "2"))
+
+BCRYPT_MAX_PASSWORD_BYTES = 72  # bcrypt ignores the rest; newer bcrypt releases refuse longer input
+BCRYPT_HASH_PATTERN = re.compile(r"^\$2[abxy]?\$(\d{2})\$")
+ARGON2_HASH_PATTERN = re.compile(r"^\$argon2(?:id|i|d)\$v=\d+\$m=(\d+),t=(\d+),p=(\d+)\$")
+
+PASSWORD_HASH_COST = registry.register(Gauge(
+    "leagueledger_password_hash_cost",
+    "Cost parameter new password hashes are created with (bcrypt rounds or argon2 time cost).",
+    ["scheme"],
+))
+
+
+class PasswordHashPolicy:
+    """
+    Hashes new passwords with the configured scheme and cost, verifies hashes
+    of any supported scheme, and tells whether a stored hash is weaker than
+    the policy so it can be replaced after a successful login.
+    """
+
+    def __init__(self, scheme: str = PASSWORD_HASH_SCHEME, bcrypt_rounds: int = BCRYPT_ROUNDS,
+                 argon2_time_cost: int = ARGON2_TIME_COST, argon2_memory_cost: int = ARGON2_MEMORY_COST,
+                 argon2_parallelism: int = ARGON2_PARALLELISM):
+        if scheme == "argon2" and Argon2Hasher is None:
+            logger.warning("PASSWORD_HASH_SCHEME=argon2 but argon2-cffi is not installed; using bcrypt")
+            scheme = "bcrypt"
+        if scheme not in ("bcrypt", "argon2"):
+            raise ValueError(f"Unsupported password hash scheme {scheme}")
+        self.scheme = scheme
+        self.bcrypt_rounds = bcrypt_rounds
+        self.argon2_time_cost = argon2_time_cost
+        self.argon2_memory_cost = argon2_memory_cost
+        self.argon2_parallelism = argon2_parallelism
+        self._argon2 = None
+        self._update_cost_metric()
+
+    @property
+    def cost(self) -> int:
+        return self.bcrypt_rounds if self.scheme == "bcrypt" else self.argon2_time_cost
+
+    def _update_cost_metric(self) -> None:
+        PASSWORD_HASH_COST.set(self.cost, scheme=self.scheme)
+
+    def _argon2_hasher(self):
+        if self._argon2 is None:
+            self._argon2 = Argon2Hasher(
+                time_cost=self.argon2_time_cost,
+                memory_cost=self.argon2_memory_cost,
+                parallelism=self.argon2_parallelism,
+            )
+        return self._argon2
+
+    @staticmethod
+    def _bcrypt_secret(password: str) -> bytes:
+        return password.encode("utf-8")[:BCRYPT_MAX_PASSWORD_BYTES]
+
+    def hash(self, password: str) -> str:
+        if self.scheme == "argon2":
+            return self._argon2_hasher().hash(password)
+        return bcrypt.hashpw(self._bcrypt_secret(password), bcrypt.gensalt(self.bcrypt_rounds)).decode("ascii")
+
+    def verify(self, password: str, hashed: Optional[str]) -> bool:
+        if not hashed:
+            return False
+        if hashed.startswith("$argon2"):
+            if Argon2Hasher is None:
+                logger.error("Found an argon2 password hash but argon2-cffi is not installed")
+                return False
+            try:
+                return self._argon2_hasher().verify(hashed, password)
+            except (VerificationError, InvalidHashError):
+                return False
+        try:
+            return bcrypt.checkpw(self._bcrypt_secret(password), hashed.encode("ascii"))
+        except ValueError:
+            return False
+
+    def needs_rehash(self, hashed: Optional[str]) -> bool:
+        """True for hashes of another scheme or with a lower cost than the policy."""
+        if not hashed:
+            return False
+        if self.scheme == "bcrypt":
+            match = BCRYPT_HASH_PATTERN.match(hashed)
+            return not match or int(match.group(1)) < self.bcrypt_rounds
+        match = ARGON2_HASH_PATTERN.match(hashed)
+        if not match:
+            return True
+        memory_cost, time_cost, _ = (int(value) for value in match.groups())
+        return time_cost < self.argon2_time_cost or memory_cost < self.argon2_memory_cost
+
+    def calibrate(self, target_ms: float = PASSWORD_HASH_TARGET_MS) -> int:
+        """
+        Pick the highest cost whose hash takes at most target_ms on this machine,
+        within the configured minimum and maximum. Returns the chosen cost.
+        """
+        if target_ms <= 0:
+            return self.cost
+        if self.scheme == "bcrypt":
+            # Measure a cheap cost and extrapolate; each extra round doubles the work
+            rounds = min(BCRYPT_MIN_ROUNDS, 10)
+            elapsed = self._time_hash(lambda: bcrypt.hashpw(b"calibration", bcrypt.gensalt(rounds)))
+            while rounds < BCRYPT_MAX_ROUNDS and elapsed * 2 <= target_ms:
+                rounds += 1
+                elapsed *= 2
+            self.bcrypt_rounds = max(rounds, BCRYPT_MIN_ROUNDS)
+        else:
+            # Time cost scales the work linearly
+            probe = Argon2Hasher(time_cost=ARGON2_MIN_TIME_COST, memory_cost=self.argon2_memory_cost,
+                                 parallelism=self.argon2_parallelism)
+            per_pass = self._time_hash(lambda: probe.hash("calibration")) / ARGON2_MIN_TIME_COST
+            time_cost = int(target_ms // per_pass) if per_pass else ARGON2_MAX_TIME_COST
+            self.argon2_time_cost = max(ARGON2_MIN_TIME_COST, min(ARGON2_MAX_TIME_COST, time_cost))
+            self._argon2 = None
+        self._update_cost_metric()
+        logger.info(f"Password hashing calibrated to {self.scheme} cost {self.cost} for a {target_ms:.0f} ms target")
+        return self.cost
+
+    @staticmethod
+    def _time_hash(func, repeat: int = 3) -> float:
+        """Fastest of a few runs, in milliseconds."""
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            elapsed = (time.perf_counter() - started) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+
+password_policy = PasswordHashPolicy()
 
 # JWT settings
 SECRET_KEY = "CHANGE_THIS_TO_A_STRONG_SECRET_KEY_IN_PRODUCTION"
@@ -16,11 +171,94 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 def verify_password(plain_password, hashed_password):
     """Verify if the plain password matches the hashed one."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_policy.verify(plain_password, hashed_password)
 
 def get_password_hash(password):
     """Hash a password for storing."""
-    return pwd_context.hash(password)
+    return password_policy.hash(password)
+
+def password_needs_rehash(hashed_password):
+    """Whether a stored hash should be replaced with one made under the current policy."""
+    return password_policy.needs_rehash(hashed_password)
+
+# Hashing runs in a dedicated pool so a burst of logins can't block the event loop
+# or take every threadpool slot; bcrypt releases the GIL, so threads run in parallel
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))  # Waiting and running operations
+PASSWORD_HASH_RETRY_AFTER = 5  # Seconds suggested to clients turned away while the pool is full
+
+PASSWORD_HASH_QUEUE_DEPTH = registry.register(Gauge(
+    "leagueledger_password_hash_queue_depth",
+    "Password hash operations waiting or running.",
+))
+PASSWORD_HASH_REJECTED = registry.register(Counter(
+    "leagueledger_password_hash_rejected_total",
+    "Password hash operations refused because the queue was full.",
+    ["operation"],
+))
+PASSWORD_HASH_DURATION = registry.register(Histogram(
+    "leagueledger_password_hash_duration_seconds",
+    "Time from submitting a password hash operation to its result, including queueing.",
+    ["operation"],
+))
+
+
+class PasswordHashingBusy(Exception):
+    """Raised when too many password hash operations are already queued."""
+
+
+class PasswordHashPool:
+    """Bounded thread pool for password hashing and verification."""
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_queue: int = PASSWORD_HASH_MAX_QUEUE):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.depth = 0
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        return self._executor
+
+    async def run(self, operation: str, func, *args):
+        """Run func(*args) in the pool, or raise PasswordHashingBusy if the queue is full."""
+        with self._lock:
+            if self.depth >= self.max_queue:
+                PASSWORD_HASH_REJECTED.inc(operation=operation)
+                raise PasswordHashingBusy(operation)
+            self.depth += 1
+            executor = self._get_executor()
+        PASSWORD_HASH_QUEUE_DEPTH.inc()
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+        finally:
+            with self._lock:
+                self.depth -= 1
+            PASSWORD_HASH_QUEUE_DEPTH.dec()
+            PASSWORD_HASH_DURATION.observe(time.perf_counter() - started, operation=operation)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+password_hash_pool = PasswordHashPool()
+
+async def verify_password_async(plain_password, hashed_password):
+    """verify_password in the password hash pool; raises PasswordHashingBusy when saturated."""
+    return await password_hash_pool.run("verify", verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    """get_password_hash in the password hash pool; raises PasswordHashingBusy when saturated."""
+    return await password_hash_pool.run("hash", get_password_hash, password)
+
+async def calibrate_password_hashing():
+    """Benchmark the hash cost in the hash pool, off the event loop."""
+    return await password_hash_pool.run("calibrate", password_policy.calibrate)
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
     """Create JWT access token."""
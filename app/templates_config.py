@@ -1,19 +1,73 @@
 #!/usr/bin/env python3
 from fastapi.templating import Jinja2Templates
 from pathlib import Path
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, TemplateError, select_autoescape
 from starlette.templating import _TemplateResponse
 from datetime import datetime
-from typing import Any
+from typing import Any, Optional
+import logging
+import os
+
+from .utils.assets import asset_url
+from .utils.fragment_cache import FragmentCacheExtension
+from .utils.profile_pictures import profile_picture
+
+logger = logging.getLogger(__name__)
 
 BASE_DIR = Path(__file__).resolve().parent
 
-# Create a Jinja2 Environment with the 'jinja2.ext.do' extension
+# Re-read changed templates on every render only while developing
+TEMPLATE_AUTO_RELOAD = os.getenv("TEMPLATE_AUTO_RELOAD", os.getenv("DEBUG", "False")).lower() in ("true", "1", "yes")
+# Compiled templates are persisted here so restarted workers skip compilation (Jinja's per-user temp dir if unset)
+TEMPLATE_BYTECODE_CACHE = os.getenv("TEMPLATE_BYTECODE_CACHE", "True").lower() in ("true", "1", "yes")
+TEMPLATE_BYTECODE_CACHE_DIR = os.getenv("TEMPLATE_BYTECODE_CACHE_DIR") or None
+
+
+def template_bytecode_cache(prefix: str = "web") -> Optional[FileSystemBytecodeCache]:
+    """
+    Persistent bytecode cache shared by the worker processes.
+
+    Cache keys only depend on the template name, so environments compiled with
+    different options (e.g. autoescaping) need their own prefix.
+    """
+    if not TEMPLATE_BYTECODE_CACHE:
+        return None
+    if TEMPLATE_BYTECODE_CACHE_DIR:
+        os.makedirs(TEMPLATE_BYTECODE_CACHE_DIR, exist_ok=True)
+    return FileSystemBytecodeCache(TEMPLATE_BYTECODE_CACHE_DIR, pattern=f"__leagueledger_{prefix}_%s.cache")
+
+
+def create_template_environment(directory: str) -> Environment:
+    """The Jinja environment shared by every page template."""
+    return Environment(
+        loader=FileSystemLoader(directory),
+        autoescape=select_autoescape(),
+        extensions=['jinja2.ext.do', FragmentCacheExtension],
+        auto_reload=TEMPLATE_AUTO_RELOAD,
+        bytecode_cache=template_bytecode_cache(),
+        cache_size=-1,  # Every template stays compiled once loaded
+    )
+
+
 class MyJinjaTemplates(Jinja2Templates):
     def __init__(self, directory: str, **kwargs: Any):
-        super().__init__(directory=directory, **kwargs)
-        self.env.add_extension('jinja2.ext.do')
+        super().__init__(env=create_template_environment(directory), **kwargs)
         self.env.globals['now'] = datetime.now  # Add 'now' function
+        self.env.globals['profile_picture'] = profile_picture  # Resized profile picture URLs
+        self.env.globals['asset_url'] = asset_url  # Fingerprinted static file URLs
+
+    def precompile(self) -> int:
+        """Compile every page template up front. Returns the number of templates loaded."""
+        count = 0
+        # Email templates are rendered by the mail environment (utils.mail)
+        for name in self.env.list_templates(filter_func=lambda name: not name.startswith("email/")):
+            try:
+                self.env.get_template(name)
+                count += 1
+            except TemplateError as e:
+                logger.error(f"Could not compile template {name}: {e}")
+        logger.info(f"Precompiled {count} templates")
+        return count
 
     def TemplateResponse(self, *args: Any, **kwargs: Any) -> _TemplateResponse:
         """Support existing pre-Starlette 0.29 TemplateResponse calls."""
@@ -0,0 +1,185 @@
+"""
+Fingerprinted, precompressed static assets for LeagueLedger.
+
+build_assets() copies every stylesheet, script and image under app/static
+to app/static/dist with a content hash in its name (css/styles.css becomes
+dist/css/styles.1a2b3c4d5e6f.css), writes gzip (and, with the brotli
+package installed, brotli) versions of the compressible ones, and records
+the names in dist/manifest.json. Templates link assets with
+asset_url("css/styles.css"), so a changed file gets a new URL and the
+hashed files can be cached by browsers for a year.
+
+Run it during the image build with `python -m app.utils.assets`; startup
+runs it again, which only writes files that are missing.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import stat
+import tempfile
+from pathlib import Path
+from typing import Dict, Optional
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+from .compression import accepted_encodings
+
+try:
+    import brotli
+except ImportError:  # Optional dependency, gzip is always available
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
+DIST_DIR_NAME = "dist"
+MANIFEST_NAME = "manifest.json"
+STATIC_URL = "/static"
+
+# Serve fingerprinted URLs unless developing, where files change under a running server
+ASSET_FINGERPRINTING = os.getenv("ASSET_FINGERPRINTING", str(os.getenv("DEBUG", "False").lower() not in ("true", "1", "yes"))).lower() in ("true", "1", "yes")
+# Cache lifetime for static URLs without a fingerprint (favicons, files linked directly)
+STATIC_MAX_AGE = int(os.getenv("STATIC_MAX_AGE", "3600"))
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Generated or user-provided files that are never fingerprinted
+EXCLUDED_DIRS = {DIST_DIR_NAME, "uploads"}
+# Files under these prefixes never change once written, so they are cached like fingerprinted ones
+IMMUTABLE_PREFIXES = (f"{DIST_DIR_NAME}/", "uploads/profile_pictures/")
+COMPRESSIBLE_SUFFIXES = {".css", ".js", ".svg", ".json", ".webmanifest", ".ico", ".txt", ".map", ".xml"}
+# Content negotiation order: smallest first
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+_manifest: Optional[Dict[str, str]] = None
+
+mimetypes.add_type("application/manifest+json", ".webmanifest")
+
+
+def fingerprinted_name(relative_path: str, data: bytes) -> str:
+    """dist/<dir>/<stem>.<hash>.<suffix> for a path relative to the static directory."""
+    path = Path(relative_path)
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    return (Path(DIST_DIR_NAME) / path.parent / f"{path.stem}.{digest}{path.suffix}").as_posix()
+
+
+def _write_atomically(path: Path, data: bytes) -> None:
+    """Write via a temporary file so concurrently starting workers never serve a partial file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temporary = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            out.write(data)
+        os.chmod(temporary, 0o644)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def _precompress(path: Path, data: bytes) -> None:
+    """Write .gz and .br next to path when they save at least a tenth of the size."""
+    variants = {".gz": lambda: gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[".br"] = lambda: brotli.compress(data, quality=11)
+    for suffix, compress in variants.items():
+        target = path.with_name(path.name + suffix)
+        if target.exists():
+            continue
+        compressed = compress()
+        if len(compressed) <= len(data) * 0.9:
+            _write_atomically(target, compressed)
+
+
+def build_assets(static_dir: Path = STATIC_DIR) -> Dict[str, str]:
+    """Fingerprint and precompress the static files and write the manifest. Returns the manifest."""
+    global _manifest
+    manifest = {}
+    for source in sorted(static_dir.rglob("*")):
+        relative = source.relative_to(static_dir)
+        if not source.is_file() or relative.parts[0] in EXCLUDED_DIRS or source.name.startswith("."):
+            continue
+        data = source.read_bytes()
+        hashed = fingerprinted_name(relative.as_posix(), data)
+        target = static_dir / hashed
+        if not target.exists():
+            _write_atomically(target, data)
+        if source.suffix.lower() in COMPRESSIBLE_SUFFIXES:
+            _precompress(target, data)
+        manifest[relative.as_posix()] = hashed
+    _write_atomically(
+        static_dir / DIST_DIR_NAME / MANIFEST_NAME,
+        json.dumps(manifest, indent=2, sort_keys=True).encode(),
+    )
+    if static_dir == STATIC_DIR:
+        _manifest = manifest
+    logger.info(f"Fingerprinted {len(manifest)} static assets")
+    return manifest
+
+
+def load_manifest(static_dir: Path = STATIC_DIR) -> Dict[str, str]:
+    """Read the manifest written by build_assets (empty if it hasn't run)."""
+    try:
+        return json.loads((static_dir / DIST_DIR_NAME / MANIFEST_NAME).read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def asset_url(path: str) -> str:
+    """URL of a static file, fingerprinted when it is in the manifest."""
+    global _manifest
+    path = path.lstrip("/")
+    if ASSET_FINGERPRINTING:
+        if _manifest is None:
+            _manifest = load_manifest()
+        path = _manifest.get(path, path)
+    return f"{STATIC_URL}/{path}"
+
+
+class AssetStaticFiles(StaticFiles):
+    """
+    StaticFiles that sets Cache-Control and, when the client accepts it,
+    serves the precompressed .br or .gz version of a file.
+    """
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200):
+        request_headers = Headers(scope=scope)
+        relative = Path(os.path.relpath(full_path, self.directory)).as_posix()
+        immutable = relative.startswith(IMMUTABLE_PREFIXES)
+        headers = {"Cache-Control": IMMUTABLE_CACHE_CONTROL if immutable else f"public, max-age={STATIC_MAX_AGE}"}
+
+        path, encoding = full_path, None
+        if Path(full_path).suffix.lower() in COMPRESSIBLE_SUFFIXES:
+            headers["Vary"] = "Accept-Encoding"
+            path, stat_result, encoding = self._negotiate(full_path, stat_result, request_headers)
+        if encoding:
+            headers["Content-Encoding"] = encoding
+
+        media_type = mimetypes.guess_type(str(full_path))[0] or "text/plain"
+        response = FileResponse(path, status_code=status_code, headers=headers, media_type=media_type, stat_result=stat_result)
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+    @staticmethod
+    def _negotiate(full_path, stat_result, request_headers: Headers):
+        accepted = accepted_encodings(request_headers.get("accept-encoding", ""))
+        for encoding, suffix in ENCODINGS:
+            if encoding not in accepted:
+                continue
+            try:
+                variant_stat = os.stat(f"{full_path}{suffix}")
+            except OSError:
+                continue
+            if stat.S_ISREG(variant_stat.st_mode):
+                return f"{full_path}{suffix}", variant_stat, encoding
+        return full_path, stat_result, None
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    build_assets()
@@ -0,0 +1,171 @@
+"""
+Response compression for LeagueLedger.
+
+CompressionMiddleware compresses text responses (HTML, JSON, CSS, CSV, ...)
+with brotli when the client accepts it and the optional brotli package is
+installed, and with gzip otherwise. It leaves alone:
+
+- content types outside COMPRESSIBLE_TYPES, e.g. the PNG and PDF output of
+  the QR code views, which is already compressed,
+- responses that already have a Content-Encoding (precompressed static files),
+- single-part bodies smaller than COMPRESSION_MIN_SIZE,
+- partial content and responses marked Cache-Control: no-transform.
+
+Streaming responses (e.g. CSV exports) are compressed chunk by chunk and
+flushed after each one, so the client still receives data as it is produced.
+"""
+import os
+import zlib
+from typing import Optional, Set
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # Optional dependency, gzip is always available
+    brotli = None
+
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "True").lower() in ("true", "1", "yes")
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "500"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+# Brotli's high qualities are too slow for per-request compression
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+COMPRESSIBLE_TYPES = {
+    "text/html",
+    "text/plain",
+    "text/css",
+    "text/csv",
+    "text/javascript",
+    "text/xml",
+    "application/javascript",
+    "application/json",
+    "application/xml",
+    "application/manifest+json",
+    "image/svg+xml",
+}
+
+
+def accepted_encodings(accept_encoding: str) -> Set[str]:
+    """The content codings an Accept-Encoding header allows (those not given q=0)."""
+    accepted = set()
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        quality = params.replace(" ", "").lower()
+        if quality.startswith("q=") and quality[2:].strip("0.") == "":
+            continue
+        if coding.strip():
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class _GzipEncoder:
+    encoding = "gzip"
+
+    def __init__(self):
+        self._compressor = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        flush_mode = zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH
+        return self._compressor.compress(data) + self._compressor.flush(flush_mode)
+
+
+class _BrotliEncoder:
+    encoding = "br"
+
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        output = self._compressor.process(data)
+        return output + (self._compressor.finish() if final else self._compressor.flush())
+
+
+def choose_encoder(accept_encoding: str):
+    """A new encoder for the best coding the client accepts, or None."""
+    accepted = accepted_encodings(accept_encoding)
+    if brotli is not None and "br" in accepted:
+        return _BrotliEncoder()
+    if "gzip" in accepted:
+        return _GzipEncoder()
+    return None
+
+
+def is_compressible(headers: Headers) -> bool:
+    media_type = headers.get("content-type", "").split(";")[0].strip().lower()
+    return (
+        media_type in COMPRESSIBLE_TYPES
+        and "content-encoding" not in headers
+        and "no-transform" not in headers.get("cache-control", "").lower()
+    )
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing text responses with brotli or gzip."""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not COMPRESSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        encoder = choose_encoder(Headers(scope=scope).get("accept-encoding", ""))
+        if encoder is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[dict] = None
+        compressing: Optional[bool] = None
+
+        async def send_compressed(message):
+            nonlocal start_message, compressing
+            if message["type"] == "http.response.start":
+                # Hold the headers back until the first body chunk shows whether to compress
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or compressing is False:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressing is None:
+                headers = Headers(raw=start_message["headers"])
+                compressing = (
+                    start_message["status"] not in (204, 206, 304)
+                    and is_compressible(headers)
+                    and (more_body or len(body) >= self.minimum_size)
+                )
+                if not compressing:
+                    await send(start_message)
+                    await send(message)
+                    return
+                headers = MutableHeaders(raw=list(start_message["headers"]))
+                headers["Content-Encoding"] = encoder.encoding
+                if "accept-encoding" not in headers.get("vary", "").lower():
+                    headers.add_vary_header("Accept-Encoding")
+                if headers.get("etag", "").startswith('"'):
+                    # The compressed body is a different representation of the resource
+                    headers["ETag"] = "W/" + headers["etag"]
+                if more_body:
+                    del headers["Content-Length"]
+                    await send({**start_message, "headers": headers.raw})
+                else:
+                    compressed = encoder.compress(body, final=True)
+                    headers["Content-Length"] = str(len(compressed))
+                    await send({**start_message, "headers": headers.raw})
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+
+            await send({
+                "type": "http.response.body",
+                "body": encoder.compress(body, final=not more_body),
+                "more_body": more_body,
+            })
+
+        await self.app(scope, receive, send_compressed)
+        if start_message is not None and compressing is None:
+            # The response ended without a body message
+            await send(start_message)
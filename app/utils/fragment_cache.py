@@ -0,0 +1,78 @@
+"""
+Template fragment caching for LeagueLedger.
+
+Wrap an expensive part of a template in a cache block, naming the fragment
+and listing every value its output depends on:
+
+    {% cache "leaderboard", selected_league.id, timeframe, ttl=60 %}
+        ...
+    {% endcache %}
+
+The rendered HTML is reused for the same name and keys until the TTL runs
+out or invalidate_fragments() is called for the name (and optionally its
+leading keys) after a write that changes the fragment's data. Each block's
+template and line are added to its key, so blocks sharing a name are
+cached separately but invalidated together.
+"""
+import os
+from typing import Any, Hashable
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+
+from .cache import TTLCache
+
+FRAGMENT_CACHE_ENABLED = os.getenv("FRAGMENT_CACHE_ENABLED", "True").lower() in ("true", "1", "yes")
+FRAGMENT_CACHE_TTL = int(os.getenv("FRAGMENT_CACHE_TTL", "300"))
+FRAGMENT_CACHE_SIZE = int(os.getenv("FRAGMENT_CACHE_SIZE", "5000"))
+
+fragment_cache = TTLCache(FRAGMENT_CACHE_TTL, maxsize=FRAGMENT_CACHE_SIZE, name="template_fragments")
+
+
+def fragment_key_part(value: Any) -> Hashable:
+    """Keys come from template expressions; make lists and dicts usable as cache keys."""
+    if isinstance(value, (list, tuple)):
+        return tuple(fragment_key_part(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, fragment_key_part(item)) for key, item in value.items()))
+    return value
+
+
+def invalidate_fragments(name: str = None, *keys: Any) -> None:
+    """
+    Drop cached fragments: all of them, every fragment called name, or only
+    those of name whose keys start with keys (e.g. one league's leaderboard).
+    """
+    if name is None:
+        fragment_cache.clear()
+        return
+    prefix = (name,) + tuple(fragment_key_part(key) for key in keys)
+    fragment_cache.invalidate_where(lambda key: key[:len(prefix)] == prefix)
+
+
+class FragmentCacheExtension(Extension):
+    """Adds the {% cache name, key, ... [, ttl=seconds] %} ... {% endcache %} tag."""
+
+    tags = {"cache"}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        keys = [parser.parse_expression()]
+        ttl = nodes.Const(None)
+        while parser.stream.skip_if("comma"):
+            if parser.stream.current.test("name:ttl") and parser.stream.look().test("assign"):
+                next(parser.stream)
+                next(parser.stream)
+                ttl = parser.parse_expression()
+            else:
+                keys.append(parser.parse_expression())
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        location = nodes.Const(f"{parser.name}:{lineno}")
+        call = self.call_method("_render_cached", [nodes.List(keys), location, ttl])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _render_cached(self, keys, location, ttl, caller):
+        if not FRAGMENT_CACHE_ENABLED:
+            return caller()
+        key = tuple(fragment_key_part(key) for key in keys) + (location,)
+        return fragment_cache.get_or_set(key, caller, ttl)
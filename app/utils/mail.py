@@ -4,19 +4,26 @@ Email utility module for LeagueLedger using Python's built-in email and smtplib
 import os
 import smtplib
 import asyncio
+import threading
+import time
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.utils import formatdate
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, Iterable, Iterator, NamedTuple, Optional, Tuple, Union
 from fastapi import BackgroundTasks
 from pydantic import EmailStr
 from dotenv import load_dotenv
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment, FileSystemLoader, Template
+from markupsafe import escape
 import logging
 import re
 from bs4 import BeautifulSoup
 
+from ..i18n import DEFAULT_LANGUAGE, get_translation
+from ..templates_config import template_bytecode_cache
+from .cache import TTLCache
+
 # Setup logging
 logger = logging.getLogger(__name__)
 
@@ -32,11 +39,15 @@ MAIL_PORT = int(os.getenv("MAIL_PORT", "587"))
 MAIL_FROM_NAME = os.getenv("MAIL_FROM_NAME", "LeagueLedger")
 MAIL_STARTTLS = os.getenv("MAIL_STARTTLS", "True").lower() == "true"
 MAIL_SSL_TLS = os.getenv("MAIL_SSL_TLS", "False").lower() == "true"
+MAIL_SMTP_TIMEOUT = float(os.getenv("MAIL_SMTP_TIMEOUT", "30"))
+MAIL_SMTP_MAX_MESSAGES = int(os.getenv("MAIL_SMTP_MAX_MESSAGES", "100"))  # Messages per connection before reconnecting
+MAIL_QUEUE_ENABLED = os.getenv("MAIL_QUEUE_ENABLED", "True").lower() == "true"
 APP_BASE_URL = os.getenv("LEAGUELEDGER_BASE_URL", os.getenv("APP_BASE_URL", "http://localhost:8000"))
 
 # Configure Jinja2 for email templates
 template_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates")
-env = Environment(loader=FileSystemLoader(template_dir))
+MAIL_TEMPLATE_CACHE_SIZE = int(os.getenv("MAIL_TEMPLATE_CACHE_SIZE", "256"))
+MAIL_TEMPLATE_CACHE_TTL = int(os.getenv("MAIL_TEMPLATE_CACHE_TTL", "3600"))
 
 def html_to_plain_text(html_content):
     """
@@ -64,6 +75,138 @@ def html_to_plain_text(html_content):
         plain = re.sub('<.*?>', '', html_content)
         return plain.replace('&nbsp;', ' ').strip()
 
+class RenderedEmail(NamedTuple):
+    html: str
+    text: str
+
+class MailRenderer:
+    """
+    Renders email templates with the expensive work done once per template.
+
+    Templates are compiled up front by precompile(). For each template, locale
+    and set of shared values the renderer keeps a "skeleton": the HTML and its
+    plain text version rendered with placeholder tokens in place of the
+    per-recipient values. Rendering for a recipient then only substitutes the
+    tokens, so BeautifulSoup runs once per skeleton instead of once per email.
+
+    Per-recipient values must be strings the template outputs verbatim (no
+    filters or comparisons); anything else belongs in the shared values.
+    """
+
+    PLACEHOLDER = "[[[mail:{}]]]"
+    PLACEHOLDER_PATTERN = re.compile(r"\[\[\[mail:(\w+)\]\]\]")
+
+    def __init__(self, directory: str = template_dir, locale: str = DEFAULT_LANGUAGE):
+        self.env = Environment(
+            loader=FileSystemLoader(directory),
+            extensions=["jinja2.ext.i18n"],
+            auto_reload=False,
+            bytecode_cache=template_bytecode_cache("mail"),
+            cache_size=-1,
+        )
+        self.default_locale = locale
+        self._templates: Dict[str, Template] = {}
+        self._skeletons = TTLCache(ttl=MAIL_TEMPLATE_CACHE_TTL, maxsize=MAIL_TEMPLATE_CACHE_SIZE, name="mail_templates")
+        self._lock = threading.Lock()
+
+    def precompile(self) -> int:
+        """Compile every email template. Returns the number of templates loaded."""
+        for name in self.env.list_templates(filter_func=lambda name: name.startswith("email/")):
+            self.get_template(name)
+        logger.info(f"Precompiled {len(self._templates)} email templates")
+        return len(self._templates)
+
+    def get_template(self, name: str) -> Template:
+        template = self._templates.get(name)
+        if template is None:
+            template = self.env.get_template(name)
+            self._templates[name] = template
+        return template
+
+    def _skeleton(self, name: str, locale: str, shared: Dict[str, Any], fields: Tuple[str, ...]) -> RenderedEmail:
+        key = (name, locale, tuple(sorted((k, repr(v)) for k, v in shared.items())), fields)
+        skeleton = self._skeletons.get(key)
+        if skeleton is None:
+            context = dict(shared)
+            context.update({field: self.PLACEHOLDER.format(field) for field in fields})
+            # Installing translations mutates the shared environment
+            with self._lock:
+                self.env.install_gettext_translations(get_translation(locale), newstyle=True)
+                html = self.get_template(name).render(**context)
+            skeleton = RenderedEmail(html, html_to_plain_text(html))
+            self._skeletons.set(key, skeleton)
+        return skeleton
+
+    def render(self, name: str, shared: Optional[Dict[str, Any]] = None,
+               locale: Optional[str] = None, **personal: Any) -> RenderedEmail:
+        """
+        Render a template for one recipient.
+
+        shared holds values common to many recipients (part of the cache key);
+        keyword arguments are the recipient's own values. Empty or non-string
+        personal values are treated as shared since templates may branch on them.
+        """
+        locale = locale or self.default_locale
+        shared = dict(shared or {})
+        fields = []
+        for field, value in personal.items():
+            if isinstance(value, str) and value:
+                fields.append(field)
+            else:
+                shared[field] = value
+        skeleton = self._skeleton(name, locale, shared, tuple(sorted(fields)))
+
+        def substitute(content: str, escape_values: bool) -> str:
+            def replace(match):
+                value = personal.get(match.group(1))
+                if value is None:
+                    return match.group(0)
+                return str(escape(value)) if escape_values else value
+            return self.PLACEHOLDER_PATTERN.sub(replace, content)
+
+        return RenderedEmail(substitute(skeleton.html, True), substitute(skeleton.text, False))
+
+    def render_many(self, name: str, recipients: Iterable[Dict[str, Any]],
+                    shared: Optional[Dict[str, Any]] = None,
+                    locale: Optional[str] = None) -> Iterator[RenderedEmail]:
+        """Render a template for each recipient's personal values, sharing one skeleton."""
+        for personal in recipients:
+            yield self.render(name, shared=shared, locale=locale, **personal)
+
+    def clear(self):
+        self._skeletons.clear()
+
+mail_renderer = MailRenderer()
+env = mail_renderer.env
+
+def build_message(
+    recipients: List[str],
+    subject: str,
+    html_content: str,
+    plain_text_content: Optional[str] = None
+) -> MIMEMultipart:
+    """Build the multipart/alternative message for an email with HTML and plain text parts."""
+    # Generate plain text from HTML if not provided
+    if plain_text_content is None:
+        plain_text_content = html_to_plain_text(html_content)
+
+    # Create multipart message container
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = subject
+    msg['From'] = f"{MAIL_FROM_NAME} <{MAIL_FROM}>"
+    msg['To'] = ", ".join(recipients)
+    msg['Date'] = formatdate(localtime=True)
+
+    # Attach plain text part first (will be displayed if HTML not supported)
+    # RFC 2046 defines that the last part is preferred
+    part1 = MIMEText(plain_text_content, 'plain', 'utf-8')
+    msg.attach(part1)
+
+    # Attach HTML part last (will be preferred by most email clients)
+    part2 = MIMEText(html_content, 'html', 'utf-8')
+    msg.attach(part2)
+    return msg
+
 async def _send_email_async(
     email_to: Union[str, List[str]],
     subject: str,
@@ -77,26 +220,8 @@ async def _send_email_async(
     # Convert single email to list if needed
     recipients = [email_to] if isinstance(email_to, str) else email_to
     
-    # Generate plain text from HTML if not provided
-    if plain_text_content is None:
-        plain_text_content = html_to_plain_text(html_content)
-    
     try:
-        # Create multipart message container
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = subject
-        msg['From'] = f"{MAIL_FROM_NAME} <{MAIL_FROM}>"
-        msg['To'] = ", ".join(recipients)
-        msg['Date'] = formatdate(localtime=True)
-        
-        # Attach plain text part first (will be displayed if HTML not supported)
-        # RFC 2046 defines that the last part is preferred
-        part1 = MIMEText(plain_text_content, 'plain', 'utf-8')
-        msg.attach(part1)
-        
-        # Attach HTML part last (will be preferred by most email clients)
-        part2 = MIMEText(html_content, 'html', 'utf-8')
-        msg.attach(part2)
+        msg = build_message(recipients, subject, html_content, plain_text_content)
         
         # Run SMTP connection in a separate thread to avoid blocking
         result = await asyncio.to_thread(_send_smtp_email, msg, recipients)
@@ -105,17 +230,35 @@ async def _send_email_async(
         logger.error(f"Failed to send email: {str(e)}")
         return False
 
-def _send_smtp_email(msg, recipients):
+class SMTPConnection:
     """
-    Helper function to handle SMTP connection and sending.
-    This runs in a separate thread to avoid blocking the main event loop.
+    An authenticated SMTP connection that is reused for many messages.
+
+    The connection is opened lazily, re-established if the server drops it and
+    recycled after MAIL_SMTP_MAX_MESSAGES messages, which many providers cap.
+    Not thread-safe; each sender thread should own its connection.
     """
-    try:
+
+    def __init__(self, max_messages: int = MAIL_SMTP_MAX_MESSAGES):
+        self.max_messages = max_messages
+        self._server = None
+        self._sent = 0
+        self._last_used = 0.0
+
+    @property
+    def is_open(self) -> bool:
+        return self._server is not None
+
+    @property
+    def idle_seconds(self) -> float:
+        return time.monotonic() - self._last_used
+
+    def open(self):
         # Choose the appropriate SMTP connection method
         if MAIL_SSL_TLS:
-            server = smtplib.SMTP_SSL(MAIL_SERVER, MAIL_PORT)
+            server = smtplib.SMTP_SSL(MAIL_SERVER, MAIL_PORT, timeout=MAIL_SMTP_TIMEOUT)
         else:
-            server = smtplib.SMTP(MAIL_SERVER, MAIL_PORT)
+            server = smtplib.SMTP(MAIL_SERVER, MAIL_PORT, timeout=MAIL_SMTP_TIMEOUT)
             
             # Use STARTTLS if configured
             if MAIL_STARTTLS:
@@ -124,16 +267,50 @@ def _send_smtp_email(msg, recipients):
         # Login if credentials provided
         if MAIL_USERNAME and MAIL_PASSWORD:
             server.login(MAIL_USERNAME, MAIL_PASSWORD)
-        
-        # Send email
-        server.send_message(msg)
-        server.quit()
-        
+
+        self._server = server
+        self._sent = 0
+        self._last_used = time.monotonic()
+
+    def send(self, msg, recipients: List[str]):
+        """Send msg, reconnecting once if the server closed the connection."""
+        if self._server is not None and self._sent >= self.max_messages:
+            self.close()
+        if self._server is None:
+            self.open()
+        try:
+            self._server.send_message(msg, to_addrs=recipients)
+        except smtplib.SMTPServerDisconnected:
+            self.close()
+            self.open()
+            self._server.send_message(msg, to_addrs=recipients)
+        self._sent += 1
+        self._last_used = time.monotonic()
+
+    def close(self):
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except Exception:
+            pass
+        self._server = None
+
+def _send_smtp_email(msg, recipients):
+    """
+    Helper function to handle SMTP connection and sending.
+    This runs in a separate thread to avoid blocking the main event loop.
+    """
+    connection = SMTPConnection()
+    try:
+        connection.send(msg, recipients)
         logger.info(f"Email sent successfully to {recipients}")
         return True
     except Exception as e:
         logger.error(f"SMTP error: {str(e)}")
         return False
+    finally:
+        connection.close()
 
 async def send_email(
     email_to: Union[str, List[str]],
@@ -142,7 +319,22 @@ async def send_email(
     background_tasks: BackgroundTasks,
     plain_text_content: Optional[str] = None
 ) -> bool:
-    """Generic function to send emails"""
+    """
+    Generic function to send emails.
+
+    Messages go to the persistent mail queue, which the mail worker delivers
+    over a pooled SMTP connection. With MAIL_QUEUE_ENABLED off, or if the
+    queue cannot be written, the message is sent from a background task.
+    """
+    if MAIL_QUEUE_ENABLED:
+        from .mail_queue import enqueue_email
+        try:
+            await asyncio.to_thread(enqueue_email, email_to, subject, html_content, plain_text_content)
+            logger.info(f"Email queued for sending to {email_to}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to write email to the mail queue, sending directly: {str(e)}")
+
     try:
         # Add email sending to background tasks
         background_tasks.add_task(
@@ -169,11 +361,9 @@ async def send_password_reset_email(
         # Create reset URL with token
         reset_url = f"{APP_BASE_URL}/auth/reset-password?token={reset_token}"
         
-        # Get the email template
-        template = env.get_template("email/password_reset.html")
-        
-        # Render the HTML content with variables
-        html_content = template.render(
+        # Render the HTML and plain text content with variables
+        rendered = mail_renderer.render(
+            "email/password_reset.html",
             username=username,
             reset_url=reset_url,
             token=reset_token
@@ -184,7 +374,8 @@ async def send_password_reset_email(
         await send_email(
             email_to=email_to,
             subject=subject,
-            html_content=html_content,
+            html_content=rendered.html,
+            plain_text_content=rendered.text,
             background_tasks=background_tasks
         )
         logger.info(f"Password reset email sent to {email_to}")
@@ -208,11 +399,9 @@ async def send_team_join_request_notification(
         approve_url = f"{APP_BASE_URL}/teams/approve-request/{approval_token}"
         deny_url = f"{APP_BASE_URL}/teams/deny-request/{approval_token}"
         
-        # Get the email template
-        template = env.get_template("email/team_join_request.html")
-        
-        # Render the HTML content with variables
-        html_content = template.render(
+        # Render the HTML and plain text content with variables
+        rendered = mail_renderer.render(
+            "email/team_join_request.html",
             captain_name=captain_name,
             requester_name=requester_name,
             team_name=team_name,
@@ -226,7 +415,8 @@ async def send_team_join_request_notification(
         await send_email(
             email_to=captain_email,
             subject=subject,
-            html_content=html_content,
+            html_content=rendered.html,
+            plain_text_content=rendered.text,
             background_tasks=background_tasks
         )
         logger.info(f"Team join request notification sent to {captain_email}")
@@ -254,14 +444,12 @@ async def send_verification_email(
         # Create verification URL with token
         verification_link = f"{APP_BASE_URL}/auth/verify-email?token={verification_token}"
         
-        # Get the email template
-        template = env.get_template("email/email_verification.html")
-        
         # Render the HTML content with variables
-        html_content = template.render(
+        html_content = mail_renderer.render(
+            "email/email_verification.html",
             username=username,
             verification_link=verification_link
-        )
+        ).html
         
         # Generate plain text version explicitly
         plain_text = f"""
@@ -311,15 +499,12 @@ async def send_join_request_response(
 ):
     """Send email notification about join request approval/denial"""
     try:
-        # Get the email template
-        template = env.get_template("email/join_request_response.html")
-        
-        # Render the HTML content with variables
-        html_content = template.render(
+        # Render the HTML and plain text content with variables
+        rendered = mail_renderer.render(
+            "email/join_request_response.html",
+            shared={"is_approved": is_approved, "base_url": APP_BASE_URL},
             username=username,
-            team_name=team_name,
-            is_approved=is_approved,
-            base_url=APP_BASE_URL
+            team_name=team_name
         )
         
         # Send email
@@ -328,7 +513,8 @@ async def send_join_request_response(
         await send_email(
             email_to=user_email,
             subject=subject,
-            html_content=html_content,
+            html_content=rendered.html,
+            plain_text_content=rendered.text,
             background_tasks=background_tasks
         )
         logger.info(f"Join request response email sent to {user_email}")
@@ -344,25 +530,20 @@ async def send_welcome_email(
 ):
     """Send welcome email to newly registered users after verification"""
     try:
-        # Get the email template
-        template = env.get_template("email/welcome.html")
-        
-        # Render the HTML content with variables
-        html_content = template.render(
-            username=username,
-            base_url=APP_BASE_URL
+        # Render the HTML and plain text content with variables
+        rendered = mail_renderer.render(
+            "email/welcome.html",
+            shared={"base_url": APP_BASE_URL},
+            username=username
         )
         
-        # Generate plain text version
-        plain_text_content = html_to_plain_text(html_content)
-        
         # Send email
         subject = "Welcome to LeagueLedger!"
         await send_email(
             email_to=email_to,
             subject=subject,
-            html_content=html_content,
-            plain_text_content=plain_text_content,
+            html_content=rendered.html,
+            plain_text_content=rendered.text,
             background_tasks=background_tasks
         )
         logger.info(f"Welcome email sent to {email_to}")
@@ -0,0 +1,285 @@
+"""
+Persistent outbound mail queue for LeagueLedger.
+
+Request handlers only insert rows into the outbound_emails table; a worker
+started with the application claims due messages in batches and delivers
+them over one reused SMTP connection, retrying failures with exponential
+backoff. Delivered messages are deleted after MAIL_QUEUE_RETENTION_DAYS.
+"""
+import asyncio
+import logging
+import os
+import smtplib
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional, Union
+
+from sqlalchemy import and_, insert, or_
+
+from ..db import SessionLocal
+from ..models import MailAnnouncement, OutboundEmail
+from .mail import SMTPConnection, build_message
+
+logger = logging.getLogger(__name__)
+
+MAIL_QUEUE_BATCH_SIZE = int(os.getenv("MAIL_QUEUE_BATCH_SIZE", "50"))
+MAIL_QUEUE_POLL_INTERVAL = float(os.getenv("MAIL_QUEUE_POLL_INTERVAL", "5"))
+MAIL_MAX_ATTEMPTS = int(os.getenv("MAIL_MAX_ATTEMPTS", "5"))
+MAIL_RETRY_BASE_DELAY = int(os.getenv("MAIL_RETRY_BASE_DELAY", "30"))  # Seconds before the first retry
+MAIL_RETRY_MAX_DELAY = int(os.getenv("MAIL_RETRY_MAX_DELAY", "3600"))
+MAIL_CLAIM_TIMEOUT = int(os.getenv("MAIL_CLAIM_TIMEOUT", "600"))  # Reclaim 'sending' rows left by a crashed worker
+MAIL_SMTP_IDLE_TIMEOUT = float(os.getenv("MAIL_SMTP_IDLE_TIMEOUT", "60"))  # Close the pooled connection when idle
+MAIL_SEND_RATE = float(os.getenv("MAIL_SEND_RATE", "0"))  # Messages per second per worker, 0 for no limit
+MAIL_ENQUEUE_CHUNK_SIZE = 1000
+# Days to keep delivered messages (and their bodies) before the worker deletes them, 0 to keep them forever
+MAIL_QUEUE_RETENTION_DAYS = int(os.getenv("MAIL_QUEUE_RETENTION_DAYS", "30"))
+MAIL_QUEUE_PURGE_INTERVAL = 3600  # Seconds between purges
+MAIL_QUEUE_PURGE_CHUNK_SIZE = 1000
+
+# SMTP errors that will not succeed on retry
+PERMANENT_SMTP_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused)
+
+
+def enqueue_email(
+    email_to: Union[str, List[str]],
+    subject: str,
+    html_content: str,
+    plain_text_content: Optional[str] = None,
+    session_factory=SessionLocal,
+) -> int:
+    """Store a message in the mail queue and wake the worker. Returns the queue id."""
+    recipients = [email_to] if isinstance(email_to, str) else list(email_to)
+    db = session_factory()
+    try:
+        message = OutboundEmail(
+            recipients=", ".join(recipients),
+            subject=subject,
+            html_content=html_content,
+            plain_text_content=plain_text_content,
+            status="pending",
+            next_attempt_at=datetime.utcnow(),
+        )
+        db.add(message)
+        db.commit()
+        message_id = message.id
+    finally:
+        db.close()
+
+    mail_worker.notify()
+    return message_id
+
+
+def enqueue_bulk(db, messages: List[dict], chunk_size: int = MAIL_ENQUEUE_CHUNK_SIZE) -> int:
+    """
+    Insert many prepared messages with executemany INSERTs, committing per chunk.
+
+    Each dict holds OutboundEmail column values; status, attempts and
+    next_attempt_at are filled in when missing. Returns the number queued.
+    """
+    now = datetime.utcnow()
+    for start in range(0, len(messages), chunk_size):
+        chunk = [
+            {"status": "pending", "attempts": 0, "priority": 0, "next_attempt_at": now, **message}
+            for message in messages[start:start + chunk_size]
+        ]
+        db.execute(insert(OutboundEmail), chunk)
+        db.commit()
+    mail_worker.notify()
+    return len(messages)
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff: base, 2*base, 4*base... capped at MAIL_RETRY_MAX_DELAY."""
+    return timedelta(seconds=min(MAIL_RETRY_BASE_DELAY * 2 ** (attempts - 1), MAIL_RETRY_MAX_DELAY))
+
+
+def claim_due_messages(db, worker_id: str, limit: int) -> List[OutboundEmail]:
+    """
+    Atomically mark up to limit due messages as 'sending' for this worker.
+
+    The conditional UPDATE only touches rows still pending (or abandoned), so
+    several application processes can drain the queue without double sends.
+    """
+    now = datetime.utcnow()
+    due = or_(
+        and_(OutboundEmail.status == "pending", OutboundEmail.next_attempt_at <= now),
+        and_(OutboundEmail.status == "sending",
+             OutboundEmail.claimed_at < now - timedelta(seconds=MAIL_CLAIM_TIMEOUT)),
+    )
+    candidate_ids = [
+        row.id for row in db.query(OutboundEmail.id).filter(due)
+        .order_by(OutboundEmail.priority, OutboundEmail.next_attempt_at, OutboundEmail.id).limit(limit)
+    ]
+    if not candidate_ids:
+        return []
+
+    db.query(OutboundEmail).filter(OutboundEmail.id.in_(candidate_ids), due).update(
+        {"status": "sending", "claimed_by": worker_id, "claimed_at": now},
+        synchronize_session=False
+    )
+    db.commit()
+    return (
+        db.query(OutboundEmail)
+        .filter(OutboundEmail.id.in_(candidate_ids), OutboundEmail.claimed_by == worker_id,
+                OutboundEmail.status == "sending")
+        .order_by(OutboundEmail.id)
+        .all()
+    )
+
+
+def count_announcement_message(db, announcement_id: int, status: str) -> None:
+    """Add a delivered or failed message to its announcement's counters, in the caller's transaction."""
+    column = MailAnnouncement.sent_count if status == "sent" else MailAnnouncement.failed_count
+    db.query(MailAnnouncement).filter(MailAnnouncement.id == announcement_id).update(
+        {column: column + 1}, synchronize_session=False
+    )
+
+
+def purge_sent_messages(db, retention_days: int = MAIL_QUEUE_RETENTION_DAYS,
+                        chunk_size: int = MAIL_QUEUE_PURGE_CHUNK_SIZE) -> int:
+    """Delete messages delivered more than retention_days ago, a chunk per transaction. Returns the number deleted."""
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    deleted = 0
+    while True:
+        ids = [
+            row.id for row in db.query(OutboundEmail.id)
+            .filter(OutboundEmail.status == "sent", OutboundEmail.sent_at < cutoff)
+            .limit(chunk_size)
+        ]
+        if not ids:
+            return deleted
+        deleted += db.query(OutboundEmail).filter(OutboundEmail.id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+
+
+class MailQueueWorker:
+    """
+    Drains the mail queue over a single pooled SMTP connection.
+
+    Messages are claimed by priority, so transactional mail overtakes queued
+    announcements, and paced to send_rate messages per second when set.
+    """
+
+    def __init__(self, session_factory=SessionLocal, connection_factory=SMTPConnection,
+                 batch_size: int = MAIL_QUEUE_BATCH_SIZE, poll_interval: float = MAIL_QUEUE_POLL_INTERVAL,
+                 send_rate: float = MAIL_SEND_RATE):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.send_rate = send_rate
+        self._next_send_at = 0.0
+        self._next_purge_at = 0.0
+        self.worker_id = uuid.uuid4().hex
+        self.connection = connection_factory()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def notify(self):
+        """Ask the worker to check the queue now instead of at the next poll."""
+        if self._wakeup is None or self._loop is None:
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        except RuntimeError:
+            # Event loop already closed
+            pass
+
+    def throttle(self):
+        """Sleep as needed to keep below send_rate messages per second."""
+        if self.send_rate <= 0:
+            return
+        now = time.monotonic()
+        if self._next_send_at > now:
+            time.sleep(self._next_send_at - now)
+        self._next_send_at = max(now, self._next_send_at) + 1.0 / self.send_rate
+
+    def deliver(self, message: OutboundEmail):
+        recipients = [address.strip() for address in message.recipients.split(",") if address.strip()]
+        msg = build_message(recipients, message.subject, message.html_content, message.plain_text_content)
+        self.connection.send(msg, recipients)
+
+    def process_batch(self) -> int:
+        """Claim and deliver one batch of due messages. Returns the number processed."""
+        db = self.session_factory()
+        try:
+            messages = claim_due_messages(db, self.worker_id, self.batch_size)
+            if not messages:
+                if self.connection.is_open and self.connection.idle_seconds > MAIL_SMTP_IDLE_TIMEOUT:
+                    self.connection.close()
+                return 0
+
+            for message in messages:
+                message.attempts += 1
+                self.throttle()
+                try:
+                    self.deliver(message)
+                    message.status = "sent"
+                    message.sent_at = datetime.utcnow()
+                    message.last_error = None
+                except Exception as e:
+                    message.last_error = str(e)
+                    if isinstance(e, PERMANENT_SMTP_ERRORS) or message.attempts >= MAIL_MAX_ATTEMPTS:
+                        message.status = "failed"
+                        logger.error(f"Giving up on email {message.id} to {message.recipients}: {str(e)}")
+                    else:
+                        message.status = "pending"
+                        message.next_attempt_at = datetime.utcnow() + retry_delay(message.attempts)
+                        logger.warning(f"Email {message.id} failed (attempt {message.attempts}), retrying: {str(e)}")
+                    if not isinstance(e, PERMANENT_SMTP_ERRORS):
+                        # Start the next message on a fresh connection
+                        self.connection.close()
+                message.claimed_by = None
+                if message.announcement_id and message.status in ("sent", "failed"):
+                    count_announcement_message(db, message.announcement_id, message.status)
+                # Commit per message so a crash mid-batch never resends delivered mail
+                db.commit()
+
+            logger.info(f"Mail queue processed {len(messages)} message(s)")
+            return len(messages)
+        finally:
+            db.close()
+
+    def purge(self) -> int:
+        """Delete old delivered messages, at most once per MAIL_QUEUE_PURGE_INTERVAL."""
+        if MAIL_QUEUE_RETENTION_DAYS <= 0 or time.monotonic() < self._next_purge_at:
+            return 0
+        self._next_purge_at = time.monotonic() + MAIL_QUEUE_PURGE_INTERVAL
+        db = self.session_factory()
+        try:
+            deleted = purge_sent_messages(db)
+        finally:
+            db.close()
+        if deleted:
+            logger.info(f"Mail queue deleted {deleted} message(s) sent over {MAIL_QUEUE_RETENTION_DAYS} days ago")
+        return deleted
+
+    async def run(self):
+        """Process the queue until cancelled."""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        try:
+            while True:
+                try:
+                    processed = await asyncio.to_thread(self.process_batch)
+                except Exception as e:
+                    logger.error(f"Mail queue worker error: {str(e)}")
+                    processed = 0
+                if processed >= self.batch_size:
+                    continue
+                try:
+                    await asyncio.to_thread(self.purge)
+                except Exception as e:
+                    logger.error(f"Mail queue purge error: {str(e)}")
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+        finally:
+            self._wakeup = None
+            await asyncio.to_thread(self.connection.close)
+
+
+# Worker used by the application process
+mail_worker = MailQueueWorker()
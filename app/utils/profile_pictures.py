@@ -0,0 +1,157 @@
+"""
+Profile picture uploads for LeagueLedger.
+
+Uploads are copied to disk in chunks (stopping at PROFILE_PICTURE_MAX_BYTES),
+then decoded, rotated upright, cropped square and saved at each of
+PROFILE_PICTURE_SIZES as WebP and JPEG by a small thread pool, off the
+event loop. The original upload and its metadata (e.g. EXIF location) are
+discarded. user.picture stores the URL of the largest JPEG, and templates
+pick the size they display with profile_picture(user.picture, "small"),
+falling back to the stored URL for pictures from OAuth providers.
+"""
+import asyncio
+import logging
+import os
+import re
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import aiofiles
+from fastapi import UploadFile
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+PROFILE_PICTURE_DIR = Path(os.getenv("PROFILE_PICTURE_DIR", "app/static/uploads/profile_pictures"))
+PROFILE_PICTURE_URL = "/static/uploads/profile_pictures"
+PROFILE_PICTURE_MAX_BYTES = int(os.getenv("PROFILE_PICTURE_MAX_BYTES", str(10 * 1024 * 1024)))
+# Refuse images that would take more memory than this to decode (decompression bombs)
+PROFILE_PICTURE_MAX_PIXELS = int(os.getenv("PROFILE_PICTURE_MAX_PIXELS", str(40_000_000)))
+PROFILE_PICTURE_WORKERS = int(os.getenv("PROFILE_PICTURE_WORKERS", "2"))
+PROFILE_PICTURE_JPEG_QUALITY = int(os.getenv("PROFILE_PICTURE_JPEG_QUALITY", "85"))
+PROFILE_PICTURE_WEBP_QUALITY = int(os.getenv("PROFILE_PICTURE_WEBP_QUALITY", "80"))
+
+# Square edge in pixels, twice the largest CSS size each is shown at for high-density screens
+PROFILE_PICTURE_SIZES = {"small": 80, "medium": 192, "large": 256}
+ACCEPTED_FORMATS = {"JPEG", "PNG", "WEBP"}
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+_PICTURE_URL_PATTERN = re.compile(
+    re.escape(PROFILE_PICTURE_URL) + r"/(?P<id>[0-9a-f]{32})-(?P<size>\d+)\.(?:jpg|webp)$"
+)
+
+_image_pool = ThreadPoolExecutor(max_workers=PROFILE_PICTURE_WORKERS, thread_name_prefix="profile-picture")
+
+
+class ProfilePictureError(ValueError):
+    """The upload can't be used as a profile picture; the message is shown to the user."""
+
+
+class ProfilePicture(NamedTuple):
+    src: str
+    webp: Optional[str] = None
+
+
+def variant_name(picture_id: str, size: int, extension: str) -> str:
+    return f"{picture_id}-{size}.{extension}"
+
+
+def profile_picture(url: Optional[str], size: str = "medium") -> Optional[ProfilePicture]:
+    """The JPEG and WebP URLs of an uploaded picture at size, or the URL itself for other pictures."""
+    if not url:
+        return None
+    match = _PICTURE_URL_PATTERN.match(url)
+    if not match:
+        return ProfilePicture(url)
+    pixels = PROFILE_PICTURE_SIZES[size]
+    return ProfilePicture(
+        f"{PROFILE_PICTURE_URL}/{variant_name(match['id'], pixels, 'jpg')}",
+        f"{PROFILE_PICTURE_URL}/{variant_name(match['id'], pixels, 'webp')}",
+    )
+
+
+async def save_upload(upload: UploadFile, destination: Path, max_bytes: int = PROFILE_PICTURE_MAX_BYTES) -> int:
+    """Copy an upload to destination in chunks, refusing it once it grows past max_bytes."""
+    written = 0
+    try:
+        async with aiofiles.open(destination, "wb") as out:
+            while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+                written += len(chunk)
+                if written > max_bytes:
+                    raise ProfilePictureError(
+                        f"The picture is too large. The maximum size is {max_bytes // (1024 * 1024)} MB."
+                    )
+                await out.write(chunk)
+    except BaseException:
+        destination.unlink(missing_ok=True)
+        raise
+    return written
+
+
+def render_variants(source: Path, picture_id: str, directory: Path = None) -> None:
+    """Decode source and write its square WebP and JPEG variants. Runs in the image pool."""
+    directory = directory or PROFILE_PICTURE_DIR
+    try:
+        with Image.open(source) as image:
+            if image.format not in ACCEPTED_FORMATS:
+                raise ProfilePictureError("Invalid file type. Only JPG, PNG and WebP are allowed.")
+            if image.width * image.height > PROFILE_PICTURE_MAX_PIXELS:
+                raise ProfilePictureError("The picture's dimensions are too large.")
+            image = ImageOps.exif_transpose(image)
+            if image.mode in ("RGBA", "LA", "P"):
+                # Flatten transparency onto white rather than black for the JPEG variants
+                image = image.convert("RGBA")
+                background = Image.new("RGB", image.size, "white")
+                background.paste(image, mask=image.getchannel("A"))
+                image = background
+            else:
+                image = image.convert("RGB")
+            written = []
+            try:
+                for pixels in sorted(set(PROFILE_PICTURE_SIZES.values()), reverse=True):
+                    variant = ImageOps.fit(image, (pixels, pixels), Image.Resampling.LANCZOS)
+                    jpeg = directory / variant_name(picture_id, pixels, "jpg")
+                    webp = directory / variant_name(picture_id, pixels, "webp")
+                    written += [jpeg, webp]
+                    variant.save(jpeg, "JPEG", quality=PROFILE_PICTURE_JPEG_QUALITY, optimize=True, progressive=True)
+                    variant.save(webp, "WEBP", quality=PROFILE_PICTURE_WEBP_QUALITY, method=4)
+            except BaseException:
+                for path in written:
+                    path.unlink(missing_ok=True)
+                raise
+    except (Image.UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        logger.info(f"Rejected profile picture upload: {e}")
+        raise ProfilePictureError("The file could not be read as an image.")
+
+
+async def store_profile_picture(upload: UploadFile) -> str:
+    """Save an uploaded picture at every size and return the URL to store in user.picture."""
+    PROFILE_PICTURE_DIR.mkdir(parents=True, exist_ok=True)
+    picture_id = uuid.uuid4().hex
+    original = PROFILE_PICTURE_DIR / f"{picture_id}.upload"
+    await save_upload(upload, original)
+    try:
+        await asyncio.get_running_loop().run_in_executor(_image_pool, render_variants, original, picture_id)
+    finally:
+        original.unlink(missing_ok=True)
+    largest = max(PROFILE_PICTURE_SIZES.values())
+    return f"{PROFILE_PICTURE_URL}/{variant_name(picture_id, largest, 'jpg')}"
+
+
+def delete_profile_picture_files(url: Optional[str]) -> None:
+    """Remove an uploaded picture's files; pictures hosted elsewhere are left alone."""
+    if not url or not url.startswith(PROFILE_PICTURE_URL + "/"):
+        return
+    match = _PICTURE_URL_PATTERN.match(url)
+    if match:
+        paths = PROFILE_PICTURE_DIR.glob(f"{match['id']}-*")
+    else:
+        # Uploaded before pictures were resized
+        paths = [PROFILE_PICTURE_DIR / os.path.basename(url)]
+    for path in paths:
+        try:
+            path.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"Error deleting profile picture file {path}: {str(e)}")
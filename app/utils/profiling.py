@@ -0,0 +1,255 @@
+"""
+Opt-in sampling profiler for LeagueLedger.
+
+A background thread periodically captures the Python stacks of every thread
+in the worker process and counts them in the collapsed ("folded") format
+understood by flamegraph.pl, speedscope and inferno. Only stacks that run
+application code are kept, so idle workers and the sleeping event loop do
+not drown out the handlers.
+
+Admins profile a single request by sending the X-Profile header, or the
+whole worker for a number of seconds from /admin/profiling/. Profiles are
+written to PROFILING_DIR so any worker on the host can list and serve them.
+Samples are process-wide: requests served concurrently with a profiled one
+show up in its profile too.
+"""
+import asyncio
+import logging
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILING_DIR = os.getenv("PROFILING_DIR", os.path.join(tempfile.gettempdir(), "leagueledger-profiles"))
+PROFILING_INTERVAL = float(os.getenv("PROFILING_INTERVAL", "0.005"))  # Seconds between samples
+PROFILING_MAX_SECONDS = int(os.getenv("PROFILING_MAX_SECONDS", "300"))  # Longest global profiling window
+PROFILING_MAX_FILES = int(os.getenv("PROFILING_MAX_FILES", "100"))  # Older profiles are deleted
+PROFILE_HEADER = "x-profile"
+PROFILE_ID_HEADER = "x-profile-id"
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROFILE_NAME_PATTERN = re.compile(r"^(\d{8}T\d{6})-([A-Z]+)-([\w.-]*)-([0-9a-f]{8})\.folded$")
+
+
+class ProfileInfo(NamedTuple):
+    name: str
+    created_at: datetime
+    method: str
+    label: str
+    size: int
+
+
+class StackSampler:
+    """Counts the stacks of all other threads every interval seconds."""
+
+    def __init__(self, interval: float = PROFILING_INTERVAL):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "StackSampler":
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def _run(self) -> None:
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.sample(exclude=own_ident)
+
+    def sample(self, exclude: Optional[int] = None) -> None:
+        for ident, frame in sys._current_frames().items():
+            if ident == exclude:
+                continue
+            stack = folded_stack(frame)
+            if stack:
+                self.stacks[stack] += 1
+                self.samples += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def frame_label(code) -> str:
+    filename = code.co_filename
+    if filename.startswith(APP_DIR):
+        filename = "app" + filename[len(APP_DIR):]
+    else:
+        filename = os.path.basename(filename)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+def folded_stack(frame) -> Optional[str]:
+    """Root-first, semicolon-separated stack of frame, or None if no application code is on it."""
+    labels = []
+    in_app = False
+    while frame is not None:
+        code = frame.f_code
+        if code.co_filename.startswith(APP_DIR) and code.co_filename != __file__:
+            in_app = True
+        labels.append(frame_label(code).replace(";", ":"))
+        frame = frame.f_back
+    if not in_app:
+        return None
+    return ";".join(reversed(labels))
+
+
+def new_profile_name(method: str, label: str) -> str:
+    slug = re.sub(r"[^\w.-]+", "_", label.strip("/"))[:60] or "root"
+    return f"{datetime.now():%Y%m%dT%H%M%S}-{method.upper()}-{slug}-{uuid.uuid4().hex[:8]}.folded"
+
+
+def save_profile(name: str, sampler: StackSampler) -> Optional[str]:
+    """Write the sampled stacks to PROFILING_DIR and prune old profiles; returns the path."""
+    if not sampler.samples:
+        return None
+    os.makedirs(PROFILING_DIR, exist_ok=True)
+    path = os.path.join(PROFILING_DIR, name)
+    with open(path, "w") as f:
+        f.write(sampler.folded())
+    for old in list_profiles()[PROFILING_MAX_FILES:]:
+        try:
+            os.remove(os.path.join(PROFILING_DIR, old.name))
+        except OSError:
+            pass
+    return path
+
+
+def list_profiles() -> List[ProfileInfo]:
+    """Saved profiles, newest first."""
+    if not os.path.isdir(PROFILING_DIR):
+        return []
+    profiles = []
+    for name in os.listdir(PROFILING_DIR):
+        match = PROFILE_NAME_PATTERN.match(name)
+        if not match:
+            continue
+        created, method, label, _ = match.groups()
+        profiles.append(ProfileInfo(
+            name=name,
+            created_at=datetime.strptime(created, "%Y%m%dT%H%M%S"),
+            method=method,
+            label=label,
+            size=os.path.getsize(os.path.join(PROFILING_DIR, name)),
+        ))
+    return sorted(profiles, key=lambda profile: profile.name, reverse=True)
+
+
+def profile_path(name: str) -> Optional[str]:
+    """Path of a saved profile, or None for names that aren't profiles (e.g. path traversal)."""
+    if not PROFILE_NAME_PATTERN.match(name):
+        return None
+    path = os.path.join(PROFILING_DIR, name)
+    return path if os.path.isfile(path) else None
+
+
+class ProfilingWindow:
+    """Samples the whole worker process for a limited number of seconds."""
+
+    def __init__(self):
+        self.until: Optional[float] = None
+        self.name: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return self.until is not None and self.until > time.monotonic()
+
+    @property
+    def remaining(self) -> int:
+        return max(0, int(self.until - time.monotonic())) if self.active else 0
+
+    def start(self, seconds: int) -> bool:
+        """Start sampling for seconds (capped at PROFILING_MAX_SECONDS); False if already running."""
+        seconds = max(1, min(seconds, PROFILING_MAX_SECONDS))
+        with self._lock:
+            if self.active:
+                return False
+            self.until = time.monotonic() + seconds
+            self.name = new_profile_name("ALL", f"{seconds}s")
+            sampler = StackSampler().start()
+        timer = threading.Timer(seconds, self._finish, args=(sampler, self.name))
+        timer.daemon = True
+        timer.start()
+        return True
+
+    def _finish(self, sampler: StackSampler, name: str) -> None:
+        sampler.stop()
+        try:
+            save_profile(name, sampler)
+            logger.info(f"Saved profiling window {name} ({sampler.samples} samples)")
+        except OSError as e:
+            logger.error(f"Could not save profile {name}: {e}")
+        with self._lock:
+            self.until = None
+
+
+profiling_window = ProfilingWindow()
+
+
+def is_admin_request(scope) -> bool:
+    auth = scope.get("auth")
+    return auth is not None and "admin" in getattr(auth, "scopes", ())
+
+
+class ProfilingMiddleware:
+    """
+    Samples requests sent by admins with an X-Profile header.
+
+    Must run inside AuthenticationMiddleware so the user's scopes are known.
+    The response carries the saved profile's name in X-Profile-Id.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        name = new_profile_name(scope["method"], scope["path"])
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((PROFILE_ID_HEADER.encode("latin-1"), name.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        sampler = StackSampler().start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            # Joining the sampler and writing the profile both block, so keep them off the event loop.
+            await asyncio.to_thread(self._finish, name, sampler)
+
+    @staticmethod
+    def _finish(name: str, sampler: StackSampler) -> None:
+        sampler.stop()
+        try:
+            save_profile(name, sampler)
+        except OSError as e:
+            logger.error(f"Could not save profile {name}: {e}")
+
+    @staticmethod
+    def _wants_profile(scope) -> bool:
+        for key, value in scope.get("headers", []):
+            if key == PROFILE_HEADER.encode("latin-1") and value not in (b"", b"0", b"false"):
+                return is_admin_request(scope)
+        return False
@@ -0,0 +1,127 @@
+"""
+Per-request SQL statement counting for LeagueLedger.
+
+SQLAlchemy cursor events count the statements and database time of the
+request currently being served. QueryStatsMiddleware reports them in a
+Server-Timing header and logs requests that issue too many statements or
+take too long, together with their statements grouped by text so N+1
+patterns stand out.
+"""
+import logging
+import os
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+QUERY_STATS_ENABLED = os.getenv("QUERY_STATS_ENABLED", "True").lower() in ("true", "1", "yes")
+SLOW_REQUEST_QUERY_COUNT = int(os.getenv("SLOW_REQUEST_QUERY_COUNT", "50"))
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+SLOW_REQUEST_MAX_STATEMENTS = 200  # Statements remembered per request for the slow-request log
+SLOW_REQUEST_STATEMENT_LENGTH = 500  # Characters of each statement included in the log
+
+
+class RequestQueryStats:
+    """Statements issued while serving one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.count = 0
+        self.db_time = 0.0
+        self.statements: List[str] = []
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.db_time += duration
+        if len(self.statements) < SLOW_REQUEST_MAX_STATEMENTS:
+            self.statements.append(statement)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, durations in milliseconds."""
+        return (
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.count} queries", '
+            f"app;dur={self.elapsed * 1000:.1f}"
+        )
+
+    def is_slow(self) -> bool:
+        return self.count > SLOW_REQUEST_QUERY_COUNT or self.elapsed * 1000 > SLOW_REQUEST_MS
+
+    def statement_summary(self) -> str:
+        """Statements grouped by text, most repeated first."""
+        lines = []
+        for statement, times in Counter(self.statements).most_common():
+            text = " ".join(statement.split())[:SLOW_REQUEST_STATEMENT_LENGTH]
+            lines.append(f"  {times}x {text}")
+        if self.count > len(self.statements):
+            lines.append(f"  ... {self.count - len(self.statements)} more statements not recorded")
+        return "\n".join(lines)
+
+
+# Stats of the request being served; request handlers run in the threadpool
+# with a copy of this context, so they update the same object
+_current_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar("request_query_stats", default=None)
+
+
+def current_query_stats() -> Optional[RequestQueryStats]:
+    return _current_stats.get()
+
+
+def install_query_hooks(engine: Engine) -> None:
+    """Attribute every statement executed on engine to the current request."""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_start_time"].pop()
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, time.perf_counter() - started)
+
+
+class QueryStatsMiddleware:
+    """ASGI middleware collecting RequestQueryStats for each HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestQueryStats()
+        token = _current_stats.set(stats)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", stats.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_stats.reset(token)
+            if stats.is_slow():
+                logger.warning(
+                    "Slow request %s %s: %d queries, %.1f ms in database, %.1f ms total\n%s",
+                    scope["method"], scope["path"], stats.count,
+                    stats.db_time * 1000, stats.elapsed * 1000, stats.statement_summary(),
+                )
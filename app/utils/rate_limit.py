@@ -0,0 +1,241 @@
+"""
+Token-bucket rate limiting for LeagueLedger's login and redemption endpoints.
+
+Each rule is a bucket of `capacity` tokens that refills over `period`
+seconds; a request takes one token from the bucket of every rule that
+applies to it (its IP address, the account it names, the code prefix the
+client tries) and is turned away with 429 once any bucket is empty. Checks run
+before the endpoint touches the database or hashes a password, so scripted
+guessing costs a dictionary lookup rather than a bcrypt round.
+
+Buckets live in this worker's memory by default. Set RATE_LIMIT_STORAGE_URL
+to a redis:// URL (and install the redis package) to share them between
+workers and hosts; if the shared store fails, checks fall back to memory.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+from fastapi import Request
+
+from .metrics import Counter, registry
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:  # Optional dependency, only needed for a shared store
+    redis_asyncio = None
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "True").lower() in ("true", "1", "yes")
+RATE_LIMIT_STORAGE_URL = os.getenv("RATE_LIMIT_STORAGE_URL", "")
+RATE_LIMIT_MAX_BUCKETS = int(os.getenv("RATE_LIMIT_MAX_BUCKETS", "50000"))
+# Honour X-Forwarded-For only behind a proxy that sets it
+RATE_LIMIT_TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "False").lower() in ("true", "1", "yes")
+# Codes sharing this many leading characters share a bucket
+RATE_LIMIT_CODE_PREFIX_LENGTH = int(os.getenv("RATE_LIMIT_CODE_PREFIX_LENGTH", "4"))
+
+RATE_LIMITED = registry.register(Counter(
+    "leagueledger_rate_limited_total",
+    "Requests turned away by a rate limit rule.",
+    ["rule"],
+))
+
+
+class RateLimitRule(NamedTuple):
+    """Allow bursts of up to capacity requests, refilling fully over period seconds."""
+    name: str
+    capacity: int
+    period: float
+
+    @classmethod
+    def from_env(cls, name: str, default: str) -> "RateLimitRule":
+        """Read a rule written as "capacity/seconds" from RATE_LIMIT_<NAME>."""
+        value = os.getenv(f"RATE_LIMIT_{name.upper()}", default)
+        capacity, _, period = value.partition("/")
+        return cls(name, int(capacity), float(period or 60))
+
+    @property
+    def refill_rate(self) -> float:
+        return self.capacity / self.period
+
+
+LOGIN_PER_IP = RateLimitRule.from_env("login_ip", "20/60")
+LOGIN_PER_ACCOUNT = RateLimitRule.from_env("login_account", "5/60")
+REDEEM_PER_IP = RateLimitRule.from_env("redeem_ip", "60/60")
+REDEEM_PER_USER = RateLimitRule.from_env("redeem_user", "30/60")
+REDEEM_PER_CODE_PREFIX = RateLimitRule.from_env("redeem_code_prefix", "30/60")
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a request has used up one of its rate limit buckets."""
+
+    def __init__(self, rule: RateLimitRule, retry_after: float):
+        super().__init__(f"Rate limit {rule.name} exceeded, retry in {retry_after:.1f}s")
+        self.rule = rule
+        self.retry_after = retry_after
+
+
+class MemoryRateLimitStore:
+    """Token buckets kept in this process, shared by every request it serves."""
+
+    def __init__(self, max_buckets: int = RATE_LIMIT_MAX_BUCKETS):
+        self.max_buckets = max_buckets
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    async def take(self, key: str, rule: RateLimitRule) -> float:
+        """Take a token from key's bucket; return 0 on success or the seconds until one is available."""
+        return self.take_now(key, rule, time.monotonic())
+
+    def take_now(self, key: str, rule: RateLimitRule, now: float) -> float:
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (rule.capacity, now))
+            tokens = min(rule.capacity, tokens + (now - updated_at) * rule.refill_rate)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                return (1 - tokens) / rule.refill_rate
+            if key not in self._buckets and len(self._buckets) >= self.max_buckets:
+                self._evict(now, rule)
+            self._buckets[key] = (tokens - 1, now)
+            return 0.0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._buckets)
+
+    def _evict(self, now: float, rule: RateLimitRule) -> None:
+        """Drop buckets idle long enough to have refilled, or the longest idle one if none have."""
+        idle = [key for key, (_, updated_at) in self._buckets.items() if now - updated_at >= rule.period]
+        for key in idle:
+            del self._buckets[key]
+        if not idle and self._buckets:
+            oldest = min(self._buckets, key=lambda key: self._buckets[key][1])
+            del self._buckets[oldest]
+
+
+# Refill and take atomically on the Redis server; returns the wait in milliseconds
+_REDIS_TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(bucket[1]) or capacity
+local updated_at = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate)
+local wait = 0
+if tokens < 1 then
+    wait = math.ceil((1 - tokens) / rate * 1000)
+else
+    tokens = tokens - 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return wait
+"""
+
+
+class RedisRateLimitStore:
+    """Token buckets kept in Redis, shared by every worker and host using the same server."""
+
+    def __init__(self, url: str, key_prefix: str = "leagueledger:ratelimit:"):
+        if redis_asyncio is None:
+            raise RuntimeError("The redis package is required for a shared rate limit store")
+        self.client = redis_asyncio.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self.key_prefix = key_prefix
+        self._script = self.client.register_script(_REDIS_TAKE_SCRIPT)
+
+    async def take(self, key: str, rule: RateLimitRule) -> float:
+        wait_ms = await self._script(
+            keys=[self.key_prefix + key],
+            args=[rule.capacity, rule.refill_rate, time.time()],
+        )
+        return int(wait_ms) / 1000
+
+
+class RateLimiter:
+    """Checks requests against their rules using a shared store, falling back to memory."""
+
+    def __init__(self, store=None, enabled: bool = RATE_LIMIT_ENABLED):
+        self.memory = MemoryRateLimitStore()
+        self.store = store or self.memory
+        self.enabled = enabled
+
+    async def check(self, checks: Iterable[Tuple[RateLimitRule, Optional[str]]]) -> None:
+        """
+        Take a token for every (rule, key) pair, skipping empty keys, and raise
+        RateLimitExceeded for the first rule whose bucket is empty.
+        """
+        if not self.enabled:
+            return
+        for rule, key in checks:
+            if not key:
+                continue
+            retry_after = await self._take(f"{rule.name}:{key}", rule)
+            if retry_after > 0:
+                RATE_LIMITED.inc(rule=rule.name)
+                raise RateLimitExceeded(rule, retry_after)
+
+    async def _take(self, key: str, rule: RateLimitRule) -> float:
+        if self.store is not self.memory:
+            try:
+                return await self.store.take(key, rule)
+            except Exception as e:
+                logger.warning(f"Shared rate limit store failed, using this worker's buckets: {e}")
+        return await self.memory.take(key, rule)
+
+
+def create_rate_limiter() -> RateLimiter:
+    """Build the limiter for RATE_LIMIT_STORAGE_URL (memory unless a redis:// URL is set)."""
+    if RATE_LIMIT_STORAGE_URL.startswith(("redis://", "rediss://", "unix://")):
+        try:
+            return RateLimiter(RedisRateLimitStore(RATE_LIMIT_STORAGE_URL))
+        except Exception as e:
+            logger.error(f"Could not set up shared rate limit store, using memory: {e}")
+    elif RATE_LIMIT_STORAGE_URL:
+        logger.error(f"Unsupported RATE_LIMIT_STORAGE_URL {RATE_LIMIT_STORAGE_URL!r}, using memory")
+    return RateLimiter()
+
+
+rate_limiter = create_rate_limiter()
+
+
+def client_ip(request: Request) -> Optional[str]:
+    """The address a request came from, taking the first X-Forwarded-For hop when trusted."""
+    if RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else None
+
+
+def code_prefix(code: str) -> str:
+    """The bucket key for a code; guessing many codes that share a prefix drains one bucket."""
+    return code.strip().upper()[:RATE_LIMIT_CODE_PREFIX_LENGTH]
+
+
+async def limit_login(request: Request, account: str) -> None:
+    """Throttle password attempts per client address and per username or email tried."""
+    await rate_limiter.check([
+        (LOGIN_PER_IP, client_ip(request)),
+        (LOGIN_PER_ACCOUNT, account.strip().lower()),
+    ])
+
+
+async def limit_redemption(request: Request, code: str) -> None:
+    """Throttle code lookups per client address, per signed-in user and per client and code prefix."""
+    user_id = request.session.get("user_id")
+    ip = client_ip(request)
+    # Per client, so a shared multi-use code scanned by a whole room of teams isn't throttled
+    client = f"user:{user_id}" if user_id else f"ip:{ip}" if ip else None
+    await rate_limiter.check([
+        (REDEEM_PER_IP, ip),
+        (REDEEM_PER_USER, str(user_id) if user_id else None),
+        (REDEEM_PER_CODE_PREFIX, f"{client}:{code_prefix(code)}" if client else None),
+    ])
@@ -0,0 +1,112 @@
+"""
+In-process caches for the QR code redemption landing page.
+
+Scanning a code at an event means many near-identical GET /redeem/{code}
+requests within a few minutes. The code's redemption-relevant fields and
+each user's teams per league are cached here so those requests are served
+from memory; writes that change them call the invalidate_* helpers.
+"""
+import os
+from datetime import datetime
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy.orm import Session
+
+from ..models import Team, TeamMembership
+from ..league_context import get_default_league, qr_code_with_league
+from .cache import TTLCache
+
+CODE_DESCRIPTOR_TTL = int(os.getenv("CODE_DESCRIPTOR_TTL", "300"))
+UNKNOWN_CODE_TTL = int(os.getenv("UNKNOWN_CODE_TTL", "30"))
+USER_TEAMS_TTL = int(os.getenv("USER_TEAMS_TTL", "120"))
+REDEEM_CACHE_SIZE = int(os.getenv("REDEEM_CACHE_SIZE", "10000"))
+
+_NOT_CACHED = object()
+
+
+class CodeDescriptor(NamedTuple):
+    """The fields of a QR code needed to decide whether and where it can be redeemed."""
+    id: int
+    code: str
+    league_id: int
+    points: int
+    title: Optional[str]
+    achievement_name: Optional[str]
+    expires_at: Optional[datetime]
+    used: bool
+    max_uses: Optional[int]
+
+    @property
+    def is_spent(self) -> bool:
+        return bool(self.used) and (not self.max_uses or self.max_uses <= 1)
+
+    @property
+    def is_expired(self) -> bool:
+        return self.expires_at is not None and self.expires_at < datetime.now()
+
+
+class TeamChoice(NamedTuple):
+    id: int
+    name: str
+
+
+_code_descriptors = TTLCache(CODE_DESCRIPTOR_TTL, maxsize=REDEEM_CACHE_SIZE, name="code_descriptors")
+_user_teams = TTLCache(USER_TEAMS_TTL, maxsize=REDEEM_CACHE_SIZE, name="user_teams")
+
+
+def load_code_descriptor(db: Session, code: str) -> Optional[CodeDescriptor]:
+    qr_code, league_id = qr_code_with_league(db, code)
+    if not qr_code:
+        return None
+    league_id = league_id or get_default_league(db).id
+    return CodeDescriptor(
+        id=qr_code.id,
+        code=qr_code.code,
+        league_id=league_id,
+        points=qr_code.points,
+        title=qr_code.title,
+        achievement_name=qr_code.achievement_name,
+        expires_at=qr_code.expires_at,
+        used=bool(qr_code.used),
+        max_uses=qr_code.max_uses,
+    )
+
+
+def get_code_descriptor(db: Session, code: str) -> Optional[CodeDescriptor]:
+    """Return the cached descriptor for code, or None if no such code exists."""
+    descriptor = _code_descriptors.get(code, _NOT_CACHED)
+    if descriptor is _NOT_CACHED:
+        descriptor = load_code_descriptor(db, code)
+        # Unknown codes are remembered briefly so a code created meanwhile shows up soon
+        _code_descriptors.set(code, descriptor, None if descriptor else UNKNOWN_CODE_TTL)
+    return descriptor
+
+
+def invalidate_code_descriptor(code: Optional[str] = None) -> None:
+    """Forget one code, or every code when called without arguments."""
+    if code is None:
+        _code_descriptors.clear()
+    else:
+        _code_descriptors.invalidate(code)
+
+
+def get_user_teams(db: Session, user_id: int, league_id: int) -> List[TeamChoice]:
+    """Return the (id, name) of every team the user belongs to in a league."""
+    def load():
+        rows = (
+            db.query(Team.id, Team.name)
+            .join(TeamMembership, Team.id == TeamMembership.team_id)
+            .filter(TeamMembership.user_id == user_id, Team.league_id == league_id)
+            .order_by(Team.name)
+            .all()
+        )
+        return [TeamChoice(row.id, row.name) for row in rows]
+    return _user_teams.get_or_set((user_id, league_id), load)
+
+
+def invalidate_user_teams(user_id: Optional[int] = None) -> None:
+    """Forget the cached teams of one user, or of everyone when called without arguments."""
+    if user_id is None:
+        _user_teams.clear()
+    else:
+        _user_teams.invalidate_where(lambda key: key[0] == user_id)
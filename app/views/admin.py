@@ -5,8 +5,10 @@ Admin interface for managing database records.
 from fastapi import APIRouter, Depends, Request, Form, HTTPException, Query
 from fastapi.responses import HTMLResponse, RedirectResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import inspect, func, desc, text
+from sqlalchemy import inspect, func, desc, text, case, and_
+import asyncio
 import json
+import logging
 from typing import Dict, Any, List, Type, Optional
 import inspect as py_inspect
 from datetime import datetime, timedelta
@@ -18,13 +20,26 @@ from dateutil.relativedelta import relativedelta
 from ..db import SessionLocal, Base
 from ..models import (
     User, League, Team, TeamMembership, QRCode, QRSet, TeamAchievement, Event,
-    OAuthAccount, TeamJoinRequest, EventAttendee, UserPoints
+    OAuthAccount, TeamJoinRequest, EventAttendee, UserPoints, ArchivedRecord
 )
 from ..templates_config import templates
+from ..league_context import invalidate_leagues
 from ..auth.permissions import require_admin
+from ..utils.cache import TTLCache
+from ..utils.metrics import recent_errors
+from ..utils.redeem_cache import invalidate_code_descriptor, invalidate_user_teams
+from ..utils.fragment_cache import invalidate_fragments
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Dashboard statistics are served from a short-lived cache that a background task keeps warm
+DASHBOARD_STATS_TTL = int(os.getenv("ADMIN_STATS_TTL", "120"))
+DASHBOARD_STATS_REFRESH_INTERVAL = int(os.getenv("ADMIN_STATS_REFRESH_INTERVAL", "60"))
+DASHBOARD_STATS_CACHE_KEY = "dashboard"
+_dashboard_stats_cache = TTLCache(ttl=DASHBOARD_STATS_TTL, name="dashboard_stats")
+
 # Dictionary of model classes with their display names
 MODELS = {
     'user': (User, "Users"),
@@ -39,6 +54,7 @@ MODELS = {
     'team_join_request': (TeamJoinRequest, "Team Join Requests"),
     'event_attendee': (EventAttendee, "Event Attendees"),
     'user_points': (UserPoints, "User Points"),
+    'archived_record': (ArchivedRecord, "Archived Records"),
 }
 
 def get_db():
@@ -51,123 +67,90 @@ def get_db():
 # Get user statistics for the dashboard
 def get_user_statistics(db: Session) -> Dict[str, Any]:
     """Get user statistics for the admin dashboard."""
-    stats = {}
-    
-    # Total users
-    stats["total_users"] = db.query(User).count()
-    
-    # Active users (not disabled)
-    stats["active_users"] = db.query(User).filter(User.is_active == True).count()
-    
-    # Verified users
-    stats["verified_users"] = db.query(User).filter(User.is_verified == True).count()
-    
-    # Admin users
-    stats["admin_users"] = db.query(User).filter(User.is_admin == True).count()
-    
-    # New registrations in the last 30 days
     thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    stats["new_registrations_30d"] = db.query(User).filter(
-        User.created_at >= thirty_days_ago
-    ).count()
-    
-    # Monthly user registration data for the chart (last 6 months)
-    monthly_data = []
-    month_labels = []
-    
-    # Get the current month and year
     current_date = datetime.now()
-    
-    # Loop through the last 6 months
+
+    # Build the six monthly buckets (oldest first) for the registration chart
+    month_labels = []
+    month_ranges = []
     for i in range(5, -1, -1):
-        # Calculate month and year for this data point
         month_date = current_date - relativedelta(months=i)
         start_of_month = datetime(month_date.year, month_date.month, 1)
-        
-        # For the current month, only count until today
-        if i == 0:
-            end_of_month = current_date
-        else:
-            # Calculate the end of the month
-            if month_date.month == 12:
-                end_of_month = datetime(month_date.year + 1, 1, 1) - timedelta(days=1)
-            else:
-                end_of_month = datetime(month_date.year, month_date.month + 1, 1) - timedelta(days=1)
-        
-        # Format month as abbreviated month name
-        month_name = month_date.strftime('%b')
-        month_labels.append(month_name)
-        
-        # Count users registered in this month
-        monthly_count = db.query(User).filter(
-            User.created_at >= start_of_month,
-            User.created_at <= end_of_month
-        ).count()
-        
-        monthly_data.append(monthly_count)
-    
-    # Add the data to the stats
-    stats["monthly_registrations"] = monthly_data
-    stats["month_labels"] = month_labels
-    
-    return stats
+        # For the current month, only count until now
+        end_of_month = current_date if i == 0 else start_of_month + relativedelta(months=1)
+        month_labels.append(month_date.strftime('%b'))
+        month_ranges.append((start_of_month, end_of_month))
+
+    # One pass over the users table with a conditional count per statistic
+    month_columns = [
+        func.count(case((and_(User.created_at >= start, User.created_at < end), 1)))
+        for start, end in month_ranges
+    ]
+    row = db.query(
+        func.count(User.id),
+        func.count(case((User.is_active == True, 1))),
+        func.count(case((User.is_verified == True, 1))),
+        func.count(case((User.is_admin == True, 1))),
+        func.count(case((User.created_at >= thirty_days_ago, 1))),
+        *month_columns
+    ).one()
+
+    return {
+        "total_users": row[0],
+        "active_users": row[1],
+        "verified_users": row[2],
+        "admin_users": row[3],
+        "new_registrations_30d": row[4],
+        "monthly_registrations": list(row[5:]),
+        "month_labels": month_labels,
+    }
 
 # Get team statistics for the dashboard
 def get_team_statistics(db: Session) -> Dict[str, Any]:
     """Get team statistics for the admin dashboard."""
-    stats = {}
-    
-    # Total teams
-    stats["total_teams"] = db.query(Team).count()
-    
-    # Active teams
-    stats["active_teams"] = db.query(Team).filter(Team.is_active == True).count()
-    
-    # Public teams
-    stats["public_teams"] = db.query(Team).filter(Team.is_public == True).count()
-    
+    totals = db.query(
+        func.count(Team.id),
+        func.count(case((Team.is_active == True, 1))),
+        func.count(case((Team.is_public == True, 1))),
+    ).one()
+
     # Team size distribution - teams grouped by member count
-    # Modified query to correctly count team members and group by team
     team_sizes = db.query(
         TeamMembership.team_id,
         func.count(TeamMembership.user_id).label('member_count')
     ).group_by(TeamMembership.team_id).subquery()
-    
-    # Now we can query the distribution from the subquery
+
     team_distribution = db.query(
         team_sizes.c.member_count,
         func.count().label('count')
     ).group_by(team_sizes.c.member_count).all()
-    
-    # Convert to a list of dictionaries for easier handling in the template
-    team_dist_list = [{"member_count": size[0], "count": size[1]} for size in team_distribution]
-    
-    stats["team_distribution"] = team_dist_list
-    
-    return stats
+
+    return {
+        "total_teams": totals[0],
+        "active_teams": totals[1],
+        "public_teams": totals[2],
+        # List of dictionaries for easier handling in the template
+        "team_distribution": [{"member_count": size[0], "count": size[1]} for size in team_distribution],
+    }
 
 # Get event statistics for the dashboard
 def get_event_statistics(db: Session) -> Dict[str, Any]:
     """Get event statistics for the admin dashboard."""
-    stats = {}
-    
-    # Total events
-    stats["total_events"] = db.query(Event).count()
-    
-    # Past events
     today = datetime.now().date()
-    stats["past_events"] = db.query(Event).filter(Event.event_date < today).count()
-    
-    # Upcoming events
-    stats["upcoming_events_count"] = db.query(Event).filter(Event.event_date >= today).count()
-    
-    # List of upcoming events
-    upcoming_events = db.query(Event).filter(
+
+    totals = db.query(
+        func.count(Event.id),
+        func.count(case((Event.event_date < today, 1))),
+        func.count(case((Event.event_date >= today, 1))),
+    ).one()
+
+    # Next upcoming events; plain rows so they can be cached outside the session
+    upcoming_events = db.query(
+        Event.id, Event.name, Event.event_date, Event.location
+    ).filter(
         Event.event_date >= today
     ).order_by(Event.event_date).limit(5).all()
-    
-    stats["upcoming_events"] = upcoming_events
-    
+
     # Events with highest attendance
     attendance_rates = db.query(
         Event.id.label('event_id'),
@@ -176,10 +159,73 @@ def get_event_statistics(db: Session) -> Dict[str, Any]:
     ).join(EventAttendee).group_by(Event.id, Event.name).order_by(
         desc('attendee_count')
     ).limit(5).all()
-    
-    stats["attendance_rates"] = attendance_rates
-    
-    return stats
+
+    return {
+        "total_events": totals[0],
+        "past_events": totals[1],
+        "upcoming_events_count": totals[2],
+        "upcoming_events": upcoming_events,
+        "attendance_rates": attendance_rates,
+    }
+
+def compute_dashboard_statistics(db: Session) -> Dict[str, Any]:
+    """Compute the user, team and event statistics shown on the admin dashboard."""
+    return {
+        "user_stats": get_user_statistics(db),
+        "team_stats": get_team_statistics(db),
+        "event_stats": get_event_statistics(db),
+        "computed_at": datetime.utcnow(),
+    }
+
+def get_dashboard_statistics(db: Session) -> Dict[str, Any]:
+    """Return cached dashboard statistics, computing them on a cold cache."""
+    return _dashboard_stats_cache.get_or_set(
+        DASHBOARD_STATS_CACHE_KEY, lambda: compute_dashboard_statistics(db)
+    )
+
+def refresh_dashboard_statistics() -> None:
+    """Recompute the dashboard statistics with a fresh session and store them in the cache."""
+    db = SessionLocal()
+    try:
+        _dashboard_stats_cache.set(DASHBOARD_STATS_CACHE_KEY, compute_dashboard_statistics(db))
+    finally:
+        db.close()
+
+def invalidate_dashboard_statistics() -> None:
+    """Drop the cached dashboard statistics after records change."""
+    _dashboard_stats_cache.invalidate(DASHBOARD_STATS_CACHE_KEY)
+
+# Models whose changes can alter what the redemption caches hold
+CODE_DESCRIPTOR_MODELS = {'qr_code', 'qr_set', 'event', 'league'}
+USER_TEAMS_MODELS = {'team', 'team_membership', 'user', 'league'}
+# Cached template fragments whose content comes from records of each model
+FRAGMENT_MODELS = {
+    'leaderboard': {'team', 'team_achievement', 'qr_code', 'user_points', 'league', 'event'},
+    'team_card': {'team'},
+    'navbar': {'user'},
+}
+
+def invalidate_record_caches(model_name: str) -> None:
+    """Drop cached data derived from records of model_name after an admin change."""
+    invalidate_dashboard_statistics()
+    if model_name == 'league':
+        invalidate_leagues()
+    if model_name in CODE_DESCRIPTOR_MODELS:
+        invalidate_code_descriptor()
+    if model_name in USER_TEAMS_MODELS:
+        invalidate_user_teams()
+    for fragment, models in FRAGMENT_MODELS.items():
+        if model_name in models:
+            invalidate_fragments(fragment)
+
+async def refresh_dashboard_statistics_periodically(interval: float = DASHBOARD_STATS_REFRESH_INTERVAL):
+    """Keep the dashboard statistics warm so /admin/ never waits on the aggregate queries."""
+    while True:
+        try:
+            await asyncio.to_thread(refresh_dashboard_statistics)
+        except Exception as e:
+            logger.warning(f"Failed to refresh admin dashboard statistics: {str(e)}")
+        await asyncio.sleep(interval)
 
 # Get system health information
 def get_system_health(db: Session) -> Dict[str, Any]:
@@ -204,9 +250,8 @@ def get_system_health(db: Session) -> Dict[str, Any]:
     except Exception:
         health_info["uptime"] = "Unknown"
     
-    # Recent errors (would be fetched from a logging system in production)
-    # For this example, we'll return a placeholder
-    health_info["recent_errors"] = []
+    # Recent errors logged by this worker process
+    health_info["recent_errors"] = recent_errors(limit=10)
     
     return health_info
 
@@ -242,14 +287,126 @@ def get_relationships(model_class: Type[Base]) -> Dict[str, str]:
             relationships[name] = rel.prop.target.name
     return relationships
 
+# Foreign-key handling applied before deleting rows of a model.
+# Each rule is (dependent model, referencing column, action) where action is
+# "nullify" (clear the reference) or "delete" (remove the dependent rows).
+DELETE_CASCADES = {
+    'team': [
+        (QRCode, QRCode.redeemed_at_team, "nullify"),
+        (TeamAchievement, TeamAchievement.team_id, "delete"),
+        (TeamMembership, TeamMembership.team_id, "delete"),
+        (TeamJoinRequest, TeamJoinRequest.team_id, "delete"),
+    ],
+    'user': [
+        (QRCode, QRCode.redeemed_by, "nullify"),
+        (QRSet, QRSet.created_by, "nullify"),
+        (Team, Team.owner_id, "nullify"),
+        (TeamMembership, TeamMembership.user_id, "delete"),
+        (TeamJoinRequest, TeamJoinRequest.user_id, "delete"),
+        (OAuthAccount, OAuthAccount.user_id, "delete"),
+        (EventAttendee, EventAttendee.user_id, "delete"),
+        (UserPoints, UserPoints.user_id, "delete"),
+    ],
+    'event': [
+        (QRCode, QRCode.event_id, "nullify"),
+        (TeamAchievement, TeamAchievement.event_id, "nullify"),
+        (EventAttendee, EventAttendee.event_id, "delete"),
+    ],
+    'league': [
+        (Team, Team.league_id, "nullify"),
+        (QRSet, QRSet.league_id, "nullify"),
+        (QRCode, QRCode.league_id, "nullify"),
+        (Event, Event.league_id, "nullify"),
+    ],
+    'qr_set': [
+        (QRCode, QRCode.qr_set_id, "nullify"),
+    ],
+    'qr_code': [
+        (TeamAchievement, TeamAchievement.qr_code_id, "nullify"),
+    ],
+}
+
+# Number of ids per IN (...) clause so huge selections stay within driver limits
+BULK_DELETE_CHUNK_SIZE = 500
+
+def _json_safe(value: Any) -> Any:
+    """Convert a column value into something the JSON column can store."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def archive_rows(db: Session, model_class: Type[Base], condition, archived_by: Optional[int] = None) -> int:
+    """Copy the rows matching condition into archived_records. Returns the number archived."""
+    table = model_class.__table__
+    rows = db.execute(table.select().where(condition)).mappings().all()
+    if not rows:
+        return 0
+    db.execute(ArchivedRecord.__table__.insert(), [
+        {
+            "table_name": table.name,
+            "record_id": row["id"],
+            "data": {key: _json_safe(value) for key, value in row.items()},
+            "archived_by": archived_by,
+        }
+        for row in rows
+    ])
+    return len(rows)
+
+def bulk_delete_records(
+    db: Session,
+    model_name: str,
+    record_ids: List[int],
+    archive: bool = False,
+    archived_by: Optional[int] = None,
+) -> int:
+    """
+    Delete many records of one model, including their dependent rows, in a single transaction.
+
+    References to the deleted rows are cleared or removed with set-based
+    UPDATE/DELETE statements, so nothing is loaded into the session.
+    When archive is true, every deleted row (dependents included) is first
+    copied into archived_records.
+
+    Returns the number of records of model_name that were deleted.
+    """
+    model_class, _ = MODELS[model_name]
+    record_ids = sorted({int(record_id) for record_id in record_ids})
+    deleted = 0
+
+    try:
+        for start in range(0, len(record_ids), BULK_DELETE_CHUNK_SIZE):
+            chunk = record_ids[start:start + BULK_DELETE_CHUNK_SIZE]
+
+            for dependent, column, action in DELETE_CASCADES.get(model_name, []):
+                condition = column.in_(chunk)
+                if action == "nullify":
+                    db.query(dependent).filter(condition).update(
+                        {column.key: None}, synchronize_session=False
+                    )
+                else:
+                    if archive:
+                        archive_rows(db, dependent, condition, archived_by)
+                    db.query(dependent).filter(condition).delete(synchronize_session=False)
+
+            condition = model_class.id.in_(chunk)
+            if archive:
+                archive_rows(db, model_class, condition, archived_by)
+            deleted += db.query(model_class).filter(condition).delete(synchronize_session=False)
+
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    invalidate_record_caches(model_name)
+    return deleted
+
 @router.get("/", response_class=HTMLResponse)
 @require_admin(redirect_url="/auth/login?next=/admin/")
 async def admin_home(request: Request, db: Session = Depends(get_db)):
     """Admin dashboard home."""
-    # Get statistics
-    user_stats = get_user_statistics(db)
-    team_stats = get_team_statistics(db)
-    event_stats = get_event_statistics(db)
+    # Get statistics (cached) and live system health
+    stats = get_dashboard_statistics(db)
     system_health = get_system_health(db)
     
     return templates.TemplateResponse(
@@ -257,9 +414,10 @@ async def admin_home(request: Request, db: Session = Depends(get_db)):
         {
             "request": request, 
             "user": request.user,
-            "user_stats": user_stats,
-            "team_stats": team_stats,
-            "event_stats": event_stats,
+            "user_stats": stats["user_stats"],
+            "team_stats": stats["team_stats"],
+            "event_stats": stats["event_stats"],
+            "stats_computed_at": stats["computed_at"],
             "system_health": system_health
         }
     )
@@ -416,6 +574,33 @@ async def create_record(
     new_record = model_class(**record_data)
     db.add(new_record)
     db.commit()
+    invalidate_record_caches(model_name)
+    
+    return RedirectResponse(f"/admin/{model_name}", status_code=303)
+
+@router.post("/{model_name}/bulk-delete")
+@require_admin(redirect_url="/auth/login")
+async def bulk_delete(
+    request: Request,
+    model_name: str,
+    db: Session = Depends(get_db)
+):
+    """Delete (and optionally archive) all selected records of a model."""
+    if model_name not in MODELS:
+        raise HTTPException(status_code=404, detail=f"Model {model_name} not found")
+    
+    form_data = await request.form()
+    try:
+        record_ids = [int(value) for value in form_data.getlist("record_ids") if value]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid record id")
+    
+    if not record_ids:
+        return RedirectResponse(f"/admin/{model_name}", status_code=303)
+    
+    archive = form_data.get("archive", "").lower() in ('true', 'yes', 'y', '1', 'on', 'checked')
+    archived_by = int(request.user.identity) if archive else None
+    bulk_delete_records(db, model_name, record_ids, archive=archive, archived_by=archived_by)
     
     return RedirectResponse(f"/admin/{model_name}", status_code=303)
 
@@ -518,6 +703,7 @@ async def update_record(
     
     # Save changes
     db.commit()
+    invalidate_record_caches(model_name)
     
     return RedirectResponse(f"/admin/{model_name}", status_code=303)
 
@@ -535,92 +721,11 @@ async def delete_record(
     
     model_class, _ = MODELS[model_name]
     
-    # Get the record
-    record = db.query(model_class).filter_by(id=record_id).first()
-    if not record:
+    # Make sure the record exists
+    if not db.query(model_class.id).filter(model_class.id == record_id).first():
         raise HTTPException(status_code=404, detail=f"Record not found")
     
-    # Special handling for different models due to foreign key constraints
-    if model_name == 'team':
-        # First clear any QR code references to this team
-        db.query(QRCode).filter(QRCode.redeemed_at_team == record_id).update(
-            {"redeemed_at_team": None}, synchronize_session=False
-        )
-        
-        # Clear any team achievements
-        db.query(TeamAchievement).filter(TeamAchievement.team_id == record_id).delete(
-            synchronize_session=False
-        )
-
-        # Handle team memberships (should be auto-deleted via cascade, but just to be safe)
-        db.query(TeamMembership).filter(TeamMembership.team_id == record_id).delete(
-            synchronize_session=False
-        )
-        
-        # Handle pending join requests
-        db.query(TeamJoinRequest).filter(TeamJoinRequest.team_id == record_id).delete(
-            synchronize_session=False
-        )
-    
-    elif model_name == 'user':
-        # Clear QR code references to this user
-        db.query(QRCode).filter(QRCode.redeemed_by == record_id).update(
-            {"redeemed_by": None}, synchronize_session=False
-        )
-        
-        # Handle QR sets created by this user - set created_by to NULL
-        db.query(QRSet).filter(QRSet.created_by == record_id).update(
-            {"created_by": None}, synchronize_session=False
-        )
-        
-        # Handle team ownerships - could set to None or reassign
-        db.query(Team).filter(Team.owner_id == record_id).update(
-            {"owner_id": None}, synchronize_session=False
-        )
-        
-        # Remove team memberships
-        db.query(TeamMembership).filter(TeamMembership.user_id == record_id).delete(
-            synchronize_session=False
-        )
-        
-        # Remove team join requests
-        db.query(TeamJoinRequest).filter(TeamJoinRequest.user_id == record_id).delete(
-            synchronize_session=False
-        )
-        
-        # Remove OAuth accounts
-        db.query(OAuthAccount).filter(OAuthAccount.user_id == record_id).delete(
-            synchronize_session=False
-        )
-        
-        # Remove event attendance records
-        db.query(EventAttendee).filter(EventAttendee.user_id == record_id).delete(
-            synchronize_session=False
-        )
-        
-        # Remove user points
-        db.query(UserPoints).filter(UserPoints.user_id == record_id).delete(
-            synchronize_session=False
-        )
-    
-    elif model_name == 'event':
-        # Clear QR code references to this event
-        db.query(QRCode).filter(QRCode.event_id == record_id).update(
-            {"event_id": None}, synchronize_session=False
-        )
-        
-        # Clear team achievements associated with this event
-        db.query(TeamAchievement).filter(TeamAchievement.event_id == record_id).update(
-            {"event_id": None}, synchronize_session=False
-        )
-        
-        # Remove event attendees
-        db.query(EventAttendee).filter(EventAttendee.event_id == record_id).delete(
-            synchronize_session=False
-        )
-    
-    # Delete record
-    db.delete(record)
-    db.commit()
+    # Run the same set-based cascade the bulk delete uses
+    bulk_delete_records(db, model_name, [record_id])
     
     return RedirectResponse(f"/admin/{model_name}", status_code=303)
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Admin bulk announcements mailed to the members of a league, event or team.
+"""
+import logging
+from typing import Dict, List
+
+from fastapi import APIRouter, BackgroundTasks, Depends, Form, HTTPException, Request
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..db import SessionLocal
+from ..models import Event, EventAttendee, League, MailAnnouncement, OutboundEmail, Team, TeamMembership, User
+from ..league_context import get_active_leagues
+from ..templates_config import templates
+from ..auth.permissions import require_admin
+from ..utils.mail import APP_BASE_URL, MAIL_QUEUE_ENABLED, mail_renderer
+from ..utils.mail_queue import enqueue_bulk
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+ANNOUNCEMENT_TEMPLATE = "email/announcement.html"
+ANNOUNCEMENT_AUDIENCES = {
+    'league': League,
+    'event': Event,
+    'team': Team,
+}
+# Rendered and inserted per chunk while preparing an announcement
+ANNOUNCEMENT_CHUNK_SIZE = 1000
+# Queued behind transactional mail (priority 0)
+ANNOUNCEMENT_PRIORITY = 10
+
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def announcement_recipients_query(db: Session, audience_type: str, audience_id: int):
+    """Single query returning each active member of the audience once."""
+    query = db.query(User.id, User.email, User.username, User.first_name).filter(
+        User.is_active == True,
+        User.email.isnot(None),
+    )
+    if audience_type == 'team':
+        query = query.join(TeamMembership, TeamMembership.user_id == User.id).filter(
+            TeamMembership.team_id == audience_id
+        )
+    elif audience_type == 'league':
+        query = query.join(TeamMembership, TeamMembership.user_id == User.id).join(
+            Team, Team.id == TeamMembership.team_id
+        ).filter(Team.league_id == audience_id)
+    elif audience_type == 'event':
+        query = query.join(EventAttendee, EventAttendee.user_id == User.id).filter(
+            EventAttendee.event_id == audience_id
+        )
+    else:
+        raise ValueError(f"Unknown audience {audience_type}")
+    return query.distinct().order_by(User.id)
+
+
+def prepare_announcement(announcement_id: int, session_factory=SessionLocal) -> int:
+    """
+    Resolve the recipients of an announcement, render their messages and queue them.
+
+    Runs in the threadpool after the request has returned; the mail worker
+    then delivers the queued messages at its configured send rate. Messages
+    are queued in committed chunks, so if preparation fails part way the
+    chunks already queued are cancelled.
+    """
+    db = session_factory()
+    try:
+        announcement = db.get(MailAnnouncement, announcement_id)
+        if announcement is None:
+            logger.warning(f"Announcement {announcement_id} no longer exists, nothing to prepare")
+            return 0
+        try:
+            audience = db.get(ANNOUNCEMENT_AUDIENCES[announcement.audience_type], announcement.audience_id)
+            shared = {
+                "subject": announcement.subject,
+                "paragraphs": [p.strip() for p in announcement.body.split("\n\n") if p.strip()],
+                "audience_name": audience.name if audience else None,
+                "base_url": APP_BASE_URL,
+            }
+            recipients = announcement_recipients_query(
+                db, announcement.audience_type, announcement.audience_id
+            ).all()
+            # Set before queueing so progress never exceeds the total while chunks go out
+            announcement.total_recipients = len(recipients)
+            db.commit()
+
+            for start in range(0, len(recipients), ANNOUNCEMENT_CHUNK_SIZE):
+                chunk = recipients[start:start + ANNOUNCEMENT_CHUNK_SIZE]
+                rendered = mail_renderer.render_many(
+                    ANNOUNCEMENT_TEMPLATE,
+                    [{"username": recipient.first_name or recipient.username} for recipient in chunk],
+                    shared=shared,
+                )
+                enqueue_bulk(db, [
+                    {
+                        "recipients": recipient.email,
+                        "subject": announcement.subject,
+                        "html_content": message.html,
+                        "plain_text_content": message.text,
+                        "priority": ANNOUNCEMENT_PRIORITY,
+                        "announcement_id": announcement.id,
+                    }
+                    for recipient, message in zip(chunk, rendered)
+                ])
+
+            announcement.status = "queued"
+            db.commit()
+            logger.info(f"Announcement {announcement.id} queued for {len(recipients)} recipient(s)")
+            return len(recipients)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to prepare announcement {announcement_id}: {str(e)}")
+            # Earlier chunks were committed; stop the worker from sending what it hasn't claimed yet
+            db.query(OutboundEmail).filter(
+                OutboundEmail.announcement_id == announcement_id,
+                OutboundEmail.status == "pending",
+            ).update({"status": "cancelled"}, synchronize_session=False)
+            announcement.status = "failed"
+            announcement.last_error = str(e)
+            db.commit()
+            return 0
+    finally:
+        db.close()
+
+
+def announcement_progress(db: Session, announcement_ids: List[int]) -> Dict[int, Dict[str, int]]:
+    """Count messages still waiting in the queue for each announcement with one GROUP BY query."""
+    progress = {announcement_id: {"pending": 0, "sending": 0} for announcement_id in announcement_ids}
+    if not announcement_ids:
+        return progress
+    rows = db.query(
+        OutboundEmail.announcement_id, OutboundEmail.status, func.count(OutboundEmail.id)
+    ).filter(
+        OutboundEmail.announcement_id.in_(announcement_ids),
+        OutboundEmail.status.in_(("pending", "sending")),
+    ).group_by(OutboundEmail.announcement_id, OutboundEmail.status).all()
+    for announcement_id, status, count in rows:
+        progress[announcement_id][status] = count
+    return progress
+
+
+def progress_summary(announcement: MailAnnouncement, counts: Dict[str, int]) -> Dict[str, object]:
+    # Sent and failed messages come from the announcement's counters, as the queue purges sent rows
+    sent, failed = announcement.sent_count or 0, announcement.failed_count or 0
+    done = sent + failed
+    status = announcement.status
+    if status == "queued" and done >= announcement.total_recipients:
+        status = "completed"
+    elif status == "queued" and done:
+        status = "sending"
+    return {
+        "id": announcement.id,
+        "status": status,
+        "total": announcement.total_recipients,
+        "sent": sent,
+        "failed": failed,
+        "remaining": counts["pending"] + counts["sending"],
+        "percent": round(100 * done / announcement.total_recipients) if announcement.total_recipients else 0,
+    }
+
+
+@router.get("/", response_class=HTMLResponse)
+@require_admin(redirect_url="/auth/login?next=/admin/announcements/")
+async def list_announcements(request: Request, db: Session = Depends(get_db)):
+    """Show the announcement form and recent announcements with their progress."""
+    announcements = db.query(MailAnnouncement).order_by(MailAnnouncement.created_at.desc()).limit(20).all()
+    progress = announcement_progress(db, [announcement.id for announcement in announcements])
+
+    return templates.TemplateResponse("admin/announcements.html", {
+        "request": request,
+        "user": request.user,
+        "announcements": [
+            (announcement, progress_summary(announcement, progress[announcement.id]))
+            for announcement in announcements
+        ],
+        "leagues": get_active_leagues(db),
+        "events": db.query(Event.id, Event.name, Event.event_date).order_by(Event.event_date.desc()).limit(50).all(),
+        "teams": db.query(Team.id, Team.name).filter(Team.is_active == True).order_by(Team.name).all(),
+        "mail_queue_enabled": MAIL_QUEUE_ENABLED,
+    })
+
+
+@router.post("/")
+@require_admin(redirect_url="/auth/login?next=/admin/announcements/")
+async def create_announcement(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    subject: str = Form(...),
+    body: str = Form(...),
+    audience: str = Form(...),
+    db: Session = Depends(get_db)
+):
+    """Create an announcement and prepare its messages in the background."""
+    if not MAIL_QUEUE_ENABLED:
+        # Announcements are only delivered by the mail queue worker, which isn't running
+        raise HTTPException(status_code=503, detail="Announcements require the mail queue (MAIL_QUEUE_ENABLED=True)")
+    audience_type, _, audience_id = audience.partition(":")
+    if audience_type not in ANNOUNCEMENT_AUDIENCES or not audience_id.isdigit():
+        raise HTTPException(status_code=400, detail=f"Invalid audience {audience}")
+    if not db.get(ANNOUNCEMENT_AUDIENCES[audience_type], int(audience_id)):
+        raise HTTPException(status_code=404, detail=f"{audience_type.title()} not found")
+
+    announcement = MailAnnouncement(
+        subject=subject.strip(),
+        body=body.replace("\r\n", "\n"),
+        audience_type=audience_type,
+        audience_id=int(audience_id),
+        status="preparing",
+        created_by=int(request.user.identity),
+    )
+    db.add(announcement)
+    db.commit()
+
+    background_tasks.add_task(prepare_announcement, announcement.id)
+    return RedirectResponse(url="/admin/announcements/", status_code=303)
+
+
+@router.get("/{announcement_id}/progress")
+@require_admin(redirect_url="/auth/login?next=/admin/announcements/")
+async def get_announcement_progress(request: Request, announcement_id: int, db: Session = Depends(get_db)):
+    """Delivery progress of one announcement as JSON."""
+    announcement = db.get(MailAnnouncement, announcement_id)
+    if not announcement:
+        raise HTTPException(status_code=404, detail="Announcement not found")
+    counts = announcement_progress(db, [announcement_id])[announcement_id]
+    return JSONResponse(progress_summary(announcement, counts))
@@ -6,8 +6,6 @@ import secrets
 import os
 import uuid
 import re
-import shutil
-from pathlib import Path
 from starlette.status import HTTP_303_SEE_OTHER, HTTP_302_FOUND
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
@@ -15,9 +13,12 @@ from datetime import datetime, timedelta
 from ..db import get_db
 from ..models import User
 from ..auth.oauth import oauth_manager
+from ..auth.utils import create_user_with_unique_username
 from ..templates_config import templates
-from ..security import verify_password, get_password_hash
+from ..security import verify_password_async, get_password_hash_async, password_needs_rehash
 from ..utils.mail import send_password_reset_email
+from ..utils.rate_limit import limit_login
+from ..utils.profile_pictures import ProfilePictureError, delete_profile_picture_files, store_profile_picture
 
 router = APIRouter(tags=["Auth"])
 
@@ -56,6 +57,9 @@ async def login_post(
     db: Session = Depends(get_db)
 ):
     """Handle login form submission"""
+    # Turn away password guessing before it costs a query or a hash
+    await limit_login(request, username)
+
     error = None
     
     # Look up the user by username or email
@@ -68,7 +72,7 @@ async def login_post(
         error = "Invalid username or email"
     elif user.is_oauth_user and not user.hashed_password:
         error = "This account uses OAuth for login. Please use the OAuth login option."
-    elif not verify_password(password, user.hashed_password):
+    elif not await verify_password_async(password, user.hashed_password):
         error = "Invalid password"
     elif not user.is_active:
         error = "This account has been deactivated"
@@ -97,6 +101,10 @@ async def login_post(
             }
         )
     
+    # Replace hashes made under an older, cheaper policy now that we have the password
+    if password_needs_rehash(user.hashed_password):
+        user.hashed_password = await get_password_hash_async(password)
+
     # Update the last login timestamp
     user.last_login = datetime.utcnow()
     db.commit()
@@ -173,6 +181,9 @@ async def register_post(
             {"request": request, "error": "Email already registered"}
         )
     
+    # Hashed outside the try so a saturated hash pool answers 503 instead of a generic error
+    hashed_password = await get_password_hash_async(password)
+
     try:
         # Create the user with verification token
         verification_token = secrets.token_urlsafe(32)
@@ -181,7 +192,7 @@ async def register_post(
         new_user = User(
             username=username,
             email=email,
-            hashed_password=get_password_hash(password),
+            hashed_password=hashed_password,
             is_verified=False,
             verification_token=verification_token,
             verification_token_expires_at=expiration,
@@ -403,19 +414,10 @@ async def oauth_callback(
         user = db.query(User).filter(User.email == email).first()
         
         if not user:
-            # Set username to be unique if it already exists
-            username = name
-            base_username = username
-            counter = 1
-            
-            # Check if username already exists
-            while db.query(User).filter(User.username == username).first():
-                username = f"{base_username}{counter}"
-                counter += 1
-            
-            # Create a new user
-            user = User(
-                username=username,
+            # Create a new user, numbering the username if the name is already taken
+            user = create_user_with_unique_username(
+                db,
+                name,
                 email=email,
                 oauth_id=provider_user_id,
                 is_oauth_user=True,
@@ -425,9 +427,6 @@ async def oauth_callback(
                 picture=picture,
                 is_verified=True  # OAuth users are considered verified
             )
-            db.add(user)
-            db.commit()
-            db.refresh(user)
         else:
             # Update existing user's OAuth information
             if not user.is_oauth_user:
@@ -552,33 +551,26 @@ async def update_profile_picture(
         request.session.clear()
         return RedirectResponse("/auth/login", status_code=HTTP_303_SEE_OTHER)
     
-    # Validate file type
-    valid_extensions = [".jpg", ".jpeg", ".png"]
-    file_ext = os.path.splitext(file.filename)[1].lower()
-    
-    if file_ext not in valid_extensions:
+    # Save the upload resized for display, off the event loop
+    try:
+        picture_url = await store_profile_picture(file)
+    except ProfilePictureError as e:
         return templates.TemplateResponse(
             "auth/profile.html",
-            {"request": request, "user": user, "error": "Invalid file type. Only JPG and PNG are allowed."}
+            {"request": request, "user": user, "error": str(e)}
         )
-    
-    # Create directory if it doesn't exist
-    upload_dir = Path("app/static/uploads/profile_pictures")
-    upload_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Generate unique filename
-    unique_filename = f"{uuid.uuid4()}{file_ext}"
-    file_path = upload_dir / unique_filename
-    
-    # Save the file
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    finally:
+        await file.close()
     
     # Update user profile with the picture URL
-    user.picture = f"/static/uploads/profile_pictures/{unique_filename}"
+    previous_picture = user.picture
+    user.picture = picture_url
     user.picture_manually_deleted = False  # Reset manual deletion flag
     db.commit()
     
+    # Clean up the files of a previously uploaded picture
+    delete_profile_picture_files(previous_picture)
+    
     # Redirect back to profile with success message
     return RedirectResponse(
         "/auth/profile?message=Profile+picture+updated+successfully",
@@ -604,16 +596,8 @@ async def delete_profile_picture(
     
     # Only proceed if user has a profile picture
     if user.picture:
-        # Get the file path
-        image_path = user.picture.replace("/static/", "app/static/")
-        
-        # Try to delete the file if it exists
-        try:
-            if os.path.exists(image_path):
-                os.remove(image_path)
-        except Exception as e:
-            print(f"Error deleting profile picture file: {str(e)}")
-            # Continue anyway since we still want to clear the database entry
+        # Delete the uploaded files; errors are logged and the database entry is cleared anyway
+        delete_profile_picture_files(user.picture)
         
         # Clear the picture field in the database and set the manually deleted flag
         user.picture = None
@@ -748,7 +732,7 @@ async def change_password_post(
         )
     
     # Verify current password
-    if not verify_password(current_password, user.hashed_password):
+    if not await verify_password_async(current_password, user.hashed_password):
         return templates.TemplateResponse(
             "auth/change_password.html",
             {"request": request, "error": "Current password is incorrect"}
@@ -770,7 +754,7 @@ async def change_password_post(
         )
     
     # Update password
-    user.hashed_password = get_password_hash(new_password)
+    user.hashed_password = await get_password_hash_async(new_password)
     db.commit()
     
     # Redirect to profile page with success message
@@ -903,7 +887,7 @@ async def reset_password_post(
         )
     
     # Update password and clear reset token
-    user.hashed_password = get_password_hash(new_password)
+    user.hashed_password = await get_password_hash_async(new_password)
     user.reset_token = None
     user.reset_token_expires_at = None  # Clear the token after use
     db.commit()
@@ -958,6 +942,7 @@ async def delete_account(
         user.email = anonymous_email
         user.is_active = False
         user.hashed_password = None
+        delete_profile_picture_files(user.picture)
         user.picture = None
         user.first_name = None
         user.last_name = None
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Admin bulk import of teams, memberships and events from CSV files.
+"""
+import csv
+import io
+from datetime import datetime
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import HTMLResponse
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from ..db import SessionLocal
+from ..models import Event, League, Team, TeamMembership, User
+from ..league_context import get_active_leagues, resolve_selected_league
+from ..templates_config import templates
+from ..auth.permissions import require_admin
+from .admin import invalidate_record_caches
+
+router = APIRouter()
+
+# Rows validated and written per transaction
+IMPORT_BATCH_SIZE = 500
+
+# Expected CSV columns per dataset and the admin model name it writes to
+IMPORT_DATASETS = {
+    'teams': {
+        'model': 'team',
+        'required': ['name'],
+        'optional': ['description', 'is_public', 'is_open', 'is_active'],
+    },
+    'memberships': {
+        'model': 'team_membership',
+        'required': ['team', 'user'],
+        'optional': ['is_captain', 'is_admin'],
+    },
+    'events': {
+        'model': 'event',
+        'required': ['name', 'event_date'],
+        'optional': ['location', 'description'],
+    },
+}
+
+TRUE_VALUES = ('true', 'yes', 'y', '1', 'on', 'checked')
+
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def parse_bool(value: Optional[str]) -> Optional[bool]:
+    """Parse a CSV boolean cell; empty cells mean 'not specified'."""
+    if value is None or value.strip() == '':
+        return None
+    return value.strip().lower() in TRUE_VALUES
+
+
+def new_report(dataset: str, dry_run: bool) -> Dict[str, Any]:
+    return {
+        "dataset": dataset,
+        "dry_run": dry_run,
+        "created": [],
+        "updated": [],
+        "unchanged": 0,
+        "errors": [],
+    }
+
+
+def iter_batches(rows: Iterable[Tuple[int, Dict[str, str]]], size: int) -> Iterator[List[Tuple[int, Dict[str, str]]]]:
+    iterator = iter(rows)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def read_csv_rows(text_stream) -> Iterator[Tuple[int, Dict[str, str]]]:
+    """Yield (line number, row) pairs with normalised header names and stripped values."""
+    reader = csv.DictReader(text_stream)
+    if reader.fieldnames:
+        reader.fieldnames = [name.strip().lower() for name in reader.fieldnames]
+    for row in reader:
+        yield reader.line_num, {key: (value or '').strip() for key, value in row.items() if key}
+
+
+def _diff(obj: Any, values: Dict[str, Any]) -> Dict[str, Tuple[Any, Any]]:
+    """Return {field: (old, new)} for the values that differ from obj."""
+    return {
+        field: (getattr(obj, field), value)
+        for field, value in values.items()
+        if value is not None and getattr(obj, field) != value
+    }
+
+
+def _apply(obj: Any, changes: Dict[str, Tuple[Any, Any]]) -> None:
+    for field, (_, new_value) in changes.items():
+        setattr(obj, field, new_value)
+
+
+def import_teams_batch(db: Session, league: League, batch, report, dry_run: bool, seen: Dict) -> None:
+    names = {row['name'] for _, row in batch if row.get('name')}
+    existing = seen
+    for team in db.query(Team).filter(Team.league_id == league.id, Team.name.in_(names)):
+        existing.setdefault(team.name, team)
+
+    for line, row in batch:
+        name = row.get('name')
+        if not name:
+            report["errors"].append((line, "Team name is required"))
+            continue
+        values = {
+            "description": row.get('description') or None,
+            "is_public": parse_bool(row.get('is_public')),
+            "is_open": parse_bool(row.get('is_open')),
+            "is_active": parse_bool(row.get('is_active')),
+        }
+        team = existing.get(name)
+        if team is None:
+            report["created"].append({"line": line, "key": name})
+            team = Team(name=name, league_id=league.id, **{k: v for k, v in values.items() if v is not None})
+            existing[name] = team
+            if not dry_run:
+                db.add(team)
+            continue
+        changes = _diff(team, values)
+        if not changes:
+            report["unchanged"] += 1
+            continue
+        report["updated"].append({"line": line, "key": name, "changes": changes})
+        _apply(team, changes)
+
+
+def import_memberships_batch(db: Session, league: League, batch, report, dry_run: bool, seen: Dict) -> None:
+    team_names = {row.get('team') for _, row in batch if row.get('team')}
+    user_keys = {row.get('user') for _, row in batch if row.get('user')}
+
+    teams = {
+        team.name: team
+        for team in db.query(Team).filter(Team.league_id == league.id, Team.name.in_(team_names))
+    }
+    users = {}
+    for user in db.query(User).filter(or_(User.username.in_(user_keys), User.email.in_(user_keys))):
+        users[user.username] = user
+        users[user.email] = user
+    memberships = seen
+    for membership in db.query(TeamMembership).filter(
+        TeamMembership.team_id.in_([team.id for team in teams.values()]),
+        TeamMembership.user_id.in_({user.id for user in users.values()}),
+    ):
+        memberships.setdefault((membership.user_id, membership.team_id), membership)
+
+    for line, row in batch:
+        team = teams.get(row.get('team'))
+        user = users.get(row.get('user'))
+        if team is None:
+            report["errors"].append((line, f"Unknown team '{row.get('team')}' in {league.name}"))
+            continue
+        if user is None:
+            report["errors"].append((line, f"Unknown user '{row.get('user')}'"))
+            continue
+        key = f"{user.username} @ {team.name}"
+        values = {
+            "is_captain": parse_bool(row.get('is_captain')),
+            "is_admin": parse_bool(row.get('is_admin')),
+        }
+        membership = memberships.get((user.id, team.id))
+        if membership is None:
+            report["created"].append({"line": line, "key": key})
+            membership = TeamMembership(
+                user_id=user.id, team_id=team.id,
+                **{k: v for k, v in values.items() if v is not None}
+            )
+            memberships[(user.id, team.id)] = membership
+            if not dry_run:
+                db.add(membership)
+            continue
+        changes = _diff(membership, values)
+        if not changes:
+            report["unchanged"] += 1
+            continue
+        report["updated"].append({"line": line, "key": key, "changes": changes})
+        _apply(membership, changes)
+
+
+def import_events_batch(db: Session, league: League, batch, report, dry_run: bool, seen: Dict) -> None:
+    parsed = []
+    for line, row in batch:
+        if not row.get('name'):
+            report["errors"].append((line, "Event name is required"))
+            continue
+        try:
+            event_date = datetime.fromisoformat(row.get('event_date', ''))
+        except ValueError:
+            report["errors"].append((line, f"Invalid event_date '{row.get('event_date')}'"))
+            continue
+        parsed.append((line, row, event_date))
+
+    names = {row['name'] for _, row, _ in parsed}
+    existing = seen
+    for event in db.query(Event).filter(Event.league_id == league.id, Event.name.in_(names)):
+        existing.setdefault((event.name, event.event_date), event)
+
+    for line, row, event_date in parsed:
+        key = f"{row['name']} ({event_date.isoformat()})"
+        values = {
+            "location": row.get('location') or None,
+            "description": row.get('description') or None,
+        }
+        event = existing.get((row['name'], event_date))
+        if event is None:
+            report["created"].append({"line": line, "key": key})
+            event = Event(
+                name=row['name'], event_date=event_date, league_id=league.id,
+                **{k: v for k, v in values.items() if v is not None}
+            )
+            existing[(row['name'], event_date)] = event
+            if not dry_run:
+                db.add(event)
+            continue
+        changes = _diff(event, values)
+        if not changes:
+            report["unchanged"] += 1
+            continue
+        report["updated"].append({"line": line, "key": key, "changes": changes})
+        _apply(event, changes)
+
+
+IMPORTERS = {
+    'teams': import_teams_batch,
+    'memberships': import_memberships_batch,
+    'events': import_events_batch,
+}
+
+
+def import_csv(
+    db: Session,
+    dataset: str,
+    league: League,
+    rows: Iterable[Tuple[int, Dict[str, str]]],
+    dry_run: bool = True,
+    batch_size: int = IMPORT_BATCH_SIZE,
+) -> Dict[str, Any]:
+    """
+    Validate and upsert CSV rows for a dataset into a league.
+
+    Rows are processed in batches; each batch loads the existing records it
+    needs with a handful of IN (...) queries and is committed as one
+    transaction. With dry_run the report is built without writing anything.
+    """
+    importer = IMPORTERS[dataset]
+    report = new_report(dataset, dry_run)
+    # Records found or created by earlier batches, by key. A dry run writes nothing, so later
+    # batches look its would-be rows (and their would-be changes) up here instead of in the database.
+    seen = {}
+
+    for batch in iter_batches(rows, batch_size):
+        missing = [
+            column for column in IMPORT_DATASETS[dataset]['required']
+            if column not in batch[0][1]
+        ]
+        if missing:
+            report["errors"].append((batch[0][0], f"Missing column(s): {', '.join(missing)}"))
+            break
+        created, updated, unchanged = len(report["created"]), len(report["updated"]), report["unchanged"]
+        try:
+            importer(db, league, batch, report, dry_run, seen if dry_run else {})
+            if dry_run:
+                # Detach the previewed objects first so the rollback doesn't reset their changes
+                db.expunge_all()
+                db.rollback()
+            else:
+                db.commit()
+        except Exception as e:
+            db.rollback()
+            # The batch's writes were rolled back, so drop what it reported as done
+            del report["created"][created:]
+            del report["updated"][updated:]
+            report["unchanged"] = unchanged
+            report["errors"].append((batch[0][0], f"Batch starting at line {batch[0][0]} failed: {str(e)}"))
+
+    if not dry_run and (report["created"] or report["updated"]):
+        invalidate_record_caches(IMPORT_DATASETS[dataset]['model'])
+    return report
+
+
+@router.get("/", response_class=HTMLResponse)
+@require_admin(redirect_url="/auth/login?next=/admin/import/")
+async def import_page(request: Request, db: Session = Depends(get_db)):
+    """Show the bulk import form."""
+    return templates.TemplateResponse("admin/import.html", {
+        "request": request,
+        "user": request.user,
+        "datasets": IMPORT_DATASETS,
+        "leagues": get_active_leagues(db),
+        "report": None,
+    })
+
+
+@router.post("/", response_class=HTMLResponse)
+@require_admin(redirect_url="/auth/login?next=/admin/import/")
+async def import_upload(
+    request: Request,
+    dataset: str = Form(...),
+    league_id: int = Form(None),
+    dry_run: bool = Form(False),
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db)
+):
+    """Import an uploaded CSV file, or preview the changes when dry_run is set."""
+    if dataset not in IMPORT_DATASETS:
+        raise HTTPException(status_code=400, detail=f"Unknown import type {dataset}")
+
+    league = resolve_selected_league(db, league_id)
+    text_stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    report = import_csv(db, dataset, league, read_csv_rows(text_stream), dry_run=dry_run)
+
+    return templates.TemplateResponse("admin/import.html", {
+        "request": request,
+        "user": request.user,
+        "datasets": IMPORT_DATASETS,
+        "leagues": get_active_leagues(db),
+        "selected_league": league,
+        "report": report,
+    })
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Streaming CSV/NDJSON exports of league data for the admin panel.
+"""
+import csv
+import io
+import json
+from datetime import datetime, date
+from typing import Any, Dict, Iterator, List, Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+
+from ..db import SessionLocal
+from ..models import Event, QRCode, Team, TeamAchievement, TeamMembership, User
+from ..auth.permissions import require_admin
+
+router = APIRouter()
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_BATCH_SIZE = 1000
+
+# Each dataset defines the selected columns plus the columns used for the
+# league and time-range filters.
+EXPORT_DATASETS = {
+    'teams': {
+        'columns': [
+            Team.id, Team.league_id, Team.name, Team.description, Team.is_public,
+            Team.is_open, Team.is_active, Team.owner_id, Team.created_at,
+        ],
+        'joins': [],
+        'league_column': Team.league_id,
+        'time_column': Team.created_at,
+        'filters': [],
+    },
+    'memberships': {
+        'columns': [
+            TeamMembership.id, TeamMembership.team_id, Team.name.label('team_name'),
+            Team.league_id, TeamMembership.user_id, User.username,
+            TeamMembership.is_admin, TeamMembership.is_captain, TeamMembership.joined_at,
+        ],
+        'joins': [
+            (Team, Team.id == TeamMembership.team_id),
+            (User, User.id == TeamMembership.user_id),
+        ],
+        'league_column': Team.league_id,
+        'time_column': TeamMembership.joined_at,
+        'filters': [],
+    },
+    'redemptions': {
+        'columns': [
+            QRCode.id, QRCode.code, QRCode.league_id, QRCode.title, QRCode.points,
+            QRCode.achievement_name, QRCode.event_id, QRCode.redeemed_by,
+            QRCode.redeemed_at_team, QRCode.redeemed_at,
+        ],
+        'joins': [],
+        'league_column': QRCode.league_id,
+        'time_column': QRCode.redeemed_at,
+        'filters': [QRCode.redeemed_at.isnot(None)],
+    },
+    'achievements': {
+        'columns': [
+            TeamAchievement.id, TeamAchievement.team_id, Team.name.label('team_name'),
+            Team.league_id, TeamAchievement.name, TeamAchievement.description,
+            TeamAchievement.event_id, TeamAchievement.qr_code_id, TeamAchievement.achieved_at,
+        ],
+        'joins': [(Team, Team.id == TeamAchievement.team_id)],
+        'league_column': Team.league_id,
+        'time_column': TeamAchievement.achieved_at,
+        'filters': [],
+    },
+    'events': {
+        'columns': [
+            Event.id, Event.league_id, Event.name, Event.description, Event.location,
+            Event.event_date, Event.created_at,
+        ],
+        'joins': [],
+        'league_column': Event.league_id,
+        'time_column': Event.event_date,
+        'filters': [],
+    },
+}
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def build_export_query(
+    dataset: str,
+    league_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    """Build the SELECT statement for a dataset with the optional filters applied."""
+    spec = EXPORT_DATASETS[dataset]
+    stmt = select(*spec['columns'])
+    for target, onclause in spec['joins']:
+        stmt = stmt.join(target, onclause)
+    for condition in spec['filters']:
+        stmt = stmt.where(condition)
+    if league_id:
+        stmt = stmt.where(spec['league_column'] == league_id)
+    if since:
+        stmt = stmt.where(spec['time_column'] >= since)
+    if until:
+        stmt = stmt.where(spec['time_column'] < until)
+    return stmt.order_by(spec['columns'][0])
+
+
+def _export_value(value: Any) -> Any:
+    """Convert a column value into a JSON/CSV friendly representation."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def iter_export_rows(stmt, session_factory=SessionLocal) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the rows of stmt as dictionaries using a server-side cursor.
+
+    Opens its own session so the cursor stays valid for the whole response,
+    and fetches EXPORT_BATCH_SIZE rows at a time so memory use stays flat.
+    """
+    db = session_factory()
+    try:
+        result = db.execute(
+            stmt.execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE)
+        )
+        for row in result.mappings():
+            yield {key: _export_value(value) for key, value in row.items()}
+    finally:
+        db.close()
+
+
+def stream_csv(columns: List[str], rows: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    """Encode rows as CSV, yielding one chunk per batch."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns)
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    yield buffer.getvalue()
+
+
+def stream_ndjson(rows: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    """Encode rows as newline-delimited JSON, yielding one chunk per batch."""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(row, default=str))
+        if len(lines) >= EXPORT_BATCH_SIZE:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def parse_export_date(value: Optional[str], name: str) -> Optional[datetime]:
+    """Parse an ISO date or datetime query parameter."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name} date: {value}")
+
+
+@router.get("/{dataset}")
+@require_admin(redirect_url="/auth/login")
+async def export_dataset(
+    request: Request,
+    dataset: str,
+    fmt: str = Query("csv", alias="format"),
+    league_id: Optional[int] = Query(None),
+    since: Optional[str] = Query(None),
+    until: Optional[str] = Query(None),
+):
+    """Stream a dataset as CSV or NDJSON, optionally filtered by league and time range."""
+    if dataset not in EXPORT_DATASETS:
+        raise HTTPException(status_code=404, detail=f"Unknown export {dataset}")
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format {fmt}")
+
+    stmt = build_export_query(
+        dataset,
+        league_id=league_id,
+        since=parse_export_date(since, "since"),
+        until=parse_export_date(until, "until"),
+    )
+    rows = iter_export_rows(stmt)
+    if fmt == "csv":
+        body = stream_csv([column.name for column in stmt.selected_columns], rows)
+    else:
+        body = stream_ndjson(rows)
+
+    scope = f"league{league_id}" if league_id else "all"
+    filename = f"leagueledger_{dataset}_{scope}.{fmt}"
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Prometheus metrics endpoint.
+"""
+import hmac
+import os
+
+from fastapi import APIRouter, Request
+from fastapi.responses import PlainTextResponse, Response
+from sqlalchemy import func
+
+from ..db import SessionLocal, engine
+from ..models import OutboundEmail
+from ..utils.cache import named_caches
+from ..utils.metrics import Counter, Gauge, registry
+
+router = APIRouter()
+
+# Scrapers send "Authorization: Bearer <token>"; without a token only signed-in admins can read the metrics
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+# Serve the metrics to anyone, e.g. when the endpoint is only reachable from a private network
+METRICS_PUBLIC = os.getenv("METRICS_PUBLIC", "False").lower() in ("true", "1", "yes")
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@registry.add_collector
+def db_pool_metrics():
+    pool = engine.pool
+    connections = Gauge("leagueledger_db_pool_connections", "Database pool connections by state.", ["state"])
+    size = Gauge("leagueledger_db_pool_size", "Configured database pool size.")
+    # Only QueuePool (the MySQL default) reports these; SQLite pools don't
+    if hasattr(pool, "checkedout"):
+        connections.set(pool.checkedout(), state="checked_out")
+        connections.set(pool.checkedin(), state="checked_in")
+        connections.set(max(pool.overflow(), 0), state="overflow")
+        size.set(pool.size())
+    return [connections, size]
+
+
+@registry.add_collector
+def cache_metrics():
+    hits = Counter("leagueledger_cache_hits_total", "In-process cache hits.", ["cache"])
+    misses = Counter("leagueledger_cache_misses_total", "In-process cache misses.", ["cache"])
+    entries = Gauge("leagueledger_cache_entries", "Entries currently held by in-process caches.", ["cache"])
+    for cache in named_caches():
+        hits.inc(cache.hits, cache=cache.name)
+        misses.inc(cache.misses, cache=cache.name)
+        entries.set(len(cache), cache=cache.name)
+    return [hits, misses, entries]
+
+
+@registry.add_collector
+def mail_queue_metrics():
+    messages = Gauge("leagueledger_mail_queue_messages", "Messages in the outbound mail queue by status.", ["status"])
+    db = SessionLocal()
+    try:
+        rows = db.query(OutboundEmail.status, func.count(OutboundEmail.id)).group_by(OutboundEmail.status).all()
+    finally:
+        db.close()
+    for status in ("pending", "sending", "sent", "failed", "cancelled"):
+        messages.set(0, status=status)
+    for status, count in rows:
+        messages.set(count, status=status)
+    return [messages]
+
+
+def may_read_metrics(request: Request) -> bool:
+    """Whether the request carries the metrics token, comes from an admin, or the metrics are public."""
+    if METRICS_PUBLIC:
+        return True
+    if METRICS_TOKEN and hmac.compare_digest(request.headers.get("authorization", ""), f"Bearer {METRICS_TOKEN}"):
+        return True
+    return "auth" in request.scope and "admin" in request.auth.scopes
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics(request: Request):
+    """Application metrics in the Prometheus text exposition format."""
+    if not may_read_metrics(request):
+        return PlainTextResponse("Unauthorized", status_code=401)
+    return Response(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
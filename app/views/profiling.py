@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Admin controls for the sampling profiler and download of saved profiles.
+"""
+from fastapi import APIRouter, Form, HTTPException, Request
+from fastapi.responses import FileResponse, HTMLResponse, RedirectResponse
+
+from ..templates_config import templates
+from ..auth.permissions import require_admin
+from ..utils.profiling import (
+    PROFILE_HEADER,
+    PROFILING_MAX_SECONDS,
+    list_profiles,
+    profile_path,
+    profiling_window,
+)
+
+router = APIRouter()
+
+
+@router.get("/", response_class=HTMLResponse)
+@require_admin(redirect_url="/auth/login?next=/admin/profiling/")
+async def profiling_page(request: Request):
+    """List saved profiles and show the profiling controls."""
+    return templates.TemplateResponse("admin/profiling.html", {
+        "request": request,
+        "user": request.user,
+        "profiles": list_profiles(),
+        "window_remaining": profiling_window.remaining,
+        "max_seconds": PROFILING_MAX_SECONDS,
+        "profile_header": PROFILE_HEADER,
+    })
+
+
+@router.post("/")
+@require_admin(redirect_url="/auth/login?next=/admin/profiling/")
+async def start_profiling_window(request: Request, seconds: int = Form(30)):
+    """Sample every request served by this worker for the given number of seconds."""
+    profiling_window.start(seconds)
+    return RedirectResponse("/admin/profiling/", status_code=303)
+
+
+@router.get("/{name}")
+@require_admin(redirect_url="/auth/login?next=/admin/profiling/")
+async def download_profile(request: Request, name: str):
+    """Download a profile in the collapsed stack format."""
+    path = profile_path(name)
+    if not path:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=name)
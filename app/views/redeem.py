@@ -8,9 +8,13 @@ from fastapi.responses import HTMLResponse, RedirectResponse
 from sqlalchemy.orm import Session
 from datetime import datetime
 from ..db import SessionLocal
-from ..models import QRCode, User, Team, TeamMembership, TeamAchievement
+from ..models import User, Team, TeamMembership, TeamAchievement
 from ..templates_config import templates
-from ..league_context import get_default_league, qr_code_league_id
+from ..league_context import get_default_league, qr_code_with_league
+from ..utils.redeem_cache import get_code_descriptor, get_user_teams, invalidate_code_descriptor
+from ..utils.metrics import REDEMPTIONS
+from ..utils.fragment_cache import invalidate_fragments
+from ..utils.rate_limit import limit_redemption
 
 router = APIRouter()
 
@@ -36,11 +40,11 @@ def redeem_code(code: str, request: Request, db: Session = Depends(get_db)):
     if user_id:
         user = db.query(User).get(user_id)
 
-    # Find the QR code record
-    qr_code = db.query(QRCode).filter_by(code=code).first()
+    # Compact cached view of the code; no ORM objects or lazy loads per scan
+    descriptor = get_code_descriptor(db, code)
     
     # Handle invalid or already used codes
-    if not qr_code:
+    if not descriptor:
         return templates.TemplateResponse(
             "error.html", 
             {
@@ -51,7 +55,7 @@ def redeem_code(code: str, request: Request, db: Session = Depends(get_db)):
             }
         )
     
-    if qr_code.used and (not qr_code.max_uses or qr_code.max_uses <= 1):
+    if descriptor.is_spent:
         return templates.TemplateResponse(
             "error.html", 
             {
@@ -63,7 +67,7 @@ def redeem_code(code: str, request: Request, db: Session = Depends(get_db)):
         )
     
     # Check expiration if applicable
-    if qr_code.expires_at and qr_code.expires_at < datetime.now():
+    if descriptor.is_expired:
         return templates.TemplateResponse(
             "error.html", 
             {
@@ -74,23 +78,10 @@ def redeem_code(code: str, request: Request, db: Session = Depends(get_db)):
             }
         )
 
-    effective_league_id = qr_code_league_id(qr_code)
-    if not effective_league_id:
-        effective_league_id = get_default_league(db).id
-
     # Get only teams the user is a member of in the QR code's league, if logged in
     user_teams = []
     if user:
-        # Query teams where the user is a member using TeamMembership relation
-        user_teams = (
-            db.query(Team)
-            .join(TeamMembership, Team.id == TeamMembership.team_id)
-            .filter(
-                TeamMembership.user_id == user.id,
-                Team.league_id == effective_league_id
-            )
-            .all()
-        )
+        user_teams = get_user_teams(db, user.id, descriptor.league_id)
     
     # If user is not logged in or has no teams, instruct them to log in or join teams
     if not user:
@@ -116,9 +107,9 @@ def redeem_code(code: str, request: Request, db: Session = Depends(get_db)):
 
     return templates.TemplateResponse("redeem.html", {
         "request": request,
-        "ticket": qr_code,  # Using the same template variable name for compatibility
+        "ticket": descriptor,  # Using the same template variable name for compatibility
         "user_teams": user_teams,
-        "has_achievement": bool(qr_code.achievement_name),
+        "has_achievement": bool(descriptor.achievement_name),
         "base_url": BASE_URL,
         "user": user  # Add user to the context
     })
@@ -148,6 +139,9 @@ async def apply_code(
     """
     Apply the QR code to a selected team and award points and/or achievements
     """
+    # Turn away scripted code guessing before it reaches the database
+    await limit_redemption(request, code)
+
     # Get user from session for navbar
     user = None
     user_id = request.session.get("user_id")
@@ -179,8 +173,8 @@ async def apply_code(
             }
         )
     
-    # Get the QR code
-    qr_code = db.query(QRCode).filter_by(code=code).first()
+    # Get the QR code together with its effective league
+    qr_code, effective_league_id = qr_code_with_league(db, code)
     if not qr_code:
         return templates.TemplateResponse(
             "error.html",
@@ -229,7 +223,6 @@ async def apply_code(
             }
         )
 
-    effective_league_id = qr_code_league_id(qr_code)
     if not effective_league_id:
         effective_league_id = get_default_league(db).id
 
@@ -281,6 +274,9 @@ async def apply_code(
         db.add(achievement)
     
     db.commit()
+    invalidate_code_descriptor(code)
+    REDEMPTIONS.inc(league_id=effective_league_id)
+    invalidate_fragments("leaderboard", effective_league_id)
     
     # Return the success page with appropriate information
     return templates.TemplateResponse(
@@ -306,6 +302,8 @@ async def manual_code_entry(
     Handle manual code entry from the form.
     This redirects to the normal redeem flow after validating the code.
     """
+    await limit_redemption(request, code)
+
     # Get user from session for navbar
     user = None
     user_id = request.session.get("user_id")
@@ -313,9 +311,9 @@ async def manual_code_entry(
         user = db.query(User).get(user_id)
     
     # Check if the code exists
-    qr_code = db.query(QRCode).filter_by(code=code).first()
+    descriptor = get_code_descriptor(db, code)
     
-    if not qr_code:
+    if not descriptor:
         return templates.TemplateResponse(
             "error.html",
             {
@@ -327,7 +325,7 @@ async def manual_code_entry(
         )
     
     # Check if already used (for single-use codes)
-    if qr_code.used and (not qr_code.max_uses or qr_code.max_uses <= 1):
+    if descriptor.is_spent:
         return templates.TemplateResponse(
             "error.html",
             {
@@ -1,61 +1,59 @@
 from fastapi import APIRouter
-from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 import os
 
+from ..utils.assets import STATIC_DIR, STATIC_MAX_AGE, AssetStaticFiles
+
 router = APIRouter()
 
 # Function to setup static files that will be called from main.py
 def configure_static_files(app):
     """Configure static files mounting for the application."""
-    static_dir = os.path.join(os.path.dirname(__file__), "..", "static")
-    app.mount("/static", StaticFiles(directory=static_dir), name="static")
+    app.mount("/static", AssetStaticFiles(directory=STATIC_DIR), name="static")
+
+def favicon_response(name: str) -> FileResponse:
+    """Serve a file from images/favicon; these URLs are fixed, so they are cached for STATIC_MAX_AGE."""
+    file_path = os.path.join(STATIC_DIR, "images", "favicon", name)
+    return FileResponse(file_path, headers={"Cache-Control": f"public, max-age={STATIC_MAX_AGE}"})
 
 # Serve favicon.ico
 @router.get("/favicon.ico")
 async def serve_favicon():
     """Serve favicon.ico."""
-    file_path = os.path.join(os.path.dirname(__file__), "..", "static", "images", "favicon", "favicon.ico")
-    return FileResponse(file_path)
+    return favicon_response("favicon.ico")
 
 # Serve android-chrome-192x192.png
 @router.get("/android-chrome-192x192.png")
 async def serve_android_chrome_192():
     """Serve android-chrome-192x192.png."""
-    file_path = os.path.join(os.path.dirname(__file__), "..", "static", "images", "favicon", "android-chrome-192x192.png")
-    return FileResponse(file_path)
+    return favicon_response("android-chrome-192x192.png")
 
 # Serve android-chrome-512x512.png
 @router.get("/android-chrome-512x512.png")
 async def serve_android_chrome_512():
     """Serve android-chrome-512x512.png."""
-    file_path = os.path.join(os.path.dirname(__file__), "..", "static", "images", "favicon", "android-chrome-512x512.png")
-    return FileResponse(file_path)
+    return favicon_response("android-chrome-512x512.png")
 
 # Serve apple-touch-icon.png
 @router.get("/apple-touch-icon.png")
 async def serve_apple_touch_icon():
     """Serve apple-touch-icon.png."""
-    file_path = os.path.join(os.path.dirname(__file__), "..", "static", "images", "favicon", "apple-touch-icon.png")
-    return FileResponse(file_path)
+    return favicon_response("apple-touch-icon.png")
 
 # Serve favicon-16x16.png
 @router.get("/favicon-16x16.png")
 async def serve_favicon_16():
     """Serve favicon-16x16.png."""
-    file_path = os.path.join(os.path.dirname(__file__), "..", "static", "images", "favicon", "favicon-16x16.png")
-    return FileResponse(file_path)
+    return favicon_response("favicon-16x16.png")
 
 # Serve favicon-32x32.png
 @router.get("/favicon-32x32.png")
 async def serve_favicon_32():
     """Serve favicon-32x32.png."""
-    file_path = os.path.join(os.path.dirname(__file__), "..", "static", "images", "favicon", "favicon-32x32.png")
-    return FileResponse(file_path)
+    return favicon_response("favicon-32x32.png")
 
 # Serve site.webmanifest
 @router.get("/images/favicon/site.webmanifest")
 async def serve_site_webmanifest():
     """Serve site.webmanifest."""
-    file_path = os.path.join(os.path.dirname(__file__), "..", "static", "images", "favicon", "site.webmanifest")
-    return FileResponse(file_path)
\ No newline at end of file
+    return favicon_response("site.webmanifest")
\ No newline at end of file
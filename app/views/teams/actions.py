@@ -10,6 +10,8 @@ from ...models import Team, TeamMembership, User, TeamJoinRequest
 from ...league_context import resolve_selected_league
 from ...utils.auth import get_current_user
 from ...utils.mail import send_team_join_request_notification, send_join_request_response
+from ...utils.redeem_cache import invalidate_user_teams
+from ...utils.fragment_cache import invalidate_fragments
 from ...templates_config import templates
 from .routes import get_db
 from . import utils
@@ -70,9 +72,16 @@ async def create_team_post(
     )
     db.add(team_membership)
     db.commit()
+    invalidate_user_teams(current_user.id)
+    invalidate_fragments("leaderboard", team.league_id)
 
     return RedirectResponse(f"/teams/?league_id={selected_league.id}", status_code=HTTP_303_SEE_OTHER)
 
+def invalidate_team_fragments(team: Team) -> None:
+    """Drop cached page fragments showing a team's name or description."""
+    invalidate_fragments("team_card", team.id)
+    invalidate_fragments("leaderboard", team.league_id)
+
 async def edit_team_post(
     request: Request,
     team_id: int,
@@ -107,6 +116,7 @@ async def edit_team_post(
     team.logo_url = logo_url
     team.is_open = is_open
     db.commit()
+    invalidate_team_fragments(team)
     
     return RedirectResponse(f"/teams/{team_id}", status_code=HTTP_303_SEE_OTHER)
 
@@ -151,6 +161,7 @@ async def join_team_request(
         
         db.add(new_member)
         db.commit()
+        invalidate_user_teams(current_user.id)
         
         return RedirectResponse(
             f"/teams/{team_id}?message=You+have+joined+the+team+successfully", 
@@ -256,6 +267,7 @@ def direct_join_team(request: Request, team_id: int, db: Session = Depends(get_d
     )
     db.add(new_member)
     db.commit()
+    invalidate_user_teams(user_id)
     
     # Redirect to the team detail page
     return RedirectResponse(f"/teams/{team_id}", status_code=303)
@@ -287,6 +299,7 @@ def leave_team(request: Request, team_id: int, db: Session = Depends(get_db)):
     # Delete the team membership
     db.delete(membership)
     db.commit()
+    invalidate_user_teams(user_id)
     
     return RedirectResponse("/teams/?message=Successfully+left+the+team", status_code=303)
 
@@ -317,6 +330,7 @@ def update_team(
     team.name = team_name
     team.is_public = is_public
     db.commit()
+    invalidate_team_fragments(team)
     
     return RedirectResponse(f"/teams/{team_id}", status_code=303)
 
@@ -404,6 +418,7 @@ async def approve_join_request(request: Request, token: str, db: Session = Depen
     # Update request status
     join_request.status = "approved"
     db.commit()
+    invalidate_user_teams(join_request.user_id)
     
     # Send notification to the user (if email sending is available)
     try:
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.auth import utils
+from app.auth.utils import create_user_with_unique_username, next_free_username
+from app.models import Base, User
+
+
+@pytest.fixture()
+def db():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+
+
+def add_users(db, *usernames):
+    db.add_all(User(username=name, email=f"{name}@example.com") for name in usernames)
+    db.commit()
+
+
+def test_next_free_username_fills_the_lowest_gap_in_one_query(db):
+    add_users(db, "sean", "sean1", "Sean3", "sean2b", "seanie")
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    assert next_free_username(db, "sean") == "sean2"
+    assert len(statements) == 1
+    assert next_free_username(db, "aoife") == "aoife"
+
+
+def test_like_wildcards_in_the_name_are_matched_literally(db):
+    add_users(db, "a_b", "axb1")
+
+    assert next_free_username(db, "a_b") == "a_b1"
+    assert next_free_username(db, "a%") == "a%"
+
+
+def test_create_retries_when_the_username_is_taken_concurrently(db, monkeypatch):
+    add_users(db, "niamh")
+    proposals = iter(["niamh", "niamh1"])
+    monkeypatch.setattr(utils, "next_free_username", lambda db, base: next(proposals))
+
+    user = create_user_with_unique_username(db, "niamh", email="niamh@example.org")
+
+    assert user.id and user.username == "niamh1"
+
+
+def test_create_returns_the_user_a_concurrent_signup_made_with_the_same_email(db, monkeypatch):
+    add_users(db, "ciara")
+    monkeypatch.setattr(utils, "next_free_username", lambda db, base: "ciara2")
+    add_users(db, "ciara2")
+
+    user = create_user_with_unique_username(db, "ciara", email="ciara2@example.com")
+
+    assert user.username == "ciara2" and user.email == "ciara2@example.com"
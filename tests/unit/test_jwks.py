@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.algorithms import RSAAlgorithm
+
+from app.auth.http_client import SharedHTTPClient
+from app.auth.jwks import KeySetCache, get_openid_configuration
+
+
+def make_key(kid):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk.update(kid=kid, use="sig", alg="RS256")
+    return private_key, jwk
+
+
+class StubProvider:
+    """Serves a JWKS document and a discovery document from localhost, counting requests."""
+
+    def __init__(self):
+        self.keys = []
+        self.hits = {}
+        self.fail = False
+        provider = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                provider.hits[self.path] = provider.hits.get(self.path, 0) + 1
+                if provider.fail:
+                    self.send_response(503)
+                    self.end_headers()
+                    return
+                if self.path == "/jwks":
+                    body = {"keys": provider.keys}
+                else:
+                    body = {"userinfo_endpoint": f"{provider.url}/userinfo"}
+                payload = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+
+@pytest.fixture()
+def provider():
+    stub = StubProvider()
+    yield stub
+    stub.server.shutdown()
+
+
+def sign(private_key, kid):
+    return jwt.encode({"sub": "42"}, private_key, algorithm="RS256", headers={"kid": kid})
+
+
+async def validate(key_set, token):
+    key = await key_set.get_signing_key(token)
+    return jwt.decode(token, key.key, algorithms=["RS256"])["sub"]
+
+
+def test_keys_are_fetched_once_and_reused(provider):
+    private_key, jwk = make_key("k1")
+    provider.keys = [jwk]
+    key_set = KeySetCache(f"{provider.url}/jwks", SharedHTTPClient(http2=False))
+
+    async def scenario():
+        return [await validate(key_set, sign(private_key, "k1")) for _ in range(3)]
+
+    assert asyncio.run(scenario()) == ["42"] * 3
+    assert provider.hits["/jwks"] == 1
+
+
+def test_unknown_kid_refetches_at_most_once_per_interval(provider):
+    old_key, old_jwk = make_key("old")
+    new_key, new_jwk = make_key("new")
+    provider.keys = [old_jwk]
+    key_set = KeySetCache(f"{provider.url}/jwks", SharedHTTPClient(http2=False), min_refresh_interval=0)
+
+    async def scenario():
+        await validate(key_set, sign(old_key, "old"))
+
+        # The provider rotates its key: the first token with the new kid triggers a refetch
+        provider.keys = [old_jwk, new_jwk]
+        assert await validate(key_set, sign(new_key, "new")) == "42"
+        assert provider.hits["/jwks"] == 2
+
+        key_set.min_refresh_interval = 60
+        with pytest.raises(jwt.PyJWKClientError):
+            await validate(key_set, sign(new_key, "bogus"))
+        assert provider.hits["/jwks"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_cached_keys_survive_a_failed_refresh(provider):
+    private_key, jwk = make_key("k1")
+    provider.keys = [jwk]
+    key_set = KeySetCache(f"{provider.url}/jwks", SharedHTTPClient(http2=False), ttl=0, min_refresh_interval=0)
+
+    async def scenario():
+        await validate(key_set, sign(private_key, "k1"))
+        provider.fail = True
+        results = [await validate(key_set, sign(private_key, "k1"))]
+
+        # While the provider is down, stale keys are used without retrying on every validation
+        key_set.min_refresh_interval = 60
+        results += [await validate(key_set, sign(private_key, "k1")) for _ in range(3)]
+        return results
+
+    assert asyncio.run(scenario()) == ["42"] * 4
+    assert provider.hits["/jwks"] == 2
+    assert key_set.fetches == 1
+
+
+def test_discovery_document_is_cached(provider):
+    http_client = SharedHTTPClient(http2=False)
+    url = f"{provider.url}/.well-known/openid-configuration"
+
+    async def scenario():
+        first = await get_openid_configuration(url, http_client)
+        second = await get_openid_configuration(url, http_client)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first == second == {"userinfo_endpoint": f"{provider.url}/userinfo"}
+    assert provider.hits["/.well-known/openid-configuration"] == 1
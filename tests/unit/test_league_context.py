@@ -2,9 +2,21 @@
 import pytest
 from datetime import datetime
 from sqlalchemy import create_engine
+from sqlalchemy import event as sa_event
 from sqlalchemy.orm import sessionmaker
 
-from app.league_context import get_default_league, parse_league_id, qr_code_league_id, resolve_selected_league
+from app.db_migrations import backfill_qr_code_league_ids
+from app.league_context import (
+    bootstrap_leagues,
+    get_active_leagues,
+    get_default_league,
+    invalidate_leagues,
+    league_registry,
+    parse_league_id,
+    qr_code_league_id,
+    qr_code_with_league,
+    resolve_selected_league,
+)
 from app.models import Base, Event, League, QRCode, QRSet, Team
 
 
@@ -14,26 +26,61 @@ def db_session():
     Base.metadata.create_all(bind=engine)
     TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
     db = TestingSessionLocal()
+    league_registry.clear()
     try:
         yield db
     finally:
         db.close()
+        league_registry.clear()
 
 
-def test_get_default_league_creates_compatible_default(db_session):
-    league = get_default_league(db_session)
+def count_statements(db_session):
+    statements = []
+    sa_event.listen(db_session.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+def test_bootstrap_leagues_creates_compatible_default(db_session):
+    league = bootstrap_leagues(db_session)
 
     assert league.name == "Default League"
     assert league.slug == "default"
     assert league.is_active is True
+    assert bootstrap_leagues(db_session) == league
+    assert db_session.query(League).count() == 1
 
 
-def test_resolve_selected_league_uses_active_requested_league(db_session):
+def test_leagues_are_served_from_the_registry_until_invalidated(db_session):
+    bootstrap_leagues(db_session)
+    pub = League(name="Pub League", slug="pub", is_active=True)
+    db_session.add(pub)
+    db_session.commit()
+    pub_id, version = pub.id, league_registry.version
+
+    statements = count_statements(db_session)
+    assert [league.slug for league in get_active_leagues(db_session)] == ["default"]
+    assert resolve_selected_league(db_session, pub_id).slug == "default"
+    assert statements == []
+
+    invalidate_leagues()
+    assert [league.name for league in get_active_leagues(db_session)] == ["Default League", "Pub League"]
+    assert resolve_selected_league(db_session, pub_id).name == "Pub League"
+    assert league_registry.get_by_slug(db_session, "pub").id == pub_id
+    assert len(statements) == 1
+    assert league_registry.version == version + 1
+
+    invalidate_leagues()
     get_default_league(db_session)
+    assert league_registry.version == version + 1
+
+
+def test_resolve_selected_league_uses_active_requested_league(db_session):
+    bootstrap_leagues(db_session)
     requested = League(name="Rover Pub League", slug="rover-pub", is_active=True)
     inactive = League(name="Archived Pub League", slug="archived-pub", is_active=False)
     db_session.add_all([requested, inactive])
     db_session.commit()
+    invalidate_leagues()
 
     assert resolve_selected_league(db_session, requested.id).id == requested.id
     assert resolve_selected_league(db_session, inactive.id).slug == "default"
@@ -69,3 +116,67 @@ def test_qr_code_league_id_prefers_direct_then_set_then_event(db_session):
     assert qr_code_league_id(direct_qr) == direct.id
     assert qr_code_league_id(set_qr) == via_set.id
     assert qr_code_league_id(event_qr) == via_event.id
+
+
+def test_qr_code_with_league_resolves_effective_league_in_one_query(db_session):
+    direct = League(name="Direct League", slug="direct", is_active=True)
+    via_set = League(name="Set League", slug="set", is_active=True)
+    via_event = League(name="Event League", slug="event", is_active=True)
+    db_session.add_all([direct, via_set, via_event])
+    db_session.commit()
+
+    qr_set = QRSet(name="Weekly Set", league_id=via_set.id)
+    event = Event(name="Quiz Night", league_id=via_event.id, event_date=datetime(2026, 5, 22))
+    db_session.add_all([qr_set, event])
+    db_session.commit()
+    db_session.add_all([
+        QRCode(code="direct-code", points=10, league_id=direct.id, qr_set_id=qr_set.id),
+        QRCode(code="set-code", points=10, qr_set_id=qr_set.id, event_id=event.id),
+        QRCode(code="event-code", points=10, event_id=event.id),
+        QRCode(code="orphan-code", points=10),
+    ])
+    db_session.commit()
+    expected = {
+        "direct-code": direct.id,
+        "set-code": via_set.id,
+        "event-code": via_event.id,
+        "orphan-code": None,
+    }
+    db_session.expunge_all()
+
+    statements = []
+    event_listener = lambda *args: statements.append(args[2])
+    sa_event.listen(db_session.get_bind(), "before_cursor_execute", event_listener)
+    try:
+        results = {code: qr_code_with_league(db_session, code)[1]
+                   for code in ("direct-code", "set-code", "event-code", "orphan-code")}
+    finally:
+        sa_event.remove(db_session.get_bind(), "before_cursor_execute", event_listener)
+
+    assert results == expected
+    assert len(statements) == 4
+    assert qr_code_with_league(db_session, "missing") == (None, None)
+
+
+def test_backfill_qr_code_league_ids_follows_set_then_event_then_default(db_session):
+    default = bootstrap_leagues(db_session)
+    via_set = League(name="Set League", slug="set", is_active=True)
+    via_event = League(name="Event League", slug="event", is_active=True)
+    db_session.add_all([via_set, via_event])
+    db_session.commit()
+    qr_set = QRSet(name="Weekly Set", league_id=via_set.id)
+    event = Event(name="Quiz Night", league_id=via_event.id, event_date=datetime(2026, 5, 22))
+    db_session.add_all([qr_set, event])
+    db_session.commit()
+    db_session.add_all([
+        QRCode(code="set-code", points=10, qr_set_id=qr_set.id, event_id=event.id),
+        QRCode(code="event-code", points=10, event_id=event.id),
+        QRCode(code="orphan-code", points=10),
+    ])
+    db_session.commit()
+
+    assert backfill_qr_code_league_ids(db_session.connection(), default.id) == 3
+    db_session.commit()
+
+    league_ids = dict(db_session.query(QRCode.code, QRCode.league_id).all())
+    assert league_ids == {"set-code": via_set.id, "event-code": via_event.id, "orphan-code": default.id}
@@ -0,0 +1,16 @@
+#!/usr/bin/env python3
+import logging
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+
+def test_template_globals_run_inside_the_session_middleware(caplog):
+    client = TestClient(app)
+
+    with caplog.at_level(logging.ERROR, logger="app.main"):
+        response = client.get("/about")
+
+    assert response.status_code == 200
+    assert not [record for record in caplog.records if record.name == "app.main"]
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+import asyncio
+
+from app.auth.http_client import SharedHTTPClient
+from app.auth.oauth import GoogleOAuth, OAuthManager
+
+
+def test_borrowed_client_stays_open_and_is_reused():
+    shared = SharedHTTPClient(http2=False)
+
+    async def scenario():
+        async with shared.borrow() as first:
+            pass
+        async with shared.borrow() as second:
+            pass
+        assert first is second and not first.is_closed
+        await shared.aclose()
+        assert first.is_closed
+        reopened = shared.get()
+        await shared.aclose()
+        return reopened is not first
+
+    assert asyncio.run(scenario())
+
+
+def test_manager_injects_its_client_into_provider_token_requests(monkeypatch):
+    monkeypatch.setenv("GOOGLE_CLIENT_ID", "client-id")
+    monkeypatch.setenv("GOOGLE_CLIENT_SECRET", "client-secret")
+    shared = SharedHTTPClient(http2=False)
+    manager = OAuthManager(http_client=shared)
+    manager.register_provider(GoogleOAuth())
+    provider = manager.get_provider("google")
+
+    async def scenario():
+        async with provider.client.get_httpx_client() as client:
+            assert client is shared.get()
+        assert not client.is_closed
+        await shared.aclose()
+
+    assert provider.http_client is shared
+    asyncio.run(scenario())
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+import asyncio
+import threading
+
+import pytest
+
+from app import security
+from app.security import (
+    PASSWORD_HASH_REJECTED,
+    PasswordHashPolicy,
+    PasswordHashPool,
+    PasswordHashingBusy,
+)
+
+
+def test_pool_runs_work_off_the_event_loop_thread():
+    pool = PasswordHashPool(workers=2, max_queue=4)
+
+    async def scenario():
+        return await asyncio.gather(*(pool.run("hash", threading.current_thread) for _ in range(3)))
+
+    loop_thread = threading.current_thread()
+    threads = asyncio.run(scenario())
+    assert all(thread is not loop_thread and thread.name.startswith("password-hash") for thread in threads)
+    assert pool.depth == 0
+    pool.shutdown()
+
+
+def test_pool_rejects_work_beyond_its_queue_limit():
+    pool = PasswordHashPool(workers=1, max_queue=2)
+    release = threading.Event()
+    rejected_before = PASSWORD_HASH_REJECTED.value(operation="verify")
+
+    async def scenario():
+        running = [asyncio.ensure_future(pool.run("verify", release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        assert pool.depth == 2
+        with pytest.raises(PasswordHashingBusy):
+            await pool.run("verify", release.wait)
+        release.set()
+        return await asyncio.gather(*running)
+
+    assert asyncio.run(scenario()) == [True, True]
+    assert pool.depth == 0
+    assert PASSWORD_HASH_REJECTED.value(operation="verify") == rejected_before + 1
+    pool.shutdown()
+
+
+def test_policy_verifies_and_flags_cheaper_hashes_for_rehash():
+    legacy = PasswordHashPolicy(scheme="bcrypt", bcrypt_rounds=4)
+    policy = PasswordHashPolicy(scheme="bcrypt", bcrypt_rounds=5)
+    old_hash = legacy.hash("correct horse")
+
+    assert policy.verify("correct horse", old_hash)
+    assert not policy.verify("wrong horse", old_hash)
+    assert not policy.verify("correct horse", None)
+    assert policy.needs_rehash(old_hash)
+    assert not policy.needs_rehash(policy.hash("correct horse"))
+    assert policy.needs_rehash("$argon2id$v=19$m=65536,t=3,p=4$c2FsdA$aGFzaA")
+
+
+def test_long_passwords_are_truncated_like_before():
+    policy = PasswordHashPolicy(scheme="bcrypt", bcrypt_rounds=4)
+    hashed = policy.hash("x" * 100)
+
+    assert policy.verify("x" * 72, hashed)
+    assert policy.verify("x" * 100, hashed)
+
+
+def test_calibration_stays_within_configured_bounds(monkeypatch):
+    monkeypatch.setattr(security, "BCRYPT_MIN_ROUNDS", 4)
+    monkeypatch.setattr(security, "BCRYPT_MAX_ROUNDS", 6)
+    policy = PasswordHashPolicy(scheme="bcrypt", bcrypt_rounds=12)
+
+    assert policy.calibrate(target_ms=0.001) == 4
+    assert policy.calibrate(target_ms=60_000) == 6
+    assert policy.hash("pw").startswith("$2b$06$")
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+from app import templates_config
+from app.templates_config import MyJinjaTemplates, templates
+
+
+def test_all_page_templates_compile():
+    names = templates.env.list_templates(filter_func=lambda name: not name.startswith("email/"))
+
+    assert templates.precompile() == len(names)
+    assert templates.env.auto_reload is False
+
+
+def test_compiled_templates_are_persisted_for_other_workers(tmp_path, monkeypatch):
+    template_dir = tmp_path / "templates"
+    template_dir.mkdir()
+    (template_dir / "hello.html").write_text("Hello {{ name }} at {{ now().year }}")
+    cache_dir = tmp_path / "bytecode"
+    monkeypatch.setattr(templates_config, "TEMPLATE_BYTECODE_CACHE_DIR", str(cache_dir))
+
+    first_worker = MyJinjaTemplates(directory=str(template_dir))
+    assert first_worker.precompile() == 1
+    assert len(list(cache_dir.iterdir())) == 1
+
+    second_worker = MyJinjaTemplates(directory=str(template_dir))
+    env = second_worker.env
+    source, filename, _ = env.loader.get_source(env, "hello.html")
+    assert env.bytecode_cache.get_bucket(env, "hello.html", filename, source).code is not None
+    assert env.get_template("hello.html").render(name="<b>").startswith("Hello &lt;b&gt; at ")
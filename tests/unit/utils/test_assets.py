@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+import gzip
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.utils import assets
+from app.utils.assets import AssetStaticFiles, asset_url, build_assets, load_manifest
+
+CSS = b"body { color: #006400; }\n" * 200
+
+
+@pytest.fixture()
+def static_dir(tmp_path):
+    (tmp_path / "css").mkdir()
+    (tmp_path / "css" / "styles.css").write_bytes(CSS)
+    (tmp_path / "images").mkdir()
+    (tmp_path / "images" / "logo.png").write_bytes(b"\x89PNG" + bytes(range(256)))
+    (tmp_path / "uploads").mkdir()
+    (tmp_path / "uploads" / "photo.jpg").write_bytes(b"jpeg")
+    return tmp_path
+
+
+def test_build_fingerprints_assets_and_precompresses_text(static_dir):
+    manifest = build_assets(static_dir)
+
+    assert set(manifest) == {"css/styles.css", "images/logo.png"}
+    css = static_dir / manifest["css/styles.css"]
+    assert manifest["css/styles.css"].startswith("dist/css/styles.") and css.read_bytes() == CSS
+    assert gzip.decompress((static_dir / (manifest["css/styles.css"] + ".gz")).read_bytes()) == CSS
+    assert not (static_dir / (manifest["images/logo.png"] + ".gz")).exists()
+    assert load_manifest(static_dir) == manifest
+
+    # A changed file gets a new name; the old one stays for pages still referencing it
+    (static_dir / "css" / "styles.css").write_bytes(CSS + b"a { }\n")
+    assert build_assets(static_dir)["css/styles.css"] != manifest["css/styles.css"]
+    assert css.exists()
+
+
+def test_asset_url_uses_the_manifest(monkeypatch):
+    monkeypatch.setattr(assets, "ASSET_FINGERPRINTING", True)
+    monkeypatch.setattr(assets, "_manifest", {"js/main.js": "dist/js/main.0123456789ab.js"})
+
+    assert asset_url("js/main.js") == "/static/dist/js/main.0123456789ab.js"
+    assert asset_url("/images/unknown.png") == "/static/images/unknown.png"
+
+    monkeypatch.setattr(assets, "ASSET_FINGERPRINTING", False)
+    assert asset_url("js/main.js") == "/static/js/main.js"
+
+
+def test_static_files_negotiate_encoding_and_cache_fingerprinted_files(static_dir):
+    manifest = build_assets(static_dir)
+    app = FastAPI()
+    app.mount("/static", AssetStaticFiles(directory=static_dir), name="static")
+    client = TestClient(app)
+    url = f"/static/{manifest['css/styles.css']}"
+
+    response = client.get(url, headers={"Accept-Encoding": "gzip, deflate"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["content-type"].startswith("text/css")
+    assert response.headers["cache-control"] == assets.IMMUTABLE_CACHE_CONTROL
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.content == CSS
+
+    identity = client.get(url, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers and identity.content == CSS
+    revalidated = client.get(url, headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["etag"]})
+    assert revalidated.status_code == 304
+
+    original = client.get("/static/css/styles.css")
+    assert original.headers["cache-control"] == f"public, max-age={assets.STATIC_MAX_AGE}"
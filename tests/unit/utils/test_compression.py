@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+import gzip
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import HTMLResponse, PlainTextResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.utils.compression import CompressionMiddleware, accepted_encodings
+
+PAGE = "<tr><td>Quizzers</td><td>42</td></tr>\n" * 100
+
+
+@pytest.fixture()
+def client():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+
+    @app.get("/page")
+    def page():
+        return HTMLResponse(PAGE, headers={"ETag": '"v1"'})
+
+    @app.get("/small")
+    def small():
+        return PlainTextResponse("ok")
+
+    @app.get("/export.csv")
+    def export():
+        return StreamingResponse((f"{n},Team {n}\n" for n in range(1000)), media_type="text/csv")
+
+    @app.get("/code.png")
+    def png():
+        return StreamingResponse(iter([b"\x89PNG" + b"\x00" * 2048]), media_type="image/png")
+
+    @app.get("/precompressed")
+    def precompressed():
+        return Response(gzip.compress(PAGE.encode()), media_type="text/css", headers={"Content-Encoding": "gzip"})
+
+    return TestClient(app)
+
+
+def test_large_text_responses_are_compressed(client):
+    response = client.get("/page", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"] == 'W/"v1"'
+    assert int(response.headers["content-length"]) < len(PAGE) / 10
+    assert response.text == PAGE
+
+
+def test_streaming_responses_are_compressed_chunk_by_chunk(client):
+    with client.stream("GET", "/export.csv", headers={"Accept-Encoding": "gzip"}) as response:
+        assert response.headers["content-encoding"] == "gzip"
+        assert "content-length" not in response.headers
+        body = b"".join(response.iter_bytes())
+
+    assert body.decode() == "".join(f"{n},Team {n}\n" for n in range(1000))
+
+
+@pytest.mark.parametrize("path, accept", [
+    ("/small", "gzip"),
+    ("/code.png", "gzip"),
+    ("/page", "identity"),
+    ("/page", "gzip;q=0"),
+])
+def test_responses_that_are_not_worth_compressing_pass_through(client, path, accept):
+    response = client.get(path, headers={"Accept-Encoding": accept})
+
+    assert "content-encoding" not in response.headers
+
+
+def test_already_encoded_responses_are_left_alone(client):
+    response = client.get("/precompressed", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "vary" not in response.headers
+    assert response.text == PAGE
+
+
+def test_accepted_encodings_ignores_refused_codings():
+    assert accepted_encodings("gzip, deflate, br;q=0") == {"gzip", "deflate"}
+    assert accepted_encodings("br;q=0.5, gzip;q=0.0, *") == {"br", "*"}
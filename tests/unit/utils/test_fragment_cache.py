@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+import pytest
+from jinja2 import DictLoader, Environment
+
+from app.utils import fragment_cache as fragments
+from app.utils.fragment_cache import FragmentCacheExtension, invalidate_fragments
+
+TEMPLATES = {
+    "podium.html": (
+        '{% cache "leaderboard", league_id, ttl=60 %}'
+        '{% for team in teams %}{{ team }};{% endfor %}'
+        '{% endcache %}'
+    ),
+    "card.html": '{% cache "team_card", team.id %}<b>{{ team.name }}</b>{% endcache %}',
+}
+
+
+@pytest.fixture()
+def env():
+    invalidate_fragments()
+    yield Environment(loader=DictLoader(TEMPLATES), extensions=[FragmentCacheExtension], autoescape=True)
+    invalidate_fragments()
+
+
+def test_fragments_are_reused_per_key_until_invalidated(env):
+    podium = env.get_template("podium.html")
+
+    assert podium.render(league_id=1, teams=["Quizzers"]) == "Quizzers;"
+    assert podium.render(league_id=1, teams=["Brains"]) == "Quizzers;"
+    assert podium.render(league_id=2, teams=["Brains"]) == "Brains;"
+
+    invalidate_fragments("leaderboard", 1)
+    assert podium.render(league_id=1, teams=["Brains"]) == "Brains;"
+    assert podium.render(league_id=2, teams=["Quizzers"]) == "Brains;"
+
+
+def test_invalidating_a_name_leaves_other_fragments(env):
+    card = env.get_template("card.html")
+    podium = env.get_template("podium.html")
+    assert card.render(team={"id": 7, "name": "<Quizzers>"}) == "<b>&lt;Quizzers&gt;</b>"
+    podium.render(league_id=1, teams=["Quizzers"])
+
+    invalidate_fragments("team_card")
+
+    assert card.render(team={"id": 7, "name": "Brains"}) == "<b>Brains</b>"
+    assert podium.render(league_id=1, teams=["Brains"]) == "Quizzers;"
+
+
+def test_fragment_cache_can_be_disabled(env, monkeypatch):
+    monkeypatch.setattr(fragments, "FRAGMENT_CACHE_ENABLED", False)
+    podium = env.get_template("podium.html")
+
+    podium.render(league_id=1, teams=["Quizzers"])
+    assert podium.render(league_id=1, teams=["Brains"]) == "Brains;"
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+import smtplib
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, MailAnnouncement, OutboundEmail
+from app.utils import mail_queue
+from app.utils.mail_queue import MailQueueWorker, enqueue_email
+
+
+class FakeConnection:
+    """Stands in for SMTPConnection and records every delivery."""
+
+    def __init__(self):
+        self.opened = 0
+        self.sent = []
+        self.fail_with = {}
+        self._open = False
+
+    @property
+    def is_open(self):
+        return self._open
+
+    @property
+    def idle_seconds(self):
+        return 0
+
+    def send(self, msg, recipients):
+        if not self._open:
+            self.opened += 1
+            self._open = True
+        error = self.fail_with.get(recipients[0])
+        if error:
+            raise error
+        self.sent.append((msg["Subject"], recipients))
+
+    def close(self):
+        self._open = False
+
+
+@pytest.fixture()
+def session_factory():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture()
+def worker(session_factory):
+    return MailQueueWorker(session_factory=session_factory, connection_factory=FakeConnection, batch_size=10)
+
+
+def test_worker_sends_batch_over_one_connection(session_factory, worker):
+    for index in range(3):
+        enqueue_email(f"player{index}@example.com", f"Hello {index}", "<p>Hi</p>", session_factory=session_factory)
+
+    assert worker.process_batch() == 3
+    assert worker.connection.opened == 1
+    assert [recipients for _, recipients in worker.connection.sent] == [
+        ["player0@example.com"], ["player1@example.com"], ["player2@example.com"]
+    ]
+    db = session_factory()
+    assert {message.status for message in db.query(OutboundEmail)} == {"sent"}
+    assert worker.process_batch() == 0
+
+
+def test_worker_retries_with_backoff_then_gives_up(session_factory, worker, monkeypatch):
+    monkeypatch.setattr(mail_queue, "MAIL_MAX_ATTEMPTS", 2)
+    worker.connection.fail_with["flaky@example.com"] = smtplib.SMTPServerDisconnected("gone")
+    message_id = enqueue_email("flaky@example.com", "Retry", "<p>Hi</p>", session_factory=session_factory)
+
+    before = datetime.utcnow()
+    worker.process_batch()
+    db = session_factory()
+    message = db.get(OutboundEmail, message_id)
+    assert message.status == "pending"
+    assert message.attempts == 1
+    assert message.next_attempt_at >= before + timedelta(seconds=mail_queue.MAIL_RETRY_BASE_DELAY)
+
+    # Not due yet
+    assert worker.process_batch() == 0
+
+    message.next_attempt_at = datetime.utcnow()
+    db.commit()
+    worker.process_batch()
+    db.expire_all()
+    message = db.get(OutboundEmail, message_id)
+    assert message.status == "failed"
+    assert message.last_error == "gone"
+
+
+def test_refused_recipient_fails_without_retry(session_factory, worker):
+    worker.connection.fail_with["nobody@example.com"] = smtplib.SMTPRecipientsRefused({"nobody@example.com": (550, b"unknown")})
+    message_id = enqueue_email("nobody@example.com", "Bounce", "<p>Hi</p>", session_factory=session_factory)
+
+    worker.process_batch()
+
+    message = session_factory().get(OutboundEmail, message_id)
+    assert message.status == "failed"
+    assert message.attempts == 1
+
+
+def test_retry_delay_is_exponential_and_capped(monkeypatch):
+    monkeypatch.setattr(mail_queue, "MAIL_RETRY_BASE_DELAY", 30)
+    monkeypatch.setattr(mail_queue, "MAIL_RETRY_MAX_DELAY", 100)
+
+    assert [mail_queue.retry_delay(n).total_seconds() for n in (1, 2, 3, 4)] == [30, 60, 100, 100]
+
+
+def test_transactional_mail_is_claimed_before_bulk_mail(session_factory):
+    worker = MailQueueWorker(session_factory=session_factory, connection_factory=FakeConnection, batch_size=1)
+    db = session_factory()
+    mail_queue.enqueue_bulk(db, [
+        {"recipients": f"member{index}@example.com", "subject": "News", "html_content": "<p>News</p>", "priority": 10}
+        for index in range(3)
+    ])
+    enqueue_email("reset@example.com", "Reset", "<p>Reset</p>", session_factory=session_factory)
+
+    worker.process_batch()
+
+    assert worker.connection.sent == [("Reset", ["reset@example.com"])]
+
+
+def test_purge_deletes_only_old_sent_messages(session_factory, worker):
+    now = datetime.utcnow()
+    db = session_factory()
+    db.add_all([
+        OutboundEmail(recipients="old@example.com", subject="Old", html_content="<p>Hi</p>",
+                      status="sent", sent_at=now - timedelta(days=31)),
+        OutboundEmail(recipients="recent@example.com", subject="Recent", html_content="<p>Hi</p>",
+                      status="sent", sent_at=now - timedelta(days=1)),
+        OutboundEmail(recipients="failed@example.com", subject="Failed", html_content="<p>Hi</p>",
+                      status="failed", created_at=now - timedelta(days=60)),
+    ])
+    db.commit()
+
+    assert worker.purge() == 1
+    assert sorted(message.subject for message in db.query(OutboundEmail)) == ["Failed", "Recent"]
+    # Purges at most once per interval
+    db.add(OutboundEmail(recipients="old@example.com", subject="Old", html_content="<p>Hi</p>",
+                         status="sent", sent_at=now - timedelta(days=31)))
+    db.commit()
+    assert worker.purge() == 0
+
+
+def test_worker_counts_announcement_deliveries(session_factory, worker):
+    db = session_factory()
+    announcement = MailAnnouncement(subject="News", body="Hi", audience_type="league", audience_id=1, total_recipients=2)
+    db.add(announcement)
+    db.commit()
+    worker.connection.fail_with["nobody@example.com"] = smtplib.SMTPRecipientsRefused({"nobody@example.com": (550, b"unknown")})
+    mail_queue.enqueue_bulk(db, [
+        {"recipients": address, "subject": "News", "html_content": "<p>News</p>", "announcement_id": announcement.id}
+        for address in ("member@example.com", "nobody@example.com")
+    ])
+
+    assert worker.process_batch() == 2
+
+    db.expire_all()
+    announcement = db.get(MailAnnouncement, announcement.id)
+    assert (announcement.sent_count, announcement.failed_count) == (1, 1)
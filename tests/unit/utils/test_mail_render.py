@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+import pytest
+
+from app.utils import mail
+from app.utils.mail import MailRenderer
+
+
+@pytest.fixture()
+def renderer(tmp_path):
+    (tmp_path / "email").mkdir()
+    (tmp_path / "email" / "note.html").write_text(
+        "<html><body><p>Hello {{ username }},</p>"
+        "{% if message %}<p>Note: {{ message }}</p>{% endif %}"
+        "<a href=\"{{ base_url }}/dashboard\">Dashboard</a></body></html>"
+    )
+    return MailRenderer(str(tmp_path))
+
+
+def test_precompile_loads_email_templates(renderer):
+    assert renderer.precompile() == 1
+
+
+def test_batch_render_converts_html_to_text_once(renderer, monkeypatch):
+    calls = []
+    original = mail.html_to_plain_text
+    monkeypatch.setattr(mail, "html_to_plain_text", lambda html: calls.append(html) or original(html))
+
+    rendered = list(renderer.render_many(
+        "email/note.html",
+        [{"username": name, "message": "Quiz on Friday"} for name in ("alice", "bob", "carol")],
+        shared={"base_url": "https://example.com"},
+    ))
+
+    assert len(calls) == 1
+    assert [r.text.splitlines()[0] for r in rendered] == ["Hello alice,", "Hello bob,", "Hello carol,"]
+    assert 'href="https://example.com/dashboard"' in rendered[0].html
+
+
+def test_empty_personal_values_still_drive_conditionals(renderer):
+    with_message = renderer.render("email/note.html", username="alice", message="Bring pens")
+    without_message = renderer.render("email/note.html", username="alice", message="")
+
+    assert "Note: Bring pens" in with_message.text
+    assert "Note:" not in without_message.text
+
+
+def test_personal_values_are_escaped_in_html_only(renderer):
+    rendered = renderer.render("email/note.html", username="<Quiz & Co>", message="")
+
+    assert "Hello &lt;Quiz &amp; Co&gt;," in rendered.html
+    assert "Hello <Quiz & Co>," in rendered.text
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+import logging
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.utils.cache import TTLCache, named_caches
+from app.utils.metrics import (
+    Counter,
+    Histogram,
+    MetricsMiddleware,
+    MetricsRegistry,
+    REQUEST_DURATION,
+    RecentErrorsHandler,
+)
+
+
+def test_registry_renders_text_exposition_format():
+    registry = MetricsRegistry()
+    redemptions = registry.register(Counter("redemptions_total", "Codes redeemed.", ["league_id"]))
+    latency = registry.register(Histogram("latency_seconds", "Latency.", ["route"], buckets=(0.1, 1.0)))
+    redemptions.inc(league_id=3)
+    redemptions.inc(2, league_id=3)
+    latency.observe(0.05, route="/redeem/{code}")
+    latency.observe(0.5, route="/redeem/{code}")
+
+    lines = registry.render().splitlines()
+
+    assert "# TYPE redemptions_total counter" in lines
+    assert 'redemptions_total{league_id="3"} 3' in lines
+    assert 'latency_seconds_bucket{route="/redeem/{code}",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/redeem/{code}",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{route="/redeem/{code}",le="+Inf"} 2' in lines
+    assert 'latency_seconds_count{route="/redeem/{code}"} 2' in lines
+
+
+def test_failing_collector_does_not_break_the_scrape():
+    registry = MetricsRegistry()
+    registry.register(Counter("ok_total", "Still reported.")).inc()
+
+    @registry.add_collector
+    def broken():
+        raise RuntimeError("database unavailable")
+
+    assert "ok_total 1" in registry.render()
+
+
+def test_middleware_labels_latency_by_route_template():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/things/{thing_id}")
+    def thing(thing_id: int):
+        return {"id": thing_id}
+
+    client = TestClient(app)
+    client.get("/things/1")
+    client.get("/things/2")
+    client.get("/nowhere")
+
+    samples = {(name, tuple(sorted(labels.items()))): value for name, labels, value in REQUEST_DURATION.samples()}
+    route = (("method", "GET"), ("route", "/things/{thing_id}"), ("status", "200"))
+    assert samples[("leagueledger_http_request_duration_seconds_count", route)] == 2
+    unmatched = (("method", "GET"), ("route", "unmatched"), ("status", "404"))
+    assert samples[("leagueledger_http_request_duration_seconds_count", unmatched)] >= 1
+
+
+def test_named_caches_count_hits_and_misses():
+    cache = TTLCache(ttl=60, name="test_cache")
+    cache.get("missing")
+    cache.set("key", "value")
+    cache.get("key")
+    cache.get("key")
+
+    assert (cache.hits, cache.misses) == (2, 1)
+    assert cache in named_caches()
+
+
+def test_recent_errors_handler_keeps_latest_errors():
+    handler = RecentErrorsHandler(size=2)
+    test_logger = logging.getLogger("tests.metrics")
+    test_logger.addHandler(handler)
+    try:
+        test_logger.warning("not kept")
+        for number in range(3):
+            test_logger.error("failure %d", number)
+    finally:
+        test_logger.removeHandler(handler)
+
+    assert [record["message"] for record in handler.records] == ["failure 1", "failure 2"]
+
+
+def test_route_template_includes_router_prefix():
+    from fastapi import APIRouter
+
+    router = APIRouter()
+
+    @router.post("/apply/{code}")
+    def apply(code: str):
+        return {"code": code}
+
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(router, prefix="/redeem")
+    TestClient(app).post("/redeem/apply/abc123")
+
+    routes = {labels["route"] for _, labels, _ in REQUEST_DURATION.samples()}
+    assert "/redeem/apply/{code}" in routes
+    assert "/redeem/apply/abc123" not in routes
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+import asyncio
+import io
+
+import pytest
+from fastapi import UploadFile
+from PIL import Image
+
+from app.utils import profile_pictures
+from app.utils.profile_pictures import (
+    ProfilePicture,
+    ProfilePictureError,
+    delete_profile_picture_files,
+    profile_picture,
+    store_profile_picture,
+)
+
+
+@pytest.fixture()
+def picture_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(profile_pictures, "PROFILE_PICTURE_DIR", tmp_path)
+    return tmp_path
+
+
+def upload(data, filename="photo.png"):
+    return UploadFile(file=io.BytesIO(data), filename=filename)
+
+
+def png(width, height):
+    buffer = io.BytesIO()
+    Image.new("RGBA", (width, height), (0, 128, 0, 128)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def test_upload_is_stored_as_square_webp_and_jpeg_at_every_size(picture_dir):
+    url = asyncio.run(store_profile_picture(upload(png(1200, 800))))
+
+    files = sorted(path.name for path in picture_dir.iterdir())
+    assert len(files) == 2 * len(profile_pictures.PROFILE_PICTURE_SIZES)
+    assert not any(name.endswith(".upload") for name in files)
+    small = profile_picture(url, "small")
+    assert small.src.endswith("-80.jpg") and small.webp.endswith("-80.webp")
+    with Image.open(picture_dir / small.webp.rsplit("/", 1)[1]) as image:
+        assert image.format == "WEBP" and image.size == (80, 80)
+    with Image.open(picture_dir / url.rsplit("/", 1)[1]) as image:
+        assert image.format == "JPEG" and image.size == (256, 256)
+
+    delete_profile_picture_files(url)
+    assert not list(picture_dir.iterdir())
+
+
+def test_oversized_and_invalid_uploads_are_rejected(picture_dir):
+    with pytest.raises(ProfilePictureError, match="too large"):
+        asyncio.run(profile_pictures.save_upload(upload(b"x" * 4096), picture_dir / "big.upload", max_bytes=1024))
+    with pytest.raises(ProfilePictureError, match="could not be read"):
+        asyncio.run(store_profile_picture(upload(b"not an image", "photo.jpg")))
+
+    assert not list(picture_dir.iterdir())
+
+
+def test_pictures_hosted_elsewhere_are_served_unchanged():
+    assert profile_picture("https://avatars.example.com/u/1.png", "small") == ProfilePicture("https://avatars.example.com/u/1.png")
+    assert profile_picture("/static/uploads/profile_pictures/legacy.jpg") == ProfilePicture("/static/uploads/profile_pictures/legacy.jpg")
+    assert profile_picture(None) is None
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+import os
+import time
+import threading
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.authentication import AuthCredentials
+
+from app.utils import profiling
+from app.utils.profiling import (
+    ProfilingMiddleware,
+    StackSampler,
+    list_profiles,
+    new_profile_name,
+    profile_path,
+    save_profile,
+)
+
+
+@pytest.fixture(autouse=True)
+def profiling_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILING_DIR", str(tmp_path))
+    # Treat this test module as application code
+    monkeypatch.setattr(profiling, "APP_DIR", os.path.dirname(os.path.abspath(__file__)))
+    return tmp_path
+
+
+def busy_handler(seconds):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        sum(range(1000))
+
+
+def make_app(scopes):
+    app = FastAPI()
+
+    @app.get("/slow")
+    def slow():
+        busy_handler(0.1)
+        return {"ok": True}
+
+    app.add_middleware(ProfilingMiddleware)
+
+    # Stand-in for AuthenticationMiddleware
+    inner = app.build_middleware_stack()
+
+    async def with_auth(scope, receive, send):
+        scope["auth"] = AuthCredentials(scopes)
+        await inner(scope, receive, send)
+
+    return with_auth
+
+
+def test_sampler_keeps_only_stacks_running_application_code():
+    idle = threading.Event()
+    idle_thread = threading.Thread(target=idle.wait, daemon=True)
+    idle_thread.start()
+    sampler = StackSampler(interval=0.001).start()
+    try:
+        busy_handler(0.1)
+    finally:
+        sampler.stop()
+        idle.set()
+
+    assert sampler.samples > 0
+    assert any("busy_handler" in stack for stack in sampler.stacks)
+    assert all("test_sampler_keeps_only_stacks_running_application_code" in stack for stack in sampler.stacks)
+
+
+def test_admin_header_saves_a_downloadable_profile():
+    client = TestClient(make_app(["authenticated", "admin"]))
+
+    response = client.get("/slow", headers={"X-Profile": "1"})
+
+    name = response.headers["x-profile-id"]
+    assert [profile.name for profile in list_profiles()] == [name]
+    with open(profile_path(name)) as f:
+        lines = f.read().splitlines()
+    assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+
+def test_non_admins_and_plain_requests_are_not_profiled():
+    assert "x-profile-id" not in TestClient(make_app(["authenticated"])).get(
+        "/slow", headers={"X-Profile": "1"}).headers
+    assert "x-profile-id" not in TestClient(make_app(["authenticated", "admin"])).get("/slow").headers
+    assert list_profiles() == []
+
+
+def test_profile_path_rejects_other_files(profiling_dir):
+    sampler = StackSampler()
+    sampler.stacks["main (app/main.py:1)"] = 3
+    sampler.samples = 3
+    name = new_profile_name("GET", "/admin/user")
+    save_profile(name, sampler)
+    (profiling_dir / "secret.txt").write_text("nope")
+
+    assert profile_path(name)
+    assert profile_path("secret.txt") is None
+    assert profile_path("../" + name) is None
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.models import Base, User
+from app.utils import query_stats
+from app.utils.query_stats import QueryStatsMiddleware, install_query_hooks
+
+
+@pytest.fixture()
+def client():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    install_query_hooks(engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    app = FastAPI()
+    app.add_middleware(QueryStatsMiddleware)
+
+    @app.get("/users/{count}")
+    def list_users(count: int):
+        db = SessionLocal()
+        try:
+            # One lookup per user, the way an N+1 would
+            return [db.query(User).filter(User.id == user_id).first() is None for user_id in range(count)]
+        finally:
+            db.close()
+
+    return TestClient(app)
+
+
+def test_server_timing_reports_statements_of_the_request(client):
+    response = client.get("/users/3")
+
+    assert response.status_code == 200
+    assert 'desc="3 queries"' in response.headers["server-timing"]
+    assert "app;dur=" in response.headers["server-timing"]
+
+
+def test_slow_requests_are_logged_with_grouped_statements(client, monkeypatch, caplog):
+    monkeypatch.setattr(query_stats, "SLOW_REQUEST_QUERY_COUNT", 4)
+
+    def slow_request_records():
+        # Other tests' SQLite engines may log pool errors when collected mid-test
+        return [record for record in caplog.records if record.name == "app.utils.query_stats"]
+
+    with caplog.at_level(logging.WARNING, logger="app.utils.query_stats"):
+        client.get("/users/2")
+        assert not slow_request_records()
+        client.get("/users/5")
+
+    assert len(slow_request_records()) == 1
+    message = slow_request_records()[0].getMessage()
+    assert "Slow request GET /users/5: 5 queries" in message
+    assert "5x SELECT users.id" in message
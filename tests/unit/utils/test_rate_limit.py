@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+import asyncio
+
+import pytest
+from starlette.requests import Request
+
+from app.utils import rate_limit
+from app.utils.rate_limit import (
+    MemoryRateLimitStore,
+    RateLimiter,
+    RateLimitExceeded,
+    RateLimitRule,
+    code_prefix,
+)
+
+RULE = RateLimitRule("test", capacity=3, period=30)
+
+
+def make_request(host="203.0.113.7", session=None):
+    return Request({
+        "type": "http",
+        "method": "POST",
+        "path": "/",
+        "headers": [],
+        "client": (host, 1234),
+        "session": session or {},
+    })
+
+
+def test_bucket_allows_bursts_then_refills_over_the_period():
+    store = MemoryRateLimitStore()
+    assert [store.take_now("k", RULE, 100.0) for _ in range(3)] == [0, 0, 0]
+    assert store.take_now("k", RULE, 100.0) == pytest.approx(10.0)
+    # One token comes back every period / capacity seconds
+    assert store.take_now("k", RULE, 110.0) == 0
+    assert store.take_now("k", RULE, 110.0) > 0
+    assert store.take_now("other", RULE, 110.0) == 0
+
+
+def test_store_evicts_idle_buckets_beyond_its_limit():
+    store = MemoryRateLimitStore(max_buckets=2)
+    store.take_now("a", RULE, 0.0)
+    store.take_now("b", RULE, 20.0)
+    store.take_now("c", RULE, 40.0)
+    assert len(store) == 2
+    assert store.take_now("b", RULE, 40.0) == 0
+
+
+def test_limiter_raises_for_the_first_empty_bucket_and_skips_missing_keys():
+    limiter = RateLimiter(enabled=True)
+    ip_rule = RateLimitRule("ip", capacity=1, period=60)
+
+    async def scenario():
+        await limiter.check([(ip_rule, "1.2.3.4"), (RULE, None)])
+        with pytest.raises(RateLimitExceeded) as excinfo:
+            await limiter.check([(ip_rule, "1.2.3.4")])
+        return excinfo.value
+
+    exc = asyncio.run(scenario())
+    assert exc.rule is ip_rule
+    assert exc.retry_after == pytest.approx(60, abs=1)
+
+
+def test_limiter_uses_the_shared_store_and_falls_back_to_memory():
+    class SharedStore:
+        """Local stand-in for a shared store such as Redis."""
+        def __init__(self):
+            self.keys = []
+            self.down = False
+
+        async def take(self, key, rule):
+            if self.down:
+                raise ConnectionError("store unavailable")
+            self.keys.append(key)
+            return 0.0
+
+    shared = SharedStore()
+    limiter = RateLimiter(shared, enabled=True)
+
+    async def scenario():
+        await limiter.check([(RULE, "alice")])
+        shared.down = True
+        await limiter.check([(RULE, "alice")])
+
+    asyncio.run(scenario())
+    assert shared.keys == ["test:alice"]
+    assert len(limiter.memory) == 1
+
+
+def test_redemption_checks_ip_user_and_code_prefix(monkeypatch):
+    limiter = RateLimiter(enabled=True)
+    monkeypatch.setattr(rate_limit, "rate_limiter", limiter)
+    monkeypatch.setattr(rate_limit, "REDEEM_PER_CODE_PREFIX", RateLimitRule("redeem_code_prefix", 2, 60))
+
+    async def scenario():
+        # Other clients redeeming codes with the same prefix draw from their own buckets
+        for host in ("198.51.100.1", "198.51.100.2", "198.51.100.3"):
+            await rate_limit.limit_redemption(make_request(host), "ABCD-2222")
+        await rate_limit.limit_redemption(make_request(session={"user_id": 1}), "abcd-1111")
+        await rate_limit.limit_redemption(make_request("198.51.100.9", session={"user_id": 1}), "ABCD-2222")
+        with pytest.raises(RateLimitExceeded) as excinfo:
+            await rate_limit.limit_redemption(make_request(session={"user_id": 1}), "abcd-3333")
+        return excinfo.value
+
+    assert asyncio.run(scenario()).rule.name == "redeem_code_prefix"
+    assert code_prefix(" abcd-3333") == "ABCD"
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, League, QRCode, QRSet, Team, TeamMembership, User
+from app.utils import redeem_cache
+from app.utils.redeem_cache import (
+    get_code_descriptor,
+    get_user_teams,
+    invalidate_code_descriptor,
+    invalidate_user_teams,
+)
+
+
+@pytest.fixture()
+def db():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    invalidate_code_descriptor()
+    invalidate_user_teams()
+    yield session
+    session.close()
+    invalidate_code_descriptor()
+    invalidate_user_teams()
+
+
+def test_code_descriptor_is_cached_until_invalidated(db):
+    league = League(name="Pub League", slug="pub", is_active=True)
+    db.add(league)
+    db.commit()
+    qr_set = QRSet(name="Finals", league_id=league.id)
+    db.add(qr_set)
+    db.commit()
+    db.add(QRCode(code="final-1", points=20, qr_set_id=qr_set.id,
+                  expires_at=datetime.now() - timedelta(minutes=1)))
+    db.commit()
+
+    descriptor = get_code_descriptor(db, "final-1")
+    assert (descriptor.league_id, descriptor.points) == (league.id, 20)
+    assert descriptor.is_expired and not descriptor.is_spent
+
+    db.query(QRCode).filter_by(code="final-1").update({"used": True})
+    db.commit()
+    assert get_code_descriptor(db, "final-1").used is False
+
+    invalidate_code_descriptor("final-1")
+    assert get_code_descriptor(db, "final-1").is_spent
+
+
+def test_unknown_codes_are_cached_briefly(db, monkeypatch):
+    monkeypatch.setattr(redeem_cache, "UNKNOWN_CODE_TTL", 0)
+    assert get_code_descriptor(db, "later") is None
+    db.add(QRCode(code="later", points=5, league_id=1))
+    db.commit()
+
+    assert get_code_descriptor(db, "later").points == 5
+
+
+def test_user_teams_are_cached_per_user_and_league(db):
+    league = League(name="Pub League", slug="pub", is_active=True)
+    alice = User(username="alice", email="alice@example.com")
+    bob = User(username="bob", email="bob@example.com")
+    db.add_all([league, alice, bob])
+    db.commit()
+    quizzers = Team(name="Quizzers", league_id=league.id)
+    brains = Team(name="Brains", league_id=league.id)
+    db.add_all([quizzers, brains])
+    db.commit()
+    db.add_all([
+        TeamMembership(user_id=alice.id, team_id=quizzers.id),
+        TeamMembership(user_id=bob.id, team_id=quizzers.id),
+    ])
+    db.commit()
+
+    assert [team.name for team in get_user_teams(db, alice.id, league.id)] == ["Quizzers"]
+    assert [team.name for team in get_user_teams(db, bob.id, league.id)] == ["Quizzers"]
+
+    db.add_all([
+        TeamMembership(user_id=alice.id, team_id=brains.id),
+        TeamMembership(user_id=bob.id, team_id=brains.id),
+    ])
+    db.commit()
+    invalidate_user_teams(alice.id)
+
+    assert [team.name for team in get_user_teams(db, alice.id, league.id)] == ["Brains", "Quizzers"]
+    assert [team.name for team in get_user_teams(db, bob.id, league.id)] == ["Quizzers"]
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from starlette.authentication import AuthCredentials, SimpleUser
+
+from app.models import Base, League, MailAnnouncement, OutboundEmail, Team, TeamMembership, User
+from app.utils.mail_queue import count_announcement_message
+from app.views import announcements
+from app.views.announcements import (
+    announcement_progress,
+    announcement_recipients_query,
+    prepare_announcement,
+    progress_summary,
+)
+
+
+@pytest.fixture()
+def session_factory():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def seed_league(db):
+    pub = League(name="Pub League", slug="pub", is_active=True)
+    cup = League(name="Cup League", slug="cup", is_active=True)
+    db.add_all([pub, cup])
+    db.commit()
+    quizzers = Team(name="Quizzers", league_id=pub.id)
+    brains = Team(name="Brains", league_id=pub.id)
+    cup_team = Team(name="Cup Team", league_id=cup.id)
+    alice = User(username="alice", email="alice@example.com", first_name="Alice", is_active=True)
+    bob = User(username="bob", email="bob@example.com", is_active=True)
+    carol = User(username="carol", email="carol@example.com", is_active=False)
+    dave = User(username="dave", email="dave@example.com", is_active=True)
+    db.add_all([quizzers, brains, cup_team, alice, bob, carol, dave])
+    db.commit()
+    db.add_all([
+        TeamMembership(user_id=alice.id, team_id=quizzers.id),
+        TeamMembership(user_id=alice.id, team_id=brains.id),
+        TeamMembership(user_id=bob.id, team_id=brains.id),
+        TeamMembership(user_id=carol.id, team_id=quizzers.id),
+        TeamMembership(user_id=dave.id, team_id=cup_team.id),
+    ])
+    db.commit()
+    return pub
+
+
+def test_league_recipients_are_active_and_distinct(session_factory):
+    db = session_factory()
+    pub = seed_league(db)
+
+    recipients = announcement_recipients_query(db, "league", pub.id).all()
+
+    assert [recipient.email for recipient in recipients] == ["alice@example.com", "bob@example.com"]
+
+
+def test_prepare_announcement_queues_rendered_messages(session_factory):
+    db = session_factory()
+    pub = seed_league(db)
+    announcement = MailAnnouncement(
+        subject="Season final", body="Join us on Friday.\n\nBring your team!",
+        audience_type="league", audience_id=pub.id,
+    )
+    db.add(announcement)
+    db.commit()
+
+    assert prepare_announcement(announcement.id, session_factory=session_factory) == 2
+
+    db.expire_all()
+    messages = db.query(OutboundEmail).order_by(OutboundEmail.id).all()
+    assert [message.recipients for message in messages] == ["alice@example.com", "bob@example.com"]
+    assert all(message.priority == 10 and message.announcement_id == announcement.id for message in messages)
+    assert "Hello Alice," in messages[0].plain_text_content
+    assert "Bring your team!" in messages[1].html_content
+
+    announcement = db.get(MailAnnouncement, announcement.id)
+    assert announcement.status == "queued"
+    messages[0].status = "sent"
+    count_announcement_message(db, announcement.id, "sent")
+    db.commit()
+    # Purged sent messages still count towards the progress
+    db.delete(messages[0])
+    db.commit()
+    progress = progress_summary(announcement, announcement_progress(db, [announcement.id])[announcement.id])
+    assert progress == {
+        "id": announcement.id, "status": "sending", "total": 2,
+        "sent": 1, "failed": 0, "remaining": 1, "percent": 50,
+    }
+
+
+def test_announcements_are_refused_without_the_mail_queue(monkeypatch):
+    monkeypatch.setattr(announcements, "MAIL_QUEUE_ENABLED", False)
+    app = FastAPI()
+    app.include_router(announcements.router, prefix="/admin/announcements")
+    inner = app.build_middleware_stack()
+
+    async def as_admin(scope, receive, send):
+        scope["auth"] = AuthCredentials(["authenticated", "admin"])
+        scope["user"] = SimpleUser("1")
+        scope["session"] = {"user_id": 1}
+        await inner(scope, receive, send)
+
+    response = TestClient(as_admin).post(
+        "/admin/announcements/", data={"subject": "Hi", "body": "Hello", "audience": "league:1"}
+    )
+
+    assert response.status_code == 503
+
+
+def test_failed_preparation_cancels_queued_chunks(session_factory, monkeypatch):
+    db = session_factory()
+    pub = seed_league(db)
+    announcement = MailAnnouncement(subject="Final", body="Friday", audience_type="league", audience_id=pub.id)
+    db.add(announcement)
+    db.commit()
+    monkeypatch.setattr(announcements, "ANNOUNCEMENT_CHUNK_SIZE", 1)
+    render_many = announcements.mail_renderer.render_many
+    calls = []
+
+    def failing_second_chunk(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == 2:
+            raise RuntimeError("template error")
+        return render_many(*args, **kwargs)
+
+    monkeypatch.setattr(announcements.mail_renderer, "render_many", failing_second_chunk)
+
+    assert prepare_announcement(announcement.id, session_factory=session_factory) == 0
+
+    db.expire_all()
+    announcement = db.get(MailAnnouncement, announcement.id)
+    assert (announcement.status, announcement.total_recipients) == ("failed", 2)
+    assert announcement.last_error == "template error"
+    assert [message.status for message in db.query(OutboundEmail)] == ["cancelled"]
+
+
+def test_prepare_announcement_ignores_deleted_announcements(session_factory):
+    assert prepare_announcement(404, session_factory=session_factory) == 0
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy import event as sa_event
+from sqlalchemy.orm import sessionmaker
+
+from app.models import (
+    ArchivedRecord, Base, Event, EventAttendee, League, QRCode, QRSet, Team, TeamAchievement, TeamMembership, User
+)
+from app.views.admin import bulk_delete_records
+
+
+@pytest.fixture()
+def db_session():
+    engine = create_engine("sqlite:///:memory:")
+    # Enforce foreign keys as MySQL does, so a missing cascade rule fails here too
+    sa_event.listen(engine, "connect", lambda connection, record: connection.execute("PRAGMA foreign_keys=ON"))
+    Base.metadata.create_all(bind=engine)
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def seed_teams(db):
+    user = User(username="captain", email="captain@example.com", hashed_password="hash")
+    teams = [Team(name=f"Team {i}") for i in range(3)]
+    db.add(user)
+    db.add_all(teams)
+    db.commit()
+    db.add_all([TeamMembership(user_id=user.id, team_id=team.id) for team in teams])
+    db.add_all([TeamAchievement(team_id=team.id, name="1st Place") for team in teams])
+    db.add(QRCode(code="used-code", points=5, redeemed_at_team=teams[0].id, used=True))
+    db.commit()
+    return user, teams
+
+
+def test_bulk_delete_teams_cascades_without_archiving(db_session):
+    user, teams = seed_teams(db_session)
+
+    deleted = bulk_delete_records(db_session, "team", [teams[0].id, teams[1].id])
+
+    assert deleted == 2
+    assert [team.name for team in db_session.query(Team).all()] == ["Team 2"]
+    assert db_session.query(TeamMembership).count() == 1
+    assert db_session.query(TeamAchievement).count() == 1
+    assert db_session.query(QRCode).one().redeemed_at_team is None
+    assert db_session.query(ArchivedRecord).count() == 0
+
+
+def test_bulk_delete_with_archive_keeps_snapshots_of_deleted_rows(db_session):
+    user, teams = seed_teams(db_session)
+    team_id, user_id = teams[0].id, user.id
+
+    bulk_delete_records(db_session, "team", [team_id], archive=True, archived_by=user_id)
+
+    archived = {(record.table_name, record.record_id) for record in db_session.query(ArchivedRecord).all()}
+    assert ("teams", team_id) in archived
+    assert ("team_membership", 1) in archived
+    assert ("team_achievements", 1) in archived
+    team_snapshot = db_session.query(ArchivedRecord).filter_by(table_name="teams").one()
+    assert team_snapshot.data["name"] == "Team 0"
+    assert team_snapshot.archived_by == user_id
+
+
+def test_bulk_delete_events_clears_references(db_session):
+    user = User(username="player", email="player@example.com", hashed_password="hash")
+    event = Event(name="Quiz Night", event_date=datetime(2026, 5, 22))
+    db_session.add_all([user, event])
+    db_session.commit()
+    db_session.add_all([
+        EventAttendee(event_id=event.id, user_id=user.id),
+        QRCode(code="event-code", points=10, event_id=event.id),
+    ])
+    db_session.commit()
+
+    assert bulk_delete_records(db_session, "event", [event.id, 9999]) == 1
+    assert db_session.query(EventAttendee).count() == 0
+    assert db_session.query(QRCode).one().event_id is None
+
+
+def test_bulk_delete_qr_sets_and_leagues_clears_references(db_session):
+    league = League(name="Pub League", slug="pub", is_active=True)
+    db_session.add(league)
+    db_session.commit()
+    qr_set = QRSet(name="Weekly Set", league_id=league.id)
+    team = Team(name="Quizzers", league_id=league.id)
+    event = Event(name="Quiz Night", league_id=league.id, event_date=datetime(2026, 5, 22))
+    db_session.add_all([qr_set, team, event])
+    db_session.commit()
+    code = QRCode(code="set-code", points=10, qr_set_id=qr_set.id, league_id=league.id)
+    db_session.add(code)
+    db_session.commit()
+    db_session.add(TeamAchievement(team_id=team.id, name="Scanned", qr_code_id=code.id))
+    db_session.commit()
+
+    assert bulk_delete_records(db_session, "qr_set", [qr_set.id]) == 1
+    assert db_session.query(QRCode).one().qr_set_id is None
+
+    assert bulk_delete_records(db_session, "league", [league.id]) == 1
+    assert db_session.query(Team).one().league_id is None
+    assert db_session.query(Event).one().league_id is None
+    assert db_session.query(QRCode).one().league_id is None
+
+    assert bulk_delete_records(db_session, "qr_code", [code.id]) == 1
+    assert db_session.query(TeamAchievement).one().qr_code_id is None
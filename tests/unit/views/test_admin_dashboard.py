@@ -1,4 +1,5 @@
 #!/usr/bin/env python3
+from collections import deque
 from datetime import datetime, timedelta
 
 import pytest
@@ -6,11 +7,15 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.models import Base, Event, EventAttendee, Team, TeamMembership, User
+from app.utils.metrics import recent_errors_handler
+from app.views import admin
 from app.views.admin import (
+    get_dashboard_statistics,
     get_event_statistics,
     get_system_health,
     get_team_statistics,
     get_user_statistics,
+    invalidate_dashboard_statistics,
 )
 
 
@@ -124,9 +129,60 @@ def test_get_event_statistics(db_session):
     assert stats["attendance_rates"][0].attendee_count == 2
 
 
-def test_get_system_health(db_session):
+def test_get_system_health(db_session, monkeypatch):
+    # Errors logged by other tests (e.g. OAuth setup when app.main is imported) share the buffer
+    monkeypatch.setattr(recent_errors_handler, "records", deque(maxlen=recent_errors_handler.records.maxlen))
+
     health_info = get_system_health(db_session)
 
     assert health_info["database_status"] == "online"
     assert "uptime" in health_info
     assert health_info["recent_errors"] == []
+
+
+def test_get_user_statistics_buckets_registrations_by_month(db_session, monkeypatch):
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return cls(2026, 6, 15, 12, 0)
+
+        @classmethod
+        def utcnow(cls):
+            return cls(2026, 6, 15, 12, 0)
+
+    monkeypatch.setattr(admin, "datetime", FrozenDatetime)
+    registrations = [
+        datetime(2025, 12, 31, 23, 59, 59),  # before the six-month window
+        datetime(2026, 1, 1, 0, 0),
+        datetime(2026, 4, 30, 23, 59, 59),
+        datetime(2026, 5, 1, 0, 0),
+        datetime(2026, 5, 31, 23, 59, 59),
+        datetime(2026, 6, 1, 0, 0),  # the exclusive end of May
+        datetime(2026, 6, 15, 13, 0),  # after now
+    ]
+    db_session.add_all([
+        User(username=f"user{i}", email=f"user{i}@example.com", hashed_password="hash", created_at=created_at)
+        for i, created_at in enumerate(registrations)
+    ])
+    db_session.commit()
+
+    stats = get_user_statistics(db_session)
+
+    assert stats["month_labels"] == ["Jan", "Feb", "Mar", "Apr", "May", "Jun"]
+    assert stats["monthly_registrations"] == [1, 0, 0, 1, 2, 1]
+
+
+def test_get_dashboard_statistics_is_cached_until_invalidated(db_session):
+    invalidate_dashboard_statistics()
+    seed_users(db_session)
+
+    first = get_dashboard_statistics(db_session)
+    db_session.add(User(username="late", email="late@example.com", hashed_password="hash"))
+    db_session.commit()
+
+    assert get_dashboard_statistics(db_session) is first
+    assert first["user_stats"]["total_users"] == 3
+
+    invalidate_dashboard_statistics()
+
+    assert get_dashboard_statistics(db_session)["user_stats"]["total_users"] == 4
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, League, QRCode, Team
+from app.views.export import build_export_query, iter_export_rows, stream_csv, stream_ndjson
+
+
+@pytest.fixture()
+def session_factory():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def seed_redemptions(db):
+    pub = League(name="Pub League", slug="pub", is_active=True)
+    cup = League(name="Cup League", slug="cup", is_active=True)
+    db.add_all([pub, cup])
+    db.commit()
+    team = Team(name="Quizzers", league_id=pub.id)
+    db.add(team)
+    db.commit()
+    db.add_all([
+        QRCode(code="pub-may", points=10, league_id=pub.id, redeemed_at_team=team.id,
+               redeemed_at=datetime(2026, 5, 1, 20, 0), used=True),
+        QRCode(code="pub-june", points=5, league_id=pub.id, redeemed_at_team=team.id,
+               redeemed_at=datetime(2026, 6, 1, 20, 0), used=True),
+        QRCode(code="cup-june", points=7, league_id=cup.id, redeemed_at=datetime(2026, 6, 2), used=True),
+        QRCode(code="unused", points=3, league_id=pub.id),
+    ])
+    db.commit()
+    return pub, cup
+
+
+def test_redemption_export_filters_by_league_and_time_range(session_factory):
+    db = session_factory()
+    pub, _ = seed_redemptions(db)
+
+    stmt = build_export_query("redemptions", league_id=pub.id, since=datetime(2026, 5, 15))
+    rows = list(iter_export_rows(stmt, session_factory=session_factory))
+
+    assert [row["code"] for row in rows] == ["pub-june"]
+    assert rows[0]["redeemed_at"] == "2026-06-01T20:00:00"
+
+
+def test_stream_csv_and_ndjson_encode_rows(session_factory):
+    db = session_factory()
+    seed_redemptions(db)
+    stmt = build_export_query("redemptions")
+    columns = [column.name for column in stmt.selected_columns]
+
+    csv_body = "".join(stream_csv(columns, iter_export_rows(stmt, session_factory=session_factory)))
+    ndjson_body = "".join(stream_ndjson(iter_export_rows(stmt, session_factory=session_factory)))
+
+    csv_lines = csv_body.strip().splitlines()
+    assert csv_lines[0].split(",")[:3] == ["id", "code", "league_id"]
+    assert len(csv_lines) == 4
+    assert [json.loads(line)["code"] for line in ndjson_body.splitlines()] == ["pub-may", "pub-june", "cup-june"]
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+import io
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, Event, League, Team, TeamMembership, User
+from app.views import bulk_import
+from app.views.bulk_import import import_csv, read_csv_rows
+
+
+@pytest.fixture()
+def db():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture()
+def league(db):
+    league = League(name="Pub League", slug="pub", is_active=True)
+    db.add(league)
+    db.commit()
+    return league
+
+
+def rows(text):
+    return read_csv_rows(io.StringIO(text))
+
+
+def test_team_import_dry_run_reports_diff_without_writing(db, league):
+    db.add(Team(name="Quizzers", league_id=league.id, description="Old", is_public=False))
+    db.commit()
+
+    csv_text = "Name,Description,Is_Public\nQuizzers,New,yes\nNewcomers,,\n,,\n"
+    report = import_csv(db, "teams", league, rows(csv_text), dry_run=True)
+
+    assert [item["key"] for item in report["created"]] == ["Newcomers"]
+    assert report["updated"][0]["changes"] == {"description": ("Old", "New"), "is_public": (False, True)}
+    assert report["errors"] == [(4, "Team name is required")]
+    assert db.query(Team).count() == 1
+    assert db.query(Team).first().description == "Old"
+
+
+def test_dry_run_matches_a_real_import_across_batches(db, league):
+    csv_text = "name,description\nNewcomers,Fresh\nNewcomers,Fresher\nNewcomers,Fresher\n"
+
+    preview = import_csv(db, "teams", league, rows(csv_text), dry_run=True, batch_size=1)
+    assert db.query(Team).count() == 0
+    report = import_csv(db, "teams", league, rows(csv_text), dry_run=False, batch_size=1)
+
+    for result in (preview, report):
+        assert [item["key"] for item in result["created"]] == ["Newcomers"]
+        assert [item["changes"] for item in result["updated"]] == [{"description": ("Fresh", "Fresher")}]
+        assert result["unchanged"] == 1
+
+
+def test_team_import_upserts_in_batches(db, league):
+    db.add(Team(name="Quizzers", league_id=league.id, description="Old"))
+    db.commit()
+
+    csv_text = "name,description\nQuizzers,New\nNewcomers,Fresh\nLatecomers,\n"
+    report = import_csv(db, "teams", league, rows(csv_text), dry_run=False, batch_size=2)
+
+    assert len(report["created"]) == 2
+    assert len(report["updated"]) == 1
+    teams = {team.name: team for team in db.query(Team).all()}
+    assert set(teams) == {"Quizzers", "Newcomers", "Latecomers"}
+    assert teams["Quizzers"].description == "New"
+
+
+def test_failed_batch_is_dropped_from_the_report(db, league, monkeypatch):
+    db.add(Team(name="Quizzers", league_id=league.id, description="Old"))
+    db.commit()
+    batches = []
+
+    def failing_second_batch(db, league, batch, report, dry_run, seen):
+        bulk_import.import_teams_batch(db, league, batch, report, dry_run, seen)
+        batches.append(batch)
+        if len(batches) == 2:
+            raise RuntimeError("connection lost")
+
+    monkeypatch.setitem(bulk_import.IMPORTERS, "teams", failing_second_batch)
+    invalidated = []
+    monkeypatch.setattr(bulk_import, "invalidate_record_caches", invalidated.append)
+
+    csv_text = "name,description\nNewcomers,Fresh\nQuizzers,New\nLatecomers,\n"
+    report = import_csv(db, "teams", league, rows(csv_text), dry_run=False, batch_size=1)
+
+    assert [item["key"] for item in report["created"]] == ["Newcomers", "Latecomers"]
+    assert report["updated"] == []
+    assert report["errors"] == [(3, "Batch starting at line 3 failed: connection lost")]
+    assert db.query(Team).filter(Team.name == "Quizzers").one().description == "Old"
+    assert invalidated == ["team"]
+
+
+def test_membership_and_event_import(db, league):
+    team = Team(name="Quizzers", league_id=league.id)
+    alice = User(username="alice", email="alice@example.com")
+    bob = User(username="bob", email="bob@example.com")
+    db.add_all([team, alice, bob])
+    db.commit()
+    db.add(TeamMembership(user_id=alice.id, team_id=team.id, is_captain=False))
+    db.commit()
+
+    csv_text = "team,user,is_captain\nQuizzers,alice,true\nQuizzers,bob@example.com,\nQuizzers,carol,\n"
+    report = import_csv(db, "memberships", league, rows(csv_text), dry_run=False)
+
+    assert [item["key"] for item in report["created"]] == ["bob @ Quizzers"]
+    assert report["updated"][0]["changes"] == {"is_captain": (False, True)}
+    assert report["errors"] == [(4, "Unknown user 'carol'")]
+    assert db.query(TeamMembership).count() == 2
+
+    csv_text = "name,event_date,location\nQuiz Night,2026-11-05T20:00,The Crown\nQuiz Night,not-a-date,\n"
+    report = import_csv(db, "events", league, rows(csv_text), dry_run=False)
+
+    assert len(report["created"]) == 1
+    assert report["errors"][0][0] == 3
+    assert db.query(Event).filter(Event.league_id == league.id).one().location == "The Crown"
+
+
+def test_import_reports_missing_columns(db, league):
+    report = import_csv(db, "memberships", league, rows("team\nQuizzers\n"), dry_run=True)
+
+    assert report["errors"] == [(2, "Missing column(s): user")]
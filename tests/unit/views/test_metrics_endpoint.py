@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+import pytest
+from starlette.authentication import AuthCredentials
+from starlette.requests import Request
+
+from app.views import metrics
+
+
+def make_request(authorization=None, scopes=None):
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/metrics",
+        "headers": [(b"authorization", authorization.encode())] if authorization else [],
+    }
+    if scopes is not None:
+        scope["auth"] = AuthCredentials(scopes)
+    return Request(scope)
+
+
+@pytest.mark.parametrize("token, public, request_kwargs, allowed", [
+    (None, False, {}, False),
+    (None, False, {"scopes": ["authenticated"]}, False),
+    (None, False, {"scopes": ["authenticated", "admin"]}, True),
+    ("s3cret", False, {"authorization": "Bearer s3cret"}, True),
+    ("s3cret", False, {"authorization": "Bearer wrong"}, False),
+    (None, False, {"authorization": "Bearer "}, False),
+    (None, True, {}, True),
+])
+def test_metrics_require_a_token_or_an_admin_unless_public(monkeypatch, token, public, request_kwargs, allowed):
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", token)
+    monkeypatch.setattr(metrics, "METRICS_PUBLIC", public)
+
+    assert metrics.may_read_metrics(make_request(**request_kwargs)) is allowed